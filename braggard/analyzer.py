@@ -3,78 +3,283 @@
 from __future__ import annotations
 
 from collections import Counter
-from datetime import datetime, timezone
+from collections.abc import Iterable
+from datetime import date, datetime, timezone
+from itertools import islice
 import json
+import math
+import os
 from pathlib import Path
+import tempfile
+from typing import IO, Any
 
-from .config import load_config
+import numpy as np
 
+from .catalog import Catalog, catalog_path
+from .config import AnalyzerConfig, load_config
+from .table import RepoTable, pack_statuses
+from .metrics import MetricStore, metrics_paths, stamp_time
+from .timeseries import build_timeseries, epoch_days, velocity_series
 
-def _load_snapshots(data_dir: str | Path | None = None) -> list[dict]:
-    """Return a combined list of repositories from ``data_dir/*.json``."""
+
+# Version of ``_summarize``'s output; bump it whenever that output changes.
+SUMMARY_VERSION = "2"
+# Repositories loaded into one :class:`RepoTable` while writing the summary.
+CHUNK_SIZE = 4096
+
+
+def _summarize(repo: dict[str, Any]) -> dict[str, Any]:
+    """Return what the summary needs from one repository record.
+
+    Computed once when a snapshot is ingested into the catalog. CI
+    conclusions are packed into a ``[count, bits]`` bitset and ISO weeks
+    become the ordinal of their Monday, ready for :class:`RepoTable`.
+    """
+    summary: dict[str, Any] = {
+        "name": repo.get("name"),
+        "stars": repo.get("stargazerCount") or 0,
+    }
+    if repo.get("forkCount"):
+        summary["forks"] = repo["forkCount"]
+    if repo.get("commitCount"):
+        summary["commits"] = repo["commitCount"]
+    name = (repo.get("primaryLanguage") or {}).get("name")
+    if name:
+        summary["language"] = str(name)
+    if repo.get("languages"):
+        summary["languages"] = {
+            str(language): int(size) for language, size in repo["languages"].items()
+        }
+    if repo.get("ciStatuses"):
+        summary["ci"] = list(pack_statuses(repo["ciStatuses"]))
+    if repo.get("weeklyCommits"):
+        summary["weeks"] = [
+            [_monday(week), int(count)] for week, count in repo["weeklyCommits"].items()
+        ]
+    return summary
+
+
+def _monday(week: str) -> int:
+    """Return the proleptic ordinal of the Monday of ISO ``week`` (``2024-W05``)."""
+    year, number = week.split("-W")
+    return date.fromisocalendar(int(year), int(number), 1).toordinal()
+
+
+def _combine(summaries: Iterable[dict[str, Any]]) -> dict[str, Any]:
+    """Fold repository summaries into one partial aggregate."""
+    table = RepoTable(summaries)
+    return {
+        "repo_count": len(table),
+        "total_stars": int(table.stars.sum()),
+        "languages": table.language_counts(),
+        "language_bytes": table.language_bytes(),
+    }
+
+
+def _merge(partials: Iterable[dict[str, Any]]) -> dict[str, Any]:
+    """Sum partial aggregates from :func:`_combine`."""
+    lang_counter: Counter[str] = Counter()
+    lang_bytes: Counter[str] = Counter()
+    repo_count = total_stars = 0
+    for partial in partials:
+        repo_count += partial["repo_count"]
+        total_stars += partial["total_stars"]
+        lang_counter.update(partial["languages"])
+        lang_bytes.update(partial["language_bytes"])
+    return {
+        "repo_count": repo_count,
+        "total_stars": total_stars,
+        "languages": dict(lang_counter),
+        "language_bytes": dict(lang_bytes.most_common()),
+    }
+
+
+def _resolve(data_dir: str | Path | None, workers: int | None) -> tuple[Path, int]:
+    """Return the data directory and worker count, defaulting to the config."""
+    # braggard.toml is optional when the data directory is given explicitly
+    cfg = AnalyzerConfig()
     if data_dir is None:
-        cfg = load_config()
-        data_dir = cfg.paths.data_dir
-    data_dir = Path(data_dir)
-    repos: list[dict] = []
-    for path in sorted(data_dir.glob("*.json")):
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        if isinstance(data, list):
-            repos.extend(data)
-        else:
-            repos.extend(data.get("repos", []))
-    if not repos:
+        config = load_config()
+        data_dir, cfg = config.paths.data_dir, config.analyzer
+    elif workers is None:
+        try:
+            cfg = load_config().analyzer
+        except FileNotFoundError:
+            pass
+    return Path(data_dir), cfg.workers if workers is None else workers
+
+
+def _open_catalog(data_dir: Path, workers: int) -> Catalog:
+    """Return the synced snapshot catalog of ``data_dir``.
+
+    Only snapshots that are new or changed since the last run are read,
+    spread over ``workers`` processes.
+    """
+    if not data_dir.is_dir():
         raise FileNotFoundError(f"No snapshot data found in {data_dir}/")
-    return repos
+    catalog = Catalog(
+        catalog_path(data_dir),
+        summarize=_summarize,
+        combine=_combine,
+        summary_key=SUMMARY_VERSION,
+    )
+    catalog.sync(data_dir, workers=workers)
+    return catalog
+
+
+def _stars_timeline(data_dir: Path, catalog: Catalog) -> dict[str, Any]:
+    """Return the stars time series of ``summary.json``.
+
+    Accounts with a metric store, which ``collect`` appends to, are read
+    from it without touching old snapshots; accounts without one yet, such
+    as those only present in legacy snapshots, fall back to the stars of
+    their snapshots in the catalog.
+    """
+    latest = catalog.latest_values("language")
+    languages: dict[int, str | None] = {}
+    columns = [(np.zeros(0, dtype=np.int64),) * 2 + (np.zeros(0),)]
+    stores = metrics_paths(data_dir)
+    for login, path in stores.items():
+        store = MetricStore(path)
+        repos, times, stars = store.columns("stargazerCount")
+        base = len(languages)
+        columns.append((repos + base, epoch_days(times), stars))
+        for repo, name in enumerate(store.names):
+            languages[base + repo] = latest.get((login, name))
+    repos, snapshots, stars = catalog.series("stars")
+    if len(repos):
+        keys = catalog.repos()
+        stored = np.zeros(max(keys) + 1, dtype=bool)
+        for repo, (owner, _) in keys.items():
+            stored[repo] = owner in stores
+        stamps = catalog.stamps()
+        day_of = np.zeros(max(stamps) + 1, dtype=np.int64)
+        seconds = [stamp_time(stamp) for stamp in stamps.values()]
+        day_of[list(stamps)] = epoch_days(np.array(seconds, dtype=np.int64))
+        kept = ~stored[repos]
+        base = len(languages)
+        columns.append((repos[kept] + base, day_of[snapshots[kept]], stars[kept]))
+        for repo, key in keys.items():
+            if not stored[repo]:
+                languages[base + repo] = latest.get(key)
+    repos, days, stars = (np.concatenate(column) for column in zip(*columns))
+    return build_timeseries(repos, days, stars, languages)
 
 
 def analyze(
-    *, data_dir: str | Path | None = None, summary_path: str | Path | None = None
+    *,
+    data_dir: str | Path | None = None,
+    summary_path: str | Path | None = None,
+    workers: int | None = None,
 ) -> None:
     """Analyze collected JSON and write a summary.
 
     Parameters
     ----------
     data_dir:
-        Optional directory containing snapshot JSON files. Defaults to the
+        Optional directory containing snapshot files. Defaults to the
         ``paths.data_dir`` value from ``braggard.toml``.
     summary_path:
         Optional path to write the resulting ``summary.json``. Defaults to
         ``summary.json`` in the current working directory.
+    workers:
+        Processes parsing new snapshots; ``0`` means one per CPU. Defaults to
+        ``analyzer.workers`` from ``braggard.toml``.
     """
 
-    repos = _load_snapshots(data_dir)
-
-    lang_counter: Counter[str] = Counter()
-    total_stars = 0
-    for repo in repos:
-        total_stars += int(repo.get("stargazerCount", 0))
-        lang = repo.get("primaryLanguage") or {}
-        name = lang.get("name")
-        if name:
-            lang_counter[str(name)] += 1
-
-    repo_summaries = []
-    for r in repos:
-        entry = {"name": r.get("name"), "stars": r.get("stargazerCount", 0)}
-        statuses = r.get("ciStatuses") or []
-        if statuses:
-            success = sum(1 for s in statuses if s == "SUCCESS")
-            entry["ci_pass_rate"] = success / len(statuses)
-        repo_summaries.append(entry)
-
-    summary = {
-        "generated_at": datetime.now(timezone.utc).isoformat(),
-        "repos": repo_summaries,
-        "aggregate": {
-            "repo_count": len(repos),
-            "total_stars": total_stars,
-            "languages": dict(lang_counter),
-        },
-    }
-
+    now = datetime.now(timezone.utc)
     out_path = Path(summary_path or "summary.json")
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(summary, f, indent=2)
+    data_dir, workers = _resolve(data_dir, workers)
+    with _open_catalog(data_dir, workers) as catalog:
+        totals = _merge(catalog.partials())
+        if not totals["repo_count"]:
+            raise FileNotFoundError(f"No snapshot data found in {data_dir}/")
+        aggregate: dict[str, Any] = {
+            "repo_count": totals["repo_count"],
+            "total_stars": totals["total_stars"],
+            "languages": totals["languages"],
+        }
+        if totals["language_bytes"]:
+            aggregate["language_bytes"] = totals["language_bytes"]
+        fd, tmp = tempfile.mkstemp(dir=out_path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                _write_summary(
+                    f,
+                    now,
+                    catalog.latest_summaries(),
+                    aggregate,
+                    _stars_timeline(data_dir, catalog),
+                )
+            os.replace(tmp, out_path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+def _write_summary(
+    f: IO[str],
+    now: datetime,
+    summaries: Iterable[dict[str, Any]],
+    aggregate: dict[str, Any],
+    timeseries: dict[str, Any] | None = None,
+) -> None:
+    """Stream ``summary.json`` to ``f`` one repository entry at a time.
+
+    Summaries are loaded :data:`CHUNK_SIZE` at a time into a
+    :class:`RepoTable` whose CI pass rates and commit velocities are
+    computed column-wise. Velocities are summed into ``aggregate`` and
+    weekly commits into the rolling velocity of ``timeseries``; both are
+    written last. The layout matches ``json.dump(summary, f, indent=2)``
+    except that every series is kept on one line.
+    """
+    f.write("{\n")
+    f.write(f'  "generated_at": {json.dumps(now.isoformat())},\n')
+    f.write('  "repos": [')
+    velocity = 0.0
+    has_velocity = False
+    weekly: Counter[int] = Counter()
+    separator = "\n    "
+    rows = iter(summaries)
+    while chunk := list(islice(rows, CHUNK_SIZE)):
+        table = RepoTable(chunk)
+        stars = table.stars.tolist()
+        rates = table.ci_pass_rates().tolist()
+        velocities = table.commit_velocities(now).tolist()
+        weekly.update(table.weekly_commits())
+        for row in range(len(table)):
+            entry: dict[str, Any] = {"name": table.name_of(row), "stars": stars[row]}
+            languages = table.languages_of(row)
+            if languages:
+                entry["language_bytes"] = languages
+            if not math.isnan(rates[row]):
+                entry["ci_pass_rate"] = rates[row]
+            if not math.isnan(velocities[row]):
+                entry["commit_velocity"] = velocities[row]
+                velocity += velocities[row]
+                has_velocity = True
+            f.write(separator)
+            f.write(json.dumps(entry, indent=2).replace("\n", "\n    "))
+            separator = ",\n    "
+    f.write("\n  ],\n")
+    if has_velocity:
+        aggregate["commits_per_week"] = velocity
+    f.write('  "aggregate": ')
+    f.write(json.dumps(aggregate, indent=2).replace("\n", "\n  "))
+    series = {**(timeseries or {}), **velocity_series(weekly)}
+    if series:
+        f.write(f',\n  "timeseries": {_series_json(series, "  ")}')
+    f.write("\n}")
+
+
+def _series_json(value: Any, indent: str) -> str:
+    """Return ``value`` as indented JSON with every list on one line."""
+    if not isinstance(value, dict) or not value:
+        return json.dumps(value)
+    inner = indent + "  "
+    items = ",\n".join(
+        f"{inner}{json.dumps(key)}: {_series_json(item, inner)}"
+        for key, item in value.items()
+    )
+    return "{\n" + items + "\n" + indent + "}"
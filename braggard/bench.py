@@ -0,0 +1,138 @@
+"""Load benchmark of :func:`braggard.collector.collect` against a fake GitHub."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+import multiprocessing
+from multiprocessing.connection import Connection
+from pathlib import Path
+import tempfile
+import time
+import tracemalloc
+from typing import Any
+
+from . import collector
+from .fakeserver import FakeGitHub, Portfolio
+from .scheduler import DEFAULT_MAX_CONCURRENCY
+from .session import DEFAULT_MAX_CONNECTIONS
+from .snapshot import read_meta, snapshot_paths
+
+
+BENCH_USER = "bench"
+
+
+def _serve(conn: Connection, repos: int, options: dict[str, Any]) -> None:
+    """Serve a portfolio of ``repos`` until asked to stop, then report requests."""
+    with FakeGitHub(Portfolio(repos), **options) as server:
+        conn.send(server.url)
+        conn.recv()
+        conn.send(server.requests)
+
+
+@contextmanager
+def _fake_github(repos: int, options: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    """Run a :class:`FakeGitHub` in a child process for the ``with`` block.
+
+    Yields a dict holding the server's ``url``; ``requests`` is added once
+    the block exits. A separate process keeps the server's work out of the
+    timings and traced memory of the collector it serves.
+    """
+    context = multiprocessing.get_context("spawn")
+    parent, child = context.Pipe()
+    process = context.Process(target=_serve, args=(child, repos, options), daemon=True)
+    process.start()
+    server: dict[str, Any] = {"url": parent.recv()}
+    try:
+        yield server
+    finally:
+        parent.send(None)
+        server["requests"] = parent.recv()
+        process.join()
+
+
+def _collect(url: str, data_dir: str, options: dict[str, Any]) -> None:
+    """Collect the benchmark portfolio served at ``url`` into ``data_dir``."""
+    previous = collector.GITHUB_GRAPHQL_URL
+    collector.GITHUB_GRAPHQL_URL = url
+    collector._sizes.clear()
+    collector._scheduler = None
+    try:
+        collector.collect(
+            user=BENCH_USER,
+            include_private=True,
+            data_dir=data_dir,
+            full_history=True,
+            cache=False,
+            hedge=False,
+            **options,
+        )
+    finally:
+        collector.GITHUB_GRAPHQL_URL = previous
+
+
+def run_benchmark(
+    *,
+    repos: int = 1000,
+    latency: float = 0.0,
+    error_rate: float = 0.0,
+    timeout_rate: float = 0.0,
+    budget: int | None = None,
+    engine: str = "thread",
+    batch_size: int | None = None,
+    max_concurrency: int | None = None,
+    max_connections: int | None = None,
+    weekly_history: bool = False,
+) -> dict[str, Any]:
+    """Collect a synthetic portfolio of ``repos`` repositories and time it.
+
+    A :class:`~braggard.fakeserver.FakeGitHub` serves the portfolio from a
+    child process with the given ``latency``, ``error_rate``,
+    ``timeout_rate`` and rate-limit ``budget`` (default: enough for the
+    whole run). The remaining options are passed to
+    :func:`~braggard.collector.collect`; ``max_connections`` defaults to
+    enough pooled connections for ``max_concurrency`` requests. Everything
+    else uses built-in defaults rather than ``braggard.toml`` so results
+    stay comparable between checkouts. Commit counts span the full history.
+
+    The timed run is not traced; peak memory comes from a second, traced
+    run against a fresh server. Returns the repositories collected,
+    requests served, wall time, requests per second, peak traced memory in
+    MiB and the run's retries.
+    """
+    concurrency = max_concurrency or DEFAULT_MAX_CONCURRENCY
+    options: dict[str, Any] = {
+        "engine": engine,
+        "batch_size": batch_size or collector.DEFAULT_BATCH_SIZE,
+        "max_connections": max_connections or max(DEFAULT_MAX_CONNECTIONS, concurrency),
+        "max_concurrency": concurrency,
+        "weekly_history": weekly_history,
+    }
+    server_options = {
+        "latency": latency,
+        "error_rate": error_rate,
+        "timeout_rate": timeout_rate,
+        "budget": budget if budget is not None else 10 * repos + 1000,
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        with _fake_github(repos, server_options) as server:
+            started = time.perf_counter()
+            _collect(server["url"], tmp, options)
+            wall = time.perf_counter() - started
+        meta = read_meta(snapshot_paths(Path(tmp))[0])
+    with tempfile.TemporaryDirectory() as tmp:
+        with _fake_github(repos, server_options) as traced:
+            tracemalloc.start()
+            try:
+                _collect(traced["url"], tmp, options)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+    return {
+        "repos": meta.get("repo_count", 0),
+        "requests": server["requests"],
+        "wall_time": wall,
+        "requests_per_sec": server["requests"] / wall if wall else 0.0,
+        "peak_memory_mb": peak / (1024 * 1024),
+        "retries": meta.get("retries", 0),
+    }
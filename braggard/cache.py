@@ -0,0 +1,129 @@
+"""On-disk cache of GitHub GraphQL responses."""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+import hashlib
+import json
+import os
+from pathlib import Path
+import tempfile
+import threading
+import time
+from typing import Any
+
+
+# Hidden directory under ``paths.data_dir`` holding collector state.
+STATE_DIR = ".braggard"
+DEFAULT_TTLS = {"repos": 600.0, "stats": 7 * 24 * 3600.0}
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def cache_dir(data_dir: str | Path) -> Path:
+    """Return the response cache directory for ``data_dir``."""
+    return Path(data_dir) / STATE_DIR / "cache"
+
+
+class ResponseCache:
+    """Content-addressed store of GraphQL responses with TTL and LRU eviction.
+
+    Entries are keyed by a hash of the query text, its variables, the token
+    identity and an optional caller ``tag`` (e.g. the default-branch head
+    OIDs of a stats batch and the length of its commit window). Each query
+    ``kind`` has its own time-to-live. Hits
+    refresh the file's mtime so :meth:`prune` can evict least recently used
+    entries once the cache grows beyond ``max_bytes``.
+    """
+
+    def __init__(
+        self,
+        root: str | Path,
+        *,
+        ttls: Mapping[str, float] | None = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        read: bool = True,
+    ) -> None:
+        self.root = Path(root)
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.max_bytes = max_bytes
+        self.read = read
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(
+        query: str,
+        variables: Mapping[str, Any],
+        token: str | None,
+        tag: str = "",
+    ) -> str:
+        """Return the cache key for one request.
+
+        Only a digest of ``token`` enters the key so different credentials
+        never share entries and the token itself never touches disk.
+        """
+        identity = hashlib.sha256((token or "").encode()).hexdigest()
+        material = json.dumps([query, variables, identity, tag], sort_keys=True)
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str, kind: str) -> dict | None:
+        """Return the cached response for ``key`` if it is still fresh."""
+        ttl = self.ttls.get(kind, 0.0)
+        path = self._path(key)
+        if not self.read or ttl <= 0:
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self._count(hit=False)
+            return None
+        if time.time() - float(entry.get("stored_at", 0)) > ttl:
+            self._count(hit=False)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._count(hit=True)
+        return entry.get("response")
+
+    def put(self, key: str, response: dict) -> None:
+        """Store ``response`` under ``key`` atomically."""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"stored_at": time.time(), "response": response}, f)
+        os.replace(tmp, path)
+
+    def prune(self) -> None:
+        """Delete least recently used entries until under ``max_bytes``."""
+        if not self.root.is_dir():
+            return
+        entries = []
+        total = 0
+        for path in self.root.glob("*/*.json"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def _count(self, *, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
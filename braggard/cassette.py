@@ -0,0 +1,149 @@
+"""Record and replay GitHub GraphQL traffic for offline collector runs."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Mapping
+import gzip
+import hashlib
+import json
+from pathlib import Path
+import threading
+import time
+from typing import Any
+
+
+CASSETTE_NAME = "cassette.ndjson.gz"
+
+
+def cassette_path(directory: str | Path) -> Path:
+    """Return the cassette file kept in ``directory``."""
+    return Path(directory) / CASSETTE_NAME
+
+
+def _key(query: str, variables: Mapping[str, Any], *, loose: bool = False) -> str:
+    """Return the lookup key of one request.
+
+    The loose key leaves out the ``since`` cutoff, which moves with the date
+    a run happens on, so a cassette still replays on later days.
+    """
+    if loose:
+        variables = {k: v for k, v in variables.items() if k != "since"}
+    material = json.dumps([" ".join(query.split()), variables], sort_keys=True)
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+class CassetteRecorder:
+    """Append every request/response pair of a run to a gzipped cassette.
+
+    Each line holds the request key, the parsed response (or the error it
+    raised) and the observed latency. Tokens are never written.
+    """
+
+    def __init__(self, directory: str | Path) -> None:
+        self.path = cassette_path(directory)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.count = 0
+        self._file = gzip.open(self.path, "wt", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        query: str,
+        variables: Mapping[str, Any],
+        latency: float,
+        *,
+        response: dict | None = None,
+        error: RuntimeError | None = None,
+        timeout: bool = False,
+    ) -> None:
+        """Store one outcome of ``query`` with ``variables``.
+
+        ``error`` records a failed request instead of a response; ``timeout``
+        marks it as a query timeout so replays shrink batches the same way.
+        """
+        entry: dict[str, Any] = {
+            "key": _key(query, variables),
+            "loose": _key(query, variables, loose=True),
+            "latency": round(latency, 4),
+        }
+        if error is not None:
+            entry["error"] = str(error)
+            entry["timeout"] = timeout
+        else:
+            entry["response"] = response
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self.count += 1
+
+    def close(self) -> None:
+        """Finish the cassette file."""
+        with self._lock:
+            self._file.close()
+
+
+class CassettePlayer:
+    """Serve recorded responses in place of GitHub.
+
+    Repeated requests get their recorded outcomes in order, the last one
+    repeating once they run out. With ``latency`` each answer waits as long
+    as the original response took. Recorded timeouts are raised as
+    ``timeout_error`` and other recorded failures as ``RuntimeError``.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        *,
+        latency: bool = False,
+        timeout_error: type[RuntimeError] = RuntimeError,
+    ) -> None:
+        self.path = cassette_path(directory)
+        self.latency = latency
+        self.timeout_error = timeout_error
+        self._entries: dict[str, list[dict[str, Any]]] = {}
+        self._loose: dict[str, list[dict[str, Any]]] = {}
+        self._served: dict[int, int] = {}
+        self._lock = threading.Lock()
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self._entries.setdefault(entry["key"], []).append(entry)
+                    self._loose.setdefault(entry["loose"], []).append(entry)
+        except EOFError:
+            pass  # cassette of an interrupted run; keep what was read
+        except OSError as exc:
+            raise RuntimeError(f"Cannot read cassette {self.path}: {exc}") from exc
+
+    def _next(self, query: str, variables: Mapping[str, Any]) -> dict[str, Any]:
+        entries = self._entries.get(_key(query, variables)) or self._loose.get(
+            _key(query, variables, loose=True)
+        )
+        if not entries:
+            raise RuntimeError(f"No recorded response in {self.path} for request")
+        with self._lock:
+            index = self._served.get(id(entries), 0)
+            self._served[id(entries)] = index + 1
+        return entries[min(index, len(entries) - 1)]
+
+    def play(self, query: str, variables: Mapping[str, Any]) -> dict:
+        """Return the recorded response, raising any recorded error."""
+        entry = self._next(query, variables)
+        if self.latency:
+            time.sleep(entry["latency"])
+        return self._outcome(entry)
+
+    async def aplay(self, query: str, variables: Mapping[str, Any]) -> dict:
+        """Coroutine version of :meth:`play`."""
+        entry = self._next(query, variables)
+        if self.latency:
+            await asyncio.sleep(entry["latency"])
+        return self._outcome(entry)
+
+    def _outcome(self, entry: Mapping[str, Any]) -> dict:
+        if "error" in entry:
+            error = self.timeout_error if entry.get("timeout") else RuntimeError
+            raise error(entry["error"])
+        return entry["response"]
@@ -0,0 +1,480 @@
+"""SQLite catalog of every repository record in the collected snapshots."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from itertools import repeat
+import json
+import os
+from pathlib import Path
+import re
+import sqlite3
+from types import TracebackType
+from typing import Any, NamedTuple
+
+import numpy as np
+
+from .cache import STATE_DIR
+from .snapshot import scan_snapshot, snapshot_paths
+
+
+_SNAPSHOT_NAME = re.compile(r"(.+)-(\d{8}T\d{6}Z)\.(?:nd)?json")
+# Bumped whenever the tables change; older catalogs are rebuilt from scratch.
+SCHEMA_VERSION = 3
+
+# Stored records re-summarized per statement when the summarizer changes.
+REBUILD_CHUNK = 10_000
+
+_TABLES = ("series", "repos", "partials", "latest", "records", "snapshots", "settings")
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    collected_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS records (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    owner TEXT NOT NULL,
+    name TEXT NOT NULL,
+    collected_at TEXT NOT NULL,
+    record TEXT NOT NULL,
+    summary TEXT,
+    PRIMARY KEY (snapshot_id, position)
+);
+CREATE INDEX IF NOT EXISTS records_by_repo
+    ON records (owner, name, collected_at, snapshot_id);
+CREATE TABLE IF NOT EXISTS latest (
+    owner TEXT NOT NULL,
+    name TEXT NOT NULL,
+    snapshot_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    collected_at TEXT NOT NULL,
+    PRIMARY KEY (owner, name)
+);
+CREATE INDEX IF NOT EXISTS latest_by_snapshot ON latest (snapshot_id);
+CREATE TABLE IF NOT EXISTS partials (
+    snapshot_id INTEGER PRIMARY KEY REFERENCES snapshots(id) ON DELETE CASCADE,
+    partial TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS repos (
+    id INTEGER PRIMARY KEY,
+    owner TEXT NOT NULL,
+    name TEXT NOT NULL,
+    UNIQUE (owner, name)
+);
+CREATE TABLE IF NOT EXISTS series (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id) ON DELETE CASCADE,
+    field TEXT NOT NULL,
+    repos BLOB NOT NULL,
+    points BLOB NOT NULL,
+    PRIMARY KEY (snapshot_id, field)
+);
+CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE VIEW IF NOT EXISTS latest_records AS
+    SELECT r.*, s.path
+    FROM latest l
+    JOIN records r USING (snapshot_id, position)
+    JOIN snapshots s ON s.id = l.snapshot_id;
+"""
+
+
+def catalog_path(data_dir: str | Path) -> Path:
+    """Return the snapshot catalog database for ``data_dir``."""
+    return Path(data_dir) / STATE_DIR / "catalog.sqlite"
+
+
+_Summarize = Callable[[dict[str, Any]], dict[str, Any]]
+
+
+def _identity(path: Path, meta: dict[str, Any]) -> tuple[str, str]:
+    """Return the owner and ``collected_at`` stamp of the snapshot at ``path``.
+
+    Both come from the ``_meta`` record or the ``<user>-<ts>`` file name;
+    legacy snapshots without either fall back to no owner and the file's
+    modification time.
+    """
+    match = _SNAPSHOT_NAME.fullmatch(path.name)
+    owner = meta.get("user") or (match.group(1) if match else "")
+    collected_at = meta.get("collected_at") or (match.group(2) if match else None)
+    if not collected_at:
+        mtime = datetime.fromtimestamp(path.stat().st_mtime, timezone.utc)
+        collected_at = mtime.strftime("%Y%m%dT%H%M%SZ")
+    return str(owner), str(collected_at)
+
+
+def _summary(summarize: _Summarize | None, record: dict[str, Any]) -> str | None:
+    if summarize is None:
+        return None
+    return json.dumps(summarize(record), separators=(",", ":"))
+
+
+class _Parsed(NamedTuple):
+    """One parsed snapshot, reduced to strings so it pickles cheaply.
+
+    ``rows`` holds each record's name, compact JSON and summary JSON.
+    """
+
+    sha256: str
+    owner: str
+    collected_at: str
+    rows: list[tuple[str, str, str | None]]
+
+
+def _parse(path: Path, summarize: _Summarize | None) -> _Parsed:
+    """Parse and summarize one snapshot; runs in a worker process."""
+    records, meta, sha256 = scan_snapshot(path)
+    owner, collected_at = _identity(path, meta)
+    rows = [
+        (
+            str(record.get("name") or f"#{position}"),
+            json.dumps(record, separators=(",", ":")),
+            _summary(summarize, record),
+        )
+        for position, record in enumerate(records)
+    ]
+    return _Parsed(sha256, owner, collected_at, rows)
+
+
+class Catalog:
+    """One row per (snapshot, repository), ingested once per snapshot file.
+
+    :meth:`sync` adds new snapshots, re-reads ones whose content changed
+    (size or mtime differ and so does the SHA-256) and drops deleted ones.
+    The ``latest`` table keeps each repository's newest record (keyed by the
+    snapshot's owner and the repo name) up to date as snapshots come and
+    go, so reading the current state does not grow with the number of
+    snapshots kept.
+
+    ``summarize`` derives a compact summary from each record as it is
+    ingested and ``combine`` folds summaries into a partial aggregate;
+    partials are cached per snapshot over the records it is still latest
+    for and only recomputed when that set changes. Numeric summary fields
+    are likewise packed per snapshot for :meth:`series`. ``summary_key``
+    names the summarizer's output format: cached summaries made under
+    another key are rebuilt from the stored records.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        summarize: _Summarize | None = None,
+        combine: Callable[[Iterable[dict[str, Any]]], dict[str, Any]] | None = None,
+        summary_key: str = "",
+    ) -> None:
+        self.path = Path(path)
+        self.summarize = summarize
+        self.combine = combine
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path)
+        self._db.execute("PRAGMA foreign_keys = ON")
+        self._db.execute("PRAGMA journal_mode = WAL")
+        (version,) = self._db.execute("PRAGMA user_version").fetchone()
+        if version != SCHEMA_VERSION:
+            with self._db:
+                self._db.execute("DROP VIEW IF EXISTS latest_records")
+                for table in _TABLES:
+                    self._db.execute(f"DROP TABLE IF EXISTS {table}")
+                self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._db.executescript(_SCHEMA)
+        if summarize is not None:
+            self._check_summaries(summary_key)
+
+    def _check_summaries(self, summary_key: str) -> None:
+        """Rebuild summaries, partials and series of a different summarizer."""
+        row = self._db.execute(
+            "SELECT value FROM settings WHERE key = 'summary_key'"
+        ).fetchone()
+        if row is not None and row[0] == summary_key:
+            return
+        with self._db:
+            # walk the records in key order so only one chunk is held at once
+            after = (-1, -1)
+            while rows := self._db.execute(
+                "SELECT snapshot_id, position, record FROM records"
+                " WHERE (snapshot_id, position) > (?, ?)"
+                " ORDER BY snapshot_id, position LIMIT ?",
+                (*after, REBUILD_CHUNK),
+            ).fetchall():
+                self._db.executemany(
+                    "UPDATE records SET summary = ?"
+                    " WHERE snapshot_id = ? AND position = ?",
+                    (
+                        (
+                            _summary(self.summarize, json.loads(record)),
+                            snapshot_id,
+                            position,
+                        )
+                        for snapshot_id, position, record in rows
+                    ),
+                )
+                after = rows[-1][:2]
+            self._db.execute("DELETE FROM partials")
+            self._db.execute("DELETE FROM series")
+            self._db.execute(
+                "INSERT OR REPLACE INTO settings VALUES ('summary_key', ?)",
+                (summary_key,),
+            )
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._db.close()
+
+    def __enter__(self) -> Catalog:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def sync(self, data_dir: str | Path, *, workers: int = 1) -> int:
+        """Bring the catalog in line with ``data_dir`` and return files ingested.
+
+        New and changed snapshots are parsed by up to ``workers`` processes
+        (``0`` means one per CPU) and ingested in file name order, so the
+        result does not depend on the worker count.
+        """
+        known = {
+            path: (snapshot_id, size, mtime_ns, sha256)
+            for snapshot_id, path, size, mtime_ns, sha256 in self._db.execute(
+                "SELECT id, path, size, mtime_ns, sha256 FROM snapshots"
+            )
+        }
+        changed: list[tuple[Path, str, os.stat_result]] = []
+        seen = set()
+        for path in snapshot_paths(data_dir):
+            key = str(path.resolve())
+            seen.add(key)
+            st = path.stat()
+            entry = known.get(key)
+            if entry is None or entry[1:3] != (st.st_size, st.st_mtime_ns):
+                changed.append((path, key, st))
+        ingested = 0
+        parsed_files = self._parse_all([path for path, _, _ in changed], workers)
+        for (path, key, st), parsed in zip(changed, parsed_files):
+            entry = known.get(key)
+            with self._db:
+                if entry is not None and entry[3] == parsed.sha256:
+                    # touched or copied without changing content
+                    self._db.execute(
+                        "UPDATE snapshots SET size = ?, mtime_ns = ? WHERE id = ?",
+                        (st.st_size, st.st_mtime_ns, entry[0]),
+                    )
+                    continue
+                if entry is not None:
+                    self._drop(entry[0])
+                self._ingest(parsed, key, st.st_size, st.st_mtime_ns)
+            ingested += 1
+        for key, (snapshot_id, *_) in known.items():
+            if key not in seen:
+                with self._db:
+                    self._drop(snapshot_id)
+        if ingested and self.summarize is None:
+            # rows were added without summaries; rebuild them on next use
+            with self._db:
+                self._db.execute("DELETE FROM settings WHERE key = 'summary_key'")
+        return ingested
+
+    def _parse_all(self, paths: list[Path], workers: int) -> Iterator[_Parsed]:
+        """Yield :func:`_parse` results for ``paths`` in order."""
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1 or len(paths) <= 1:
+            for path in paths:
+                yield _parse(path, self.summarize)
+            return
+        with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+            yield from pool.map(_parse, paths, repeat(self.summarize))
+
+    def _ingest(self, parsed: _Parsed, key: str, size: int, mtime_ns: int) -> None:
+        cursor = self._db.execute(
+            "INSERT INTO snapshots (path, size, mtime_ns, sha256, owner, collected_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (key, size, mtime_ns, parsed.sha256, parsed.owner, parsed.collected_at),
+        )
+        snapshot_id = cursor.lastrowid
+        rows = (
+            (
+                snapshot_id,
+                position,
+                parsed.owner,
+                name,
+                parsed.collected_at,
+                record,
+                summary,
+            )
+            for position, (name, record, summary) in enumerate(parsed.rows)
+        )
+        self._db.executemany("INSERT INTO records VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        # partials of snapshots whose records this one may supersede
+        self._db.execute(
+            "DELETE FROM partials WHERE snapshot_id IN ("
+            " SELECT l.snapshot_id FROM records r JOIN latest l USING (owner, name)"
+            " WHERE r.snapshot_id = ?)",
+            (snapshot_id,),
+        )
+        self._db.execute(
+            "INSERT INTO latest (owner, name, snapshot_id, position, collected_at)"
+            " SELECT owner, name, snapshot_id, position, collected_at"
+            " FROM records WHERE snapshot_id = ? AND true"
+            " ON CONFLICT (owner, name) DO UPDATE SET"
+            " snapshot_id = excluded.snapshot_id,"
+            " position = excluded.position,"
+            " collected_at = excluded.collected_at"
+            " WHERE (excluded.collected_at, excluded.snapshot_id)"
+            " >= (latest.collected_at, latest.snapshot_id)",
+            (snapshot_id,),
+        )
+
+    def _drop(self, snapshot_id: int) -> None:
+        """Delete one snapshot and repoint ``latest`` at older records."""
+        stale = self._db.execute(
+            "SELECT owner, name FROM latest WHERE snapshot_id = ?", (snapshot_id,)
+        ).fetchall()
+        self._db.execute("DELETE FROM latest WHERE snapshot_id = ?", (snapshot_id,))
+        self._db.execute("DELETE FROM snapshots WHERE id = ?", (snapshot_id,))
+        self._db.executemany(
+            "INSERT INTO latest (owner, name, snapshot_id, position, collected_at)"
+            " SELECT owner, name, snapshot_id, position, collected_at FROM records"
+            " WHERE owner = ? AND name = ?"
+            " ORDER BY collected_at DESC, snapshot_id DESC LIMIT 1",
+            stale,
+        )
+        self._db.executemany(
+            "DELETE FROM partials WHERE snapshot_id IN ("
+            " SELECT snapshot_id FROM latest WHERE owner = ? AND name = ?)",
+            stale,
+        )
+
+    def latest(self) -> Iterator[dict[str, Any]]:
+        """Yield the newest record of every repository in snapshot order."""
+        for (record,) in self._db.execute(
+            "SELECT record FROM latest_records ORDER BY path, position"
+        ):
+            yield json.loads(record)
+
+    def latest_summaries(self) -> Iterator[dict[str, Any]]:
+        """Yield the summary of every repository's newest record."""
+        for (summary,) in self._db.execute(
+            "SELECT summary FROM latest_records ORDER BY path, position"
+        ):
+            yield json.loads(summary)
+
+    def partials(self) -> list[dict[str, Any]]:
+        """Return one partial aggregate per snapshot holding latest records.
+
+        Missing partials are computed with ``combine`` and cached.
+        """
+        if self.combine is None:
+            raise RuntimeError("Catalog has no combine function")
+        with self._db:
+            stale = self._db.execute(
+                "SELECT DISTINCT snapshot_id FROM latest"
+                " WHERE snapshot_id NOT IN (SELECT snapshot_id FROM partials)"
+            ).fetchall()
+            for (snapshot_id,) in stale:
+                summaries = (
+                    json.loads(summary)
+                    for (summary,) in self._db.execute(
+                        "SELECT summary FROM latest_records WHERE snapshot_id = ?",
+                        (snapshot_id,),
+                    )
+                )
+                partial = self.combine(summaries)
+                self._db.execute(
+                    "INSERT INTO partials VALUES (?, ?)",
+                    (snapshot_id, json.dumps(partial, separators=(",", ":"))),
+                )
+            return [
+                json.loads(partial)
+                for (partial,) in self._db.execute(
+                    "SELECT partial FROM partials WHERE snapshot_id IN"
+                    " (SELECT snapshot_id FROM latest) ORDER BY snapshot_id"
+                )
+            ]
+
+    def history(self, owner: str, name: str) -> Iterator[tuple[str, dict[str, Any]]]:
+        """Yield ``(collected_at, record)`` for one repository, oldest first."""
+        for collected_at, record in self._db.execute(
+            "SELECT collected_at, record FROM records WHERE owner = ? AND name = ?"
+            " ORDER BY collected_at, snapshot_id",
+            (owner, name),
+        ):
+            yield collected_at, json.loads(record)
+
+    def stamps(self) -> dict[int, str]:
+        """Return the ``collected_at`` stamp of every snapshot by id."""
+        return dict(self._db.execute("SELECT id, collected_at FROM snapshots"))
+
+    def series(self, field: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return ``(repos, snapshot_ids, values)`` columns of a summary field.
+
+        Every record contributes one point: its repository's id, its
+        snapshot and the numeric ``field`` of its summary (``nan`` when
+        missing). Points are ordered by collection time. Each snapshot's
+        points are packed once into a cached blob, so later calls do not
+        touch the records.
+        """
+        with self._db:
+            stale = self._db.execute(
+                "SELECT id FROM snapshots WHERE id NOT IN"
+                " (SELECT snapshot_id FROM series WHERE field = ?)",
+                (field,),
+            ).fetchall()
+            for (snapshot_id,) in stale:
+                self._db.execute(
+                    "INSERT OR IGNORE INTO repos (owner, name)"
+                    " SELECT owner, name FROM records WHERE snapshot_id = ?",
+                    (snapshot_id,),
+                )
+                points = self._db.execute(
+                    "SELECT p.id, json_extract(r.summary, ?) FROM records r"
+                    " JOIN repos p USING (owner, name) WHERE r.snapshot_id = ?",
+                    ("$." + field, snapshot_id),
+                ).fetchall()
+                ids = np.array([repo for repo, _ in points], dtype=np.int32)
+                values = np.array([value for _, value in points], dtype=np.float64)
+                self._db.execute(
+                    "INSERT INTO series VALUES (?, ?, ?, ?)",
+                    (snapshot_id, field, ids.tobytes(), values.tobytes()),
+                )
+            rows = self._db.execute(
+                "SELECT s.id, p.repos, p.points FROM series p"
+                " JOIN snapshots s ON s.id = p.snapshot_id WHERE p.field = ?"
+                " ORDER BY s.collected_at, s.id",
+                (field,),
+            ).fetchall()
+        repos = np.frombuffer(b"".join(row[1] for row in rows), dtype=np.int32)
+        values = np.frombuffer(b"".join(row[2] for row in rows), dtype=np.float64)
+        counts = [len(row[1]) // 4 for row in rows]
+        snapshots = np.repeat([row[0] for row in rows], counts).astype(np.int64)
+        return repos.astype(np.int64), snapshots, values
+
+    def repos(self) -> dict[int, tuple[str, str]]:
+        """Return the ``(owner, name)`` of every repository id of :meth:`series`."""
+        return {
+            repo: (owner, name)
+            for repo, owner, name in self._db.execute(
+                "SELECT id, owner, name FROM repos"
+            )
+        }
+
+    def latest_values(self, field: str) -> dict[tuple[str, str], Any]:
+        """Return a summary field of every repository's newest record."""
+        return {
+            (owner, name): value
+            for owner, name, value in self._db.execute(
+                "SELECT owner, name, json_extract(summary, ?) FROM latest_records",
+                ("$." + field,),
+            )
+        }
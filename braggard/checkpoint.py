@@ -0,0 +1,108 @@
+"""Checkpoints that let an interrupted ``collect`` run resume."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+import threading
+from typing import IO, Any
+
+from .cache import STATE_DIR
+
+
+def checkpoint_path(data_dir: str | Path, user: str) -> Path:
+    """Return where ``user``'s collection checkpoint is kept."""
+    return Path(data_dir) / STATE_DIR / "checkpoints" / f"{user}.ndjson"
+
+
+class Checkpoint:
+    """Progress of one collection run, persisted after every step.
+
+    Records when the run started (naming its snapshot), the repository
+    pagination cursor, the repository nodes listed so far and the names of
+    repositories whose records are already flushed to the snapshot's part
+    file. The file is a journal: a header line followed by one line per
+    listed page or finished batch, so each step appends only what changed.
+    """
+
+    def __init__(self, path: str | Path, collected_at: str) -> None:
+        self.path = Path(path)
+        self.collected_at = collected_at
+        self.after: str | None = None
+        self.listing_complete = False
+        self.listed: list[dict[str, Any]] = []
+        self.done: set[str] = set()
+        self._lock = threading.Lock()
+        self._file: IO[str] | None = None
+        # Length of the journal's intact prefix when continuing a loaded one.
+        self._keep: int | None = None
+
+    @classmethod
+    def load(cls, path: str | Path) -> Checkpoint | None:
+        """Return the checkpoint stored at ``path`` or ``None``.
+
+        A torn final line left by an interrupted write is ignored.
+        """
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        end = data.rfind(b"\n") + 1
+        try:
+            entries = [json.loads(line) for line in data[:end].splitlines()]
+        except ValueError:
+            return None
+        if not entries or "collected_at" not in entries[0]:
+            return None
+        checkpoint = cls(path, str(entries[0]["collected_at"]))
+        for entry in entries[1:]:
+            if "listed" in entry:
+                checkpoint.listed.extend(entry["listed"])
+                if entry.get("after") is None:
+                    checkpoint.listing_complete = True
+                else:
+                    checkpoint.after = entry["after"]
+            checkpoint.done.update(entry.get("done", []))
+        checkpoint._keep = end
+        return checkpoint
+
+    def record_page(self, nodes: list[dict[str, Any]], after: str | None) -> None:
+        """Note a listed page; ``after`` is ``None`` once listing is complete."""
+        with self._lock:
+            self.listed.extend(nodes)
+            if after is None:
+                self.listing_complete = True
+            else:
+                self.after = after
+            self._append_locked({"listed": nodes, "after": after})
+
+    def record_done(self, names: list[str]) -> None:
+        """Note repositories whose records have been flushed to disk."""
+        with self._lock:
+            self.done.update(names)
+            self._append_locked({"done": names})
+
+    def _append_locked(self, entry: dict[str, Any]) -> None:
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if self._keep is None:
+                self._file = open(self.path, "w", encoding="utf-8")
+                self._file.write(json.dumps({"collected_at": self.collected_at}) + "\n")
+            else:
+                self._file = open(self.path, "a", encoding="utf-8")
+                self._file.truncate(self._keep)
+        self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        """Close the journal, keeping it on disk for a later resume."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def remove(self) -> None:
+        """Delete the checkpoint after a successful run."""
+        self.close()
+        self.path.unlink(missing_ok=True)
@@ -5,6 +5,7 @@ from __future__ import annotations
 import click
 from braggard import __version__
 
+from .bench import run_benchmark
 from .collector import collect
 from .analyzer import analyze
 from .renderer import render
@@ -18,7 +19,7 @@ def main() -> None:
 
 
 @main.command()
-@click.argument("user")
+@click.argument("users", nargs=-1, required=True)
 @click.option("--token", envvar="BRAGGARD_TOKEN")
 @click.option("--include-private", is_flag=True)
 @click.option("--since")
@@ -26,22 +27,92 @@ def main() -> None:
 @click.option(
     "--full-history", is_flag=True, help="Collect commit counts for entire repo history"
 )
+@click.option(
+    "--batch-size", type=int, help="Repositories per aliased GraphQL stats query"
+)
+@click.option(
+    "--engine",
+    type=click.Choice(["thread", "async"]),
+    default="thread",
+    help="Run requests on a thread pool or as asyncio coroutines",
+)
+@click.option(
+    "--no-cache", is_flag=True, help="Bypass the on-disk GraphQL response cache"
+)
+@click.option(
+    "--refresh", is_flag=True, help="Ignore cached responses but store fresh ones"
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="Only query repos pushed since the latest snapshot",
+)
+@click.option(
+    "--resume", is_flag=True, help="Continue an interrupted run from its checkpoint"
+)
+@click.option(
+    "--weekly-history",
+    is_flag=True,
+    help="Also collect weekly commit histograms",
+)
+@click.option(
+    "--hedge",
+    is_flag=True,
+    help="Duplicate requests slower than the observed p95 latency",
+)
+@click.option(
+    "--record",
+    type=click.Path(file_okay=False),
+    help="Save every GitHub request and response to a cassette in this directory",
+)
+@click.option(
+    "--replay",
+    type=click.Path(exists=True, file_okay=False),
+    help="Serve responses from a recorded cassette instead of GitHub",
+)
+@click.option(
+    "--replay-latency",
+    is_flag=True,
+    help="Wait out each recorded response time while replaying",
+)
 def collect_cmd(
-    user: str,
+    users: tuple[str, ...],
     token: str | None,
     include_private: bool,
     since: str | None,
     data_dir: str | None,
     full_history: bool,
+    batch_size: int | None,
+    engine: str,
+    no_cache: bool,
+    refresh: bool,
+    incremental: bool,
+    resume: bool,
+    weekly_history: bool,
+    hedge: bool,
+    record: str | None,
+    replay: str | None,
+    replay_latency: bool,
 ) -> None:
-    """Fetch data from GitHub."""
+    """Fetch data from GitHub for one or more users and organizations."""
     collect(
-        user=user,
+        user=list(users),
         token=token,
         include_private=include_private,
         since=since,
         data_dir=data_dir,
         full_history=full_history,
+        batch_size=batch_size,
+        engine=engine,
+        cache=False if no_cache else None,
+        refresh=refresh,
+        incremental=incremental,
+        resume=resume,
+        weekly_history=True if weekly_history else None,
+        hedge=True if hedge else None,
+        record=record,
+        replay=replay,
+        replay_latency=replay_latency,
     )
 
 
@@ -85,6 +156,74 @@ def render_cmd(output_dir: str, summary_path: str, output_format: str) -> None:
     )
 
 
+@main.command()
+@click.option(
+    "--repos",
+    default=1000,
+    type=click.IntRange(10, 100_000),
+    help="Repositories in the synthetic portfolio",
+)
+@click.option("--latency", default=0.0, help="Mean fake response time in seconds")
+@click.option(
+    "--error-rate", default=0.0, help="Share of requests failing with HTTP 503"
+)
+@click.option(
+    "--timeout-rate", default=0.0, help="Share of requests failing with HTTP 502"
+)
+@click.option("--budget", type=int, help="Rate-limit points per reset window")
+@click.option(
+    "--engine",
+    type=click.Choice(["thread", "async"]),
+    default="thread",
+    help="Run requests on a thread pool or as asyncio coroutines",
+)
+@click.option(
+    "--batch-size", type=int, help="Repositories per aliased GraphQL stats query"
+)
+@click.option("--max-concurrency", type=int, help="Most requests kept in flight")
+@click.option(
+    "--max-connections",
+    type=int,
+    help="Pooled HTTP connections (default: enough for --max-concurrency)",
+)
+@click.option(
+    "--weekly-history",
+    is_flag=True,
+    help="Also collect weekly commit histograms",
+)
+def bench_cmd(
+    repos: int,
+    latency: float,
+    error_rate: float,
+    timeout_rate: float,
+    budget: int | None,
+    engine: str,
+    batch_size: int | None,
+    max_concurrency: int | None,
+    max_connections: int | None,
+    weekly_history: bool,
+) -> None:
+    """Benchmark collection against a local fake GitHub."""
+    result = run_benchmark(
+        repos=repos,
+        latency=latency,
+        error_rate=error_rate,
+        timeout_rate=timeout_rate,
+        budget=budget,
+        engine=engine,
+        batch_size=batch_size,
+        max_concurrency=max_concurrency,
+        max_connections=max_connections,
+        weekly_history=weekly_history,
+    )
+    click.echo(f"repos:        {result['repos']}")
+    click.echo(f"requests:     {result['requests']}")
+    click.echo(f"retries:      {result['retries']}")
+    click.echo(f"wall time:    {result['wall_time']:.2f}s")
+    click.echo(f"requests/sec: {result['requests_per_sec']:.1f}")
+    click.echo(f"peak memory:  {result['peak_memory_mb']:.1f} MiB")
+
+
 @main.command()
 def deploy_cmd() -> None:
     """Deploy docs to gh-pages."""
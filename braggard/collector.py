@@ -2,207 +2,1636 @@
 
 from __future__ import annotations
 
+import asyncio
+from collections import Counter
+from collections.abc import Generator, Sequence
+from contextlib import ExitStack
 from datetime import datetime, timedelta
 import json
 import logging
 from pathlib import Path
-import urllib.request
-from urllib.error import HTTPError, URLError
-from concurrent.futures import ThreadPoolExecutor
-from typing import Any
+from http.client import HTTPException
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from typing import Any, NamedTuple, TypeVar
 
-from .config import Config, load_config
+from .cache import ResponseCache, cache_dir
+from .cassette import CassettePlayer, CassetteRecorder
+from .checkpoint import Checkpoint, checkpoint_path
+from .config import CacheConfig, Config, load_config
+from .history import HistoryStore, history_path, iso_week
+from .metrics import MetricStore, metrics_path
+from .scheduler import (
+    DEFAULT_MAX_CONCURRENCY,
+    AsyncFairQueue,
+    FairQueue,
+    Scheduler,
+)
+from .retry import DEFAULT_MAX_RETRIES, RetryPolicy, retry_scope
+from .sizing import AdaptiveSize
+from .session import DEFAULT_MAX_CONNECTIONS, AsyncSession, Response, Session
+from .snapshot import (
+    PART_SUFFIX,
+    SnapshotWriter,
+    iter_records,
+    latest_snapshot,
+    snapshot_name,
+    user_snapshots,
+)
 from . import __version__
 
 
 GITHUB_GRAPHQL_URL = "https://api.github.com/graphql"
+DEFAULT_BATCH_SIZE = 25
+# How often a throttled request is retried after waiting out the limit.
+MAX_THROTTLE_RETRIES = 3
+ENGINES = ("thread", "async")
+# Largest page sizes GitHub allows for repository listings and commit history.
+REPO_PAGE_SIZE = 100
+HISTORY_PAGE_SIZE = 100
+# Languages fetched inline with each listed repository; repos with more are
+# paged separately.
+LANGUAGES_FIRST = 10
+DEFAULT_CI_WINDOW = 100
+# Check-suite nodes requested per stats query. GitHub charges roughly one
+# point per hundred requested nodes, so wide batches get shallower pages.
+CI_NODE_BUDGET = 1000
+# Stats batches queued per worker before the repo listing waits for them.
+PIPELINE_DEPTH = 2
 
 
-def _request(query: str, variables: dict[str, str | None], token: str | None) -> dict:
-    """Execute a GraphQL request and return the parsed JSON."""
+_session: Session | None = None
+_session_lock = threading.Lock()
+
+
+def _get_session(max_connections: int | None = None) -> Session:
+    """Return the shared connection pool for ``GITHUB_GRAPHQL_URL``.
+
+    The pool is created lazily and replaced when the endpoint or the requested
+    ``max_connections`` bound changes.
+    """
+    global _session
+    with _session_lock:
+        if (
+            _session is None
+            or _session.url != GITHUB_GRAPHQL_URL
+            or (max_connections and _session.max_connections != max_connections)
+        ):
+            if _session is not None:
+                _session.close()
+            _session = Session(
+                GITHUB_GRAPHQL_URL,
+                max_connections=max_connections or DEFAULT_MAX_CONNECTIONS,
+            )
+        return _session
+
+
+_scheduler: Scheduler | None = None
+_async_session: tuple[asyncio.AbstractEventLoop, AsyncSession] | None = None
+# Response cache for the current ``collect`` run; ``None`` disables caching.
+_cache: ResponseCache | None = None
+# Adaptive page and batch sizes keyed by query shape.
+_sizes: dict[str, AdaptiveSize] = {}
+# Retry policy and counters, replaced at the start of each ``collect`` run.
+_retry = RetryPolicy()
+_hedge_pool: ThreadPoolExecutor | None = None
+# Cassette recording or replaying the current ``collect`` run's traffic.
+_cassette: CassetteRecorder | CassettePlayer | None = None
+
+
+def _get_scheduler(max_concurrency: int | None = None) -> Scheduler:
+    """Return the shared request scheduler, resizing it when requested."""
+    global _scheduler
+    with _session_lock:
+        if _scheduler is None or (
+            max_concurrency and _scheduler.max_concurrency != max_concurrency
+        ):
+            _scheduler = Scheduler(
+                max_concurrency=max_concurrency or DEFAULT_MAX_CONCURRENCY
+            )
+        return _scheduler
+
+
+def _get_size(shape: str, maximum: int) -> AdaptiveSize:
+    """Return the adaptive size for ``shape``, capped at ``maximum``."""
+    with _session_lock:
+        size = _sizes.get(shape)
+        if size is None:
+            size = _sizes[shape] = AdaptiveSize(maximum)
+        elif size.maximum != maximum:
+            size.set_maximum(maximum)
+        return size
+
+
+def _get_async_session(max_connections: int | None = None) -> AsyncSession:
+    """Return the connection pool for the running event loop.
+
+    Asyncio streams are bound to the loop that opened them, so each loop gets
+    its own pool sized like the threaded one.
+    """
+    global _async_session
+    loop = asyncio.get_running_loop()
+    if (
+        _async_session is None
+        or _async_session[0] is not loop
+        or _async_session[1].url != GITHUB_GRAPHQL_URL
+        or (max_connections and _async_session[1].max_connections != max_connections)
+    ):
+        limit = max_connections or (
+            _session.max_connections if _session else DEFAULT_MAX_CONNECTIONS
+        )
+        _async_session = (loop, AsyncSession(GITHUB_GRAPHQL_URL, max_connections=limit))
+    return _async_session[1]
+
+
+def _encode_request(
+    query: str, variables: dict[str, Any], token: str | None
+) -> tuple[bytes, dict[str, str]]:
+    """Return the POST body and headers for one GraphQL call."""
     payload = json.dumps({"query": query, "variables": variables}).encode()
-    headers = {"Accept": "application/json", "User-Agent": f"braggard/{__version__}"}
+    headers = {
+        "Accept": "application/json",
+        "Content-Type": "application/json",
+        "User-Agent": f"braggard/{__version__}",
+    }
     if token:
         headers["Authorization"] = f"bearer {token}"
-    req = urllib.request.Request(
-        GITHUB_GRAPHQL_URL, data=payload, headers=headers, method="POST"
-    )
+    return payload, headers
+
+
+def _decode_response(resp: Response) -> Any:
+    """Parse ``resp`` as JSON, raising :class:`RuntimeError` on garbage."""
     try:
-        with urllib.request.urlopen(req) as resp:  # type: ignore[attr-defined]
-            data = json.load(resp)
-    except (HTTPError, URLError) as exc:  # pragma: no cover - network errors
+        return resp.json() if resp.body else {}
+    except ValueError as exc:
         msg = f"Request to GitHub failed: {exc}"
         logging.error(msg)
         raise RuntimeError(msg) from exc
+
+
+def _record_response(scheduler: Scheduler, resp: Response, data: Any) -> float | None:
+    """Feed ``resp`` to ``scheduler`` and return a retry delay if throttled."""
+    body = data if isinstance(data, dict) else {}
+    return scheduler.record(
+        resp.status,
+        resp.headers,
+        (body.get("data") or {}).get("rateLimit"),
+        secondary="secondary rate limit" in str(body.get("message", "")).lower(),
+    )
+
+
+class QueryTimeout(RuntimeError):
+    """GitHub gave up on a query, usually because it asked for too much."""
+
+
+def _check_response(resp: Response, data: Any, partial: bool) -> dict:
+    """Raise :class:`RuntimeError` for HTTP or GraphQL errors in ``data``.
+
+    Gateway errors and GraphQL timeouts raise :class:`QueryTimeout` so
+    callers can retry with a smaller page or batch.
+    """
+    if resp.status in (502, 504):
+        msg = f"Request to GitHub timed out: HTTP {resp.status}"
+        logging.warning(msg)
+        raise QueryTimeout(msg)
+    if resp.status >= 400:
+        msg = f"Request to GitHub failed: HTTP {resp.status}"
+        logging.error(msg)
+        raise RuntimeError(msg)
     if isinstance(data, dict) and data.get("errors"):
+        if partial and data.get("data"):
+            return data
+        if not data.get("data") and "timeout" in str(data["errors"]).lower():
+            msg = f"GitHub query timed out: {data['errors']}"
+            logging.warning(msg)
+            raise QueryTimeout(msg)
         msg = f"GitHub API errors: {data['errors']}"
         logging.error(msg)
         raise RuntimeError(msg)
     return data
 
 
-def collect(
+def _get_hedge_pool() -> ThreadPoolExecutor:
+    """Return the threads that run hedged requests for the thread engine."""
+    global _hedge_pool
+    with _session_lock:
+        if _hedge_pool is None:
+            workers = 2 * (_scheduler.max_concurrency if _scheduler else 8)
+            _hedge_pool = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="braggard-hedge"
+            )
+        return _hedge_pool
+
+
+def _post(scheduler: Scheduler, payload: bytes, headers: dict[str, str]) -> Response:
+    """POST once inside a scheduler slot, recording the latency."""
+    with scheduler.slot():
+        started = time.monotonic()
+        resp = _get_session().post(payload, headers)
+    _retry.observe(time.monotonic() - started)
+    return resp
+
+
+def _send(scheduler: Scheduler, payload: bytes, headers: dict[str, str]) -> Response:
+    """POST ``payload``, hedging with a duplicate once it runs past p95."""
+    hedge_after = _retry.hedge_after()
+    if hedge_after is None:
+        return _post(scheduler, payload, headers)
+    pool = _get_hedge_pool()
+    primary = pool.submit(_post, scheduler, payload, headers)
+    done, _ = wait([primary], timeout=hedge_after)
+    if done:
+        return primary.result()
+    _retry.count_hedge()
+    backup = pool.submit(_post, scheduler, payload, headers)
+    done, _ = wait([primary, backup], return_when=FIRST_COMPLETED)
+    first = done.pop()
+    other = backup if first is primary else primary
+    try:
+        resp = first.result()
+    except (HTTPException, OSError):
+        first, resp = other, other.result()
+    if first is backup:
+        _retry.count_hedge(won=True)
+    return resp
+
+
+def _request(
+    query: str,
+    variables: dict[str, Any],
+    token: str | None,
     *,
-    user: str | None = None,
-    token: str | None = None,
-    include_private: bool | None = None,
-    since: str | None = None,
-    data_dir: str | Path | None = None,
-    full_history: bool = False,
+    partial: bool = False,
+) -> dict:
+    """Execute a GraphQL request and return the parsed JSON.
+
+    While a cassette is replaying, the recorded outcome is returned without
+    touching the network; while one is recording, every outcome is saved.
+    See :func:`_fetch` for ``partial``, throttling and retries.
+    """
+    cassette = _cassette
+    if isinstance(cassette, CassettePlayer):
+        return cassette.play(query, variables)
+    started = time.monotonic()
+    try:
+        data = _fetch(query, variables, token, partial=partial)
+    except RuntimeError as exc:
+        _record_cassette(query, variables, started, error=exc)
+        raise
+    _record_cassette(query, variables, started, response=data)
+    return data
+
+
+def _record_cassette(
+    query: str,
+    variables: dict[str, Any],
+    started: float,
+    *,
+    response: dict | None = None,
+    error: RuntimeError | None = None,
 ) -> None:
-    """Fetch repository metadata and store raw JSON snapshots.
+    """Save one request outcome to the recording cassette, if any."""
+    cassette = _cassette
+    if isinstance(cassette, CassetteRecorder):
+        cassette.record(
+            query,
+            variables,
+            time.monotonic() - started,
+            response=response,
+            error=error,
+            timeout=isinstance(error, QueryTimeout),
+        )
 
-    Parameters mirror the CLI. ``include_private`` only takes effect when a
-    ``token`` with appropriate scopes is supplied. ``since`` filters repositories
-    by ``pushed_at`` timestamp when provided. ``user`` and ``include_private``
-    default to values from ``braggard.toml`` when omitted. ``data_dir`` controls
-    where snapshot JSON files are written and defaults to ``paths.data_dir`` in
-    ``braggard.toml``.
-    ``full_history`` determines whether commit counts span the entire
-    repository lifetime instead of the default ``metrics.commit_history_years``
-    window from ``braggard.toml``.
+
+def _fetch(
+    query: str,
+    variables: dict[str, Any],
+    token: str | None,
+    *,
+    partial: bool = False,
+) -> dict:
+    """Send a GraphQL request to GitHub and return the parsed JSON.
+
+    ``partial`` keeps responses that carry both ``data`` and ``errors`` so
+    aliased batch queries can salvage the aliases that did resolve.
+    Throttled requests wait for the scheduler; transient failures (see
+    :class:`~braggard.retry.RetryPolicy`) are retried after a jittered
+    backoff.
     """
-    cfg: Config | None = None
-    if user is None or include_private is None or data_dir is None:
-        cfg = load_config()
-        if user is None:
-            user = cfg.user.handle
-        if include_private is None:
-            include_private = cfg.user.include_private
-        if data_dir is None:
-            data_dir = cfg.paths.data_dir
-    data_dir = Path(data_dir)
-    if user is None:
-        raise ValueError("user must be provided")
+    payload, headers = _encode_request(query, variables, token)
+    scheduler = _get_scheduler()
+    throttles = retries = 0
+    while True:
+        try:
+            resp = _send(scheduler, payload, headers)
+        except TimeoutError as exc:
+            msg = f"Request to GitHub timed out: {exc}"
+            logging.warning(msg)
+            raise QueryTimeout(msg) from exc
+        except (HTTPException, OSError) as exc:
+            if _retry.should_retry(retries, exc=exc):
+                pause = _retry.backoff(retries)
+                retries += 1
+                _retry.count_retry()
+                logging.warning("Request to GitHub failed (%s); retrying", exc)
+                time.sleep(pause)
+                continue
+            msg = f"Request to GitHub failed: {exc}"
+            logging.error(msg)
+            raise RuntimeError(msg) from exc
+        data = _decode_response(resp)
+        delay = _record_response(scheduler, resp, data)
+        if delay is not None and throttles < MAX_THROTTLE_RETRIES:
+            throttles += 1
+            _retry.count_retry()
+            logging.warning("GitHub rate limit hit; retrying in %.1fs", delay)
+            continue
+        if delay is None and _retry.should_retry(retries, status=resp.status):
+            pause = _retry.backoff(retries)
+            retries += 1
+            _retry.count_retry()
+            logging.warning("GitHub returned HTTP %d; retrying", resp.status)
+            time.sleep(pause)
+            continue
+        return _check_response(resp, data, partial)
 
-    repo_query = """
-    query($login: String!, $after: String) {
-      user(login: $login) {
-        repositories(first: 100, after: $after, ownerAffiliations: OWNER, orderBy: {field: UPDATED_AT, direction: DESC}) {
-          nodes {
-            name
-            description
-            stargazerCount
-            forkCount
-            primaryLanguage { name }
-            isPrivate
-            pushedAt
-          }
+
+async def _apost(
+    scheduler: Scheduler, payload: bytes, headers: dict[str, str]
+) -> Response:
+    """Coroutine version of :func:`_post`."""
+    async with scheduler.aslot():
+        started = time.monotonic()
+        resp = await _get_async_session().post(payload, headers)
+    _retry.observe(time.monotonic() - started)
+    return resp
+
+
+async def _asend(
+    scheduler: Scheduler, payload: bytes, headers: dict[str, str]
+) -> Response:
+    """Coroutine version of :func:`_send`; the slower request is cancelled."""
+    hedge_after = _retry.hedge_after()
+    if hedge_after is None:
+        return await _apost(scheduler, payload, headers)
+    primary = asyncio.ensure_future(_apost(scheduler, payload, headers))
+    done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+    if done:
+        return primary.result()
+    _retry.count_hedge()
+    backup = asyncio.ensure_future(_apost(scheduler, payload, headers))
+    try:
+        done, _ = await asyncio.wait(
+            {primary, backup}, return_when=asyncio.FIRST_COMPLETED
+        )
+        first = done.pop()
+        other = backup if first is primary else primary
+        try:
+            resp = first.result()
+        except (HTTPException, OSError):
+            first, resp = other, await other
+    finally:
+        for task in (primary, backup):
+            task.cancel()
+    if first is backup:
+        _retry.count_hedge(won=True)
+    return resp
+
+
+async def _arequest(
+    query: str,
+    variables: dict[str, Any],
+    token: str | None,
+    *,
+    partial: bool = False,
+) -> dict:
+    """Coroutine version of :func:`_request` for the asyncio engine."""
+    cassette = _cassette
+    if isinstance(cassette, CassettePlayer):
+        return await cassette.aplay(query, variables)
+    started = time.monotonic()
+    try:
+        data = await _afetch(query, variables, token, partial=partial)
+    except RuntimeError as exc:
+        _record_cassette(query, variables, started, error=exc)
+        raise
+    _record_cassette(query, variables, started, response=data)
+    return data
+
+
+async def _afetch(
+    query: str,
+    variables: dict[str, Any],
+    token: str | None,
+    *,
+    partial: bool = False,
+) -> dict:
+    """Coroutine version of :func:`_fetch`."""
+    payload, headers = _encode_request(query, variables, token)
+    scheduler = _get_scheduler()
+    throttles = retries = 0
+    while True:
+        try:
+            resp = await _asend(scheduler, payload, headers)
+        except TimeoutError as exc:
+            msg = f"Request to GitHub timed out: {exc}"
+            logging.warning(msg)
+            raise QueryTimeout(msg) from exc
+        except (HTTPException, OSError) as exc:
+            if _retry.should_retry(retries, exc=exc):
+                pause = _retry.backoff(retries)
+                retries += 1
+                _retry.count_retry()
+                logging.warning("Request to GitHub failed (%s); retrying", exc)
+                await asyncio.sleep(pause)
+                continue
+            msg = f"Request to GitHub failed: {exc}"
+            logging.error(msg)
+            raise RuntimeError(msg) from exc
+        data = _decode_response(resp)
+        delay = _record_response(scheduler, resp, data)
+        if delay is not None and throttles < MAX_THROTTLE_RETRIES:
+            throttles += 1
+            _retry.count_retry()
+            logging.warning("GitHub rate limit hit; retrying in %.1fs", delay)
+            continue
+        if delay is None and _retry.should_retry(retries, status=resp.status):
+            pause = _retry.backoff(retries)
+            retries += 1
+            _retry.count_retry()
+            logging.warning("GitHub returned HTTP %d; retrying", resp.status)
+            await asyncio.sleep(pause)
+            continue
+        return _check_response(resp, data, partial)
+
+
+class _Call(NamedTuple):
+    """One GraphQL request yielded by a collection step generator.
+
+    ``kind`` picks the response cache TTL (kinds without one are uncached)
+    and ``tag`` adds extra cache-key material the response depends on;
+    variables named in ``unkeyed`` are left out of the key because ``tag``
+    stands in for them. ``shape`` names the adaptive size (see
+    :func:`_get_size`) that timed responses feed.
+    """
+
+    query: str
+    variables: dict[str, Any]
+    partial: bool = False
+    kind: str = ""
+    tag: str = ""
+    shape: str = ""
+    unkeyed: tuple[str, ...] = ()
+
+
+_T = TypeVar("_T")
+# Collection logic is written once as generators that yield ``_Call`` objects
+# and receive parsed responses (or a thrown ``RuntimeError``). ``_drive`` and
+# ``_adrive`` run them on the thread pool and asyncio engines respectively.
+_Steps = Generator[_Call, dict, _T]
+
+
+def _cache_lookup(call: _Call, token: str | None) -> tuple[str | None, dict | None]:
+    """Return the cache key for ``call`` and any fresh cached response."""
+    cache = _cache
+    if cache is None or cache.ttls.get(call.kind, 0.0) <= 0:
+        return None, None
+    variables = call.variables
+    if call.unkeyed:
+        variables = {k: v for k, v in variables.items() if k not in call.unkeyed}
+    key = cache.key(call.query, variables, token, call.tag)
+    return key, cache.get(key, call.kind)
+
+
+def _record_latency(call: _Call, started: float, data: dict) -> None:
+    """Feed a response's latency and cost to ``call``'s adaptive size."""
+    size = _sizes.get(call.shape) if call.shape else None
+    if size is not None:
+        rate_limit = (data.get("data") or {}).get("rateLimit") or {}
+        size.success(time.monotonic() - started, rate_limit.get("cost"))
+
+
+def _cache_store(key: str | None, data: dict) -> None:
+    """Remember a clean response under ``key``."""
+    cache = _cache
+    if cache is not None and key is not None and not data.get("errors"):
+        cache.put(key, data)
+
+
+def _drive(steps: _Steps[_T], token: str | None) -> _T:
+    """Run ``steps`` to completion, answering each call with :func:`_request`."""
+    try:
+        call = next(steps)
+        while True:
+            key, data = _cache_lookup(call, token)
+            if data is not None:
+                call = steps.send(data)
+                continue
+            started = time.monotonic()
+            try:
+                data = _request(call.query, call.variables, token, partial=call.partial)
+            except RuntimeError as exc:
+                call = steps.throw(exc)
+            else:
+                _record_latency(call, started, data)
+                _cache_store(key, data)
+                call = steps.send(data)
+    except StopIteration as stop:
+        return stop.value
+
+
+async def _adrive(steps: _Steps[_T], token: str | None) -> _T:
+    """Asyncio counterpart of :func:`_drive` built on :func:`_arequest`."""
+    try:
+        call = next(steps)
+        while True:
+            key, data = _cache_lookup(call, token)
+            if data is not None:
+                call = steps.send(data)
+                continue
+            started = time.monotonic()
+            try:
+                data = await _arequest(
+                    call.query, call.variables, token, partial=call.partial
+                )
+            except RuntimeError as exc:
+                call = steps.throw(exc)
+            else:
+                _record_latency(call, started, data)
+                _cache_store(key, data)
+                call = steps.send(data)
+    except StopIteration as stop:
+        return stop.value
+
+
+REPO_QUERY = """
+query($login: String!, $first: Int!, $after: String, $privacy: RepositoryPrivacy, $langFirst: Int!) {
+  repositoryOwner(login: $login) {
+    repositories(first: $first, after: $after, privacy: $privacy, ownerAffiliations: OWNER, orderBy: {field: PUSHED_AT, direction: DESC}) {
+      nodes {
+        name
+        description
+        stargazerCount
+        forkCount
+        primaryLanguage { name }
+        isPrivate
+        pushedAt
+        defaultBranchRef { target { oid } }
+        languages(first: $langFirst, orderBy: {field: SIZE, direction: DESC}) {
+          edges { size node { name } }
           pageInfo { hasNextPage endCursor }
         }
       }
+      pageInfo { hasNextPage endCursor }
     }
-    """
+  }
+  rateLimit { cost remaining resetAt }
+}
+"""
+
+
+def _repo_page_steps(
+    login: str, after: str | None, include_private: bool = True
+) -> _Steps[tuple[list[dict[str, Any]], str | None]]:
+    """Fetch one page of ``login``'s repositories, most recently pushed first.
 
-    repos: list[dict[str, Any]] = []
-    after = None
+    Private repositories are filtered out by GitHub unless
+    ``include_private`` is set. Each node's ``languages`` connection is
+    replaced by a ``{name: bytes}`` mapping. Returns the page's nodes and the
+    cursor of the next page, or ``None`` after the last page. A timed-out
+    page is retried with half as many repositories.
+    """
+    size = _get_size("repos", REPO_PAGE_SIZE)
     while True:
-        data = _request(repo_query, {"login": user, "after": after}, token)
-        section = data.get("data", {}).get("user", {}).get("repositories", {})
-        repos.extend(section.get("nodes", []))
-        if not section.get("pageInfo", {}).get("hasNextPage"):
-            break
-        after = section.get("pageInfo", {}).get("endCursor")
+        variables: dict[str, Any] = {
+            "login": login,
+            "first": size.size,
+            "after": after,
+            "privacy": None if include_private else "PUBLIC",
+            "langFirst": LANGUAGES_FIRST,
+        }
+        try:
+            data = yield _Call(REPO_QUERY, variables, kind="repos", shape="repos")
+        except QueryTimeout:
+            if not size.timeout():
+                raise
+            continue
+        break
+    owner = data.get("data", {}).get("repositoryOwner") or {}
+    section = owner.get("repositories", {})
+    page_info = section.get("pageInfo", {})
+    cursor = page_info.get("endCursor") if page_info.get("hasNextPage") else None
+    nodes = section.get("nodes", [])
+    yield from _language_steps(login, nodes)
+    return nodes, cursor
+
 
+def _language_query(count: int) -> str:
+    """Return one query fetching the next language page of ``count`` repos.
+
+    Repository ``r<i>`` is named by ``$n<i>`` and resumes after ``$a<i>``.
+    """
+    params = ["$login: String!"]
+    for i in range(count):
+        params += [f"$n{i}: String!", f"$a{i}: String"]
+    aliases = "\n".join(
+        f"      r{i}: repository(owner: $login, name: $n{i}) {{"
+        f" languages(first: 100, after: $a{i},"
+        f" orderBy: {{field: SIZE, direction: DESC}}) {{ ...Languages }} }}"
+        for i in range(count)
+    )
+    return f"""
+    query({", ".join(params)}) {{
+{aliases}
+      rateLimit {{ cost remaining resetAt }}
+    }}
+
+    fragment Languages on LanguageConnection {{
+      edges {{ size node {{ name }} }}
+      pageInfo {{ hasNextPage endCursor }}
+    }}
+    """
+
+
+def _add_languages(
+    totals: dict[str, int], connection: dict[str, Any] | None
+) -> str | None:
+    """Add a ``languages`` page to ``totals`` and return the next cursor."""
+    connection = connection or {}
+    for edge in connection.get("edges") or []:
+        name = (edge.get("node") or {}).get("name")
+        if name:
+            totals[name] = totals.get(name, 0) + int(edge.get("size") or 0)
+    page_info = connection.get("pageInfo") or {}
+    return page_info.get("endCursor") if page_info.get("hasNextPage") else None
+
+
+def _language_steps(login: str, nodes: list[dict[str, Any]]) -> _Steps[None]:
+    """Flatten each node's ``languages`` into ``{name: bytes}`` in place.
+
+    Only repositories with more than ``LANGUAGES_FIRST`` languages need more
+    pages; those are fetched together in aliased queries. A failed request
+    keeps the languages gathered so far.
+    """
+    cursors: dict[int, str] = {}
+    for index, node in enumerate(nodes):
+        totals: dict[str, int] = {}
+        cursor = _add_languages(totals, node.get("languages"))
+        node["languages"] = totals
+        if cursor:
+            cursors[index] = cursor
+    while cursors:
+        pending = list(cursors)
+        variables: dict[str, Any] = {"login": login}
+        for i, index in enumerate(pending):
+            variables[f"n{i}"] = nodes[index]["name"]
+            variables[f"a{i}"] = cursors[index]
+        try:
+            data = yield _Call(
+                _language_query(len(pending)), variables, partial=True, kind="repos"
+            )
+        except RuntimeError as exc:
+            logging.warning("Could not page languages for %s: %s", login, exc)
+            return
+        results = data.get("data") or {}
+        cursors = {}
+        for i, index in enumerate(pending):
+            repo = results.get(f"r{i}") or {}
+            cursor = _add_languages(nodes[index]["languages"], repo.get("languages"))
+            if cursor:
+                cursors[index] = cursor
+
+
+def _repo_stats_query(count: int, *, since: bool = False) -> str:
+    """Return one query fetching commit and CI stats for ``count`` repositories.
+
+    Each repository is aliased as ``r<i>`` and named by the ``$n<i>`` variable
+    so a single round trip covers a whole batch. ``$ciFirst`` sets how many
+    check suites the first page returns.
+    """
+    params = ["$login: String!", "$ciFirst: Int!"]
+    params += [f"$n{i}: String!" for i in range(count)]
     if since:
-        repos = [r for r in repos if r.get("pushedAt") and r["pushedAt"] >= since]
-    if not include_private:
-        repos = [r for r in repos if not r.get("isPrivate")]
-
-    # fetch commit history counts
-    history_years = 0
-    if not full_history:
-        if cfg is None:
-            cfg = load_config()
-        history_years = cfg.metrics.commit_history_years
-
-    commit_query_template = """
-    query($login: String!, $repo: String!%s) {
-      repository(owner: $login, name: $repo) {
-        defaultBranchRef {
-          target {
-            ... on Commit {
-              history(first: 0%s) { totalCount }
-            }
-          }
-        }
-      }
-    }
+        params.append("$since: GitTimestamp")
+    aliases = "\n".join(
+        f"      r{i}: repository(owner: $login, name: $n{i}) {{ ...RepoStats }}"
+        for i in range(count)
+    )
+    history_args = ", since: $since" if since else ""
+    return f"""
+    query({", ".join(params)}) {{
+{aliases}
+      rateLimit {{ cost remaining resetAt }}
+    }}
+
+    fragment RepoStats on Repository {{
+      defaultBranchRef {{
+        target {{
+          ... on Commit {{
+            history(first: 0{history_args}) {{ totalCount }}
+            checkSuites(first: $ciFirst) {{ ...Suites }}
+          }}
+        }}
+      }}
+    }}
+
+    fragment Suites on CheckSuiteConnection {{
+      nodes {{ conclusion }}
+      pageInfo {{ hasNextPage endCursor }}
+    }}
     """
 
-    status_query = """
-    query($login: String!, $repo: String!) {
-      repository(owner: $login, name: $repo) {
-        defaultBranchRef {
-          target {
-            ... on Commit {
-              checkSuites(first: 20) {
-                nodes { conclusion }
-              }
-            }
-          }
-        }
-      }
-    }
+
+def _check_suite_query(count: int) -> str:
+    """Return one query fetching the next check-suite page of ``count`` repos.
+
+    Repository ``r<i>`` is named by ``$n<i>`` and resumes after ``$a<i>``.
     """
-    since_ts: str | None = None
-    extra_var = ""
-    if history_years > 0:
-        cutoff = datetime.utcnow() - timedelta(days=365 * history_years)
-        since_ts = cutoff.strftime("%Y-%m-%dT%H:%M:%SZ")
-        extra_var = ", $since: GitTimestamp"
-    commit_query = commit_query_template % (
-        extra_var,
-        ", since: $since" if since_ts else "",
+    params = ["$login: String!", "$ciFirst: Int!"]
+    for i in range(count):
+        params += [f"$n{i}: String!", f"$a{i}: String"]
+    aliases = "\n".join(
+        f"      r{i}: repository(owner: $login, name: $n{i}) {{"
+        f" defaultBranchRef {{ target {{ ... on Commit {{"
+        f" checkSuites(first: $ciFirst, after: $a{i}) {{ ...Suites }}"
+        f" }} }} }} }}"
+        for i in range(count)
     )
+    return f"""
+    query({", ".join(params)}) {{
+{aliases}
+      rateLimit {{ cost remaining resetAt }}
+    }}
+
+    fragment Suites on CheckSuiteConnection {{
+      nodes {{ conclusion }}
+      pageInfo {{ hasNextPage endCursor }}
+    }}
+    """
+
+
+def _ci_page_size(window: int, repos: int, budget: int = CI_NODE_BUDGET) -> int:
+    """Return check suites per repository page for a query covering ``repos``."""
+    return max(1, min(window, 100, budget // max(1, repos)))
+
+
+def _check_suites(node: dict | None) -> tuple[list[dict[str, Any]], str | None]:
+    """Return one aliased result's check-suite nodes and next-page cursor."""
+    target = ((node or {}).get("defaultBranchRef") or {}).get("target") or {}
+    suites = target.get("checkSuites") or {}
+    page_info = suites.get("pageInfo") or {}
+    cursor = page_info.get("endCursor") if page_info.get("hasNextPage") else None
+    return suites.get("nodes") or [], cursor
+
+
+def _parse_repo_stats(node: dict | None) -> dict[str, Any]:
+    """Extract ``commitCount`` and ``ciStatuses`` from one aliased result."""
+    target = ((node or {}).get("defaultBranchRef") or {}).get("target") or {}
+    history = target.get("history") or {}
+    suites, _ = _check_suites(node)
+    return {
+        "commitCount": history.get("totalCount", 0),
+        "ciStatuses": [n.get("conclusion") for n in suites if n.get("conclusion")],
+    }
 
-    def fetch_commit_count(repo_name: str) -> int:
-        variables: dict[str, str | None] = {"login": user, "repo": repo_name}
-        if since_ts:
-            variables["since"] = since_ts
+
+def _repo_stats_steps(
+    login: str,
+    names: list[str],
+    since: str | None = None,
+    tag: str = "",
+    ci_window: int = DEFAULT_CI_WINDOW,
+) -> _Steps[dict[str, dict[str, Any]]]:
+    """Fetch commit counts and CI statuses for ``names`` in one aliased query.
+
+    ``tag`` should identify the repositories' state (their default-branch
+    head OIDs) so cached stats are reused only while the head is unchanged.
+    ``since`` moves every day and is left out of the cache key, so ``tag``
+    should also name the length of the commit window it starts; the stats
+    TTL bounds how long a windowed count can lag behind the moving start.
+
+    Up to ``ci_window`` check suites are collected per repository. Repos
+    with more suites than the first page held are paged together in further
+    aliased queries whose page size shrinks as more repos share a query.
+
+    A timed-out batch is split in half and each half retried, shrinking
+    later batches too; a timed-out single repository retries with fewer
+    check suites per page. A repository whose alias reports an error, or
+    whose request failed, gets ``{"statsError": True}`` instead of a
+    ``commitCount`` and ``ciStatuses``, so it is never mistaken for one
+    without commits or CI runs.
+    """
+    budget = _get_size("checkSuites", CI_NODE_BUDGET)
+    query = _repo_stats_query(len(names), since=bool(since))
+    while True:
+        variables: dict[str, Any] = {
+            "login": login,
+            "ciFirst": _ci_page_size(ci_window, len(names), budget.size),
+        }
+        variables.update({f"n{i}": name for i, name in enumerate(names)})
+        if since:
+            variables["since"] = since
         try:
-            cdata = _request(commit_query, variables, token)
-            return (
-                cdata.get("data", {})
-                .get("repository", {})
-                .get("defaultBranchRef", {})
-                .get("target", {})
-                .get("history", {})
-                .get("totalCount", 0)
+            data = yield _Call(
+                query,
+                variables,
+                partial=True,
+                kind="stats",
+                tag=tag,
+                shape="stats",
+                unkeyed=("since",),
             )
+        except QueryTimeout:
+            if len(names) > 1:
+                if "stats" in _sizes:
+                    _sizes["stats"].timeout()
+                half = len(names) // 2
+                head = yield from _repo_stats_steps(
+                    login, names[:half], since, tag, ci_window
+                )
+                tail = yield from _repo_stats_steps(
+                    login, names[half:], since, tag, ci_window
+                )
+                return {**head, **tail}
+            if budget.timeout():
+                continue
+            data = {}
         except RuntimeError:
-            return 0
+            data = {}
+        break
 
-    def fetch_ci_statuses(repo_name: str) -> list[str]:
+    results = data.get("data") or {}
+    failed = {
+        str(err["path"][0])
+        for err in data.get("errors") or []
+        if isinstance(err, dict) and err.get("path")
+    }
+    stats: dict[str, dict[str, Any]] = {}
+    seen: dict[str, int] = {}
+    cursors: dict[str, str] = {}
+    for i, name in enumerate(names):
+        alias = f"r{i}"
+        if alias in failed or alias not in results:
+            logging.warning("Could not fetch stats for %s/%s", login, name)
+            stats[name] = {"statsError": True}
+            continue
+        stats[name] = _parse_repo_stats(results.get(alias))
+        suites, cursor = _check_suites(results.get(alias))
+        seen[name] = len(suites)
+        if cursor and seen[name] < ci_window:
+            cursors[name] = cursor
+
+    while cursors:
+        pending = list(cursors)
+        variables = {
+            "login": login,
+            "ciFirst": _ci_page_size(ci_window, len(pending), budget.size),
+        }
+        for i, name in enumerate(pending):
+            variables[f"n{i}"] = name
+            variables[f"a{i}"] = cursors[name]
         try:
-            variables: dict[str, str | None] = {"login": user, "repo": repo_name}
-            sdata = _request(status_query, variables, token)
-            nodes = (
-                sdata.get("data", {})
-                .get("repository", {})
-                .get("defaultBranchRef", {})
-                .get("target", {})
-                .get("checkSuites", {})
-                .get("nodes", [])
+            data = yield _Call(
+                _check_suite_query(len(pending)),
+                variables,
+                partial=True,
+                kind="stats",
+                tag=tag,
+                shape="checkSuites",
             )
-            return [n.get("conclusion") for n in nodes if n.get("conclusion")]
+        except QueryTimeout:
+            if budget.timeout():
+                continue
+            break
         except RuntimeError:
-            return []
+            break
+        results = data.get("data") or {}
+        cursors = {}
+        for i, name in enumerate(pending):
+            suites, cursor = _check_suites(results.get(f"r{i}"))
+            suites = suites[: ci_window - seen[name]]
+            seen[name] += len(suites)
+            stats[name]["ciStatuses"] += [
+                n["conclusion"] for n in suites if n.get("conclusion")
+            ]
+            if cursor and seen[name] < ci_window:
+                cursors[name] = cursor
+    return stats
 
-    with ThreadPoolExecutor() as executor:
-        commit_futures = {
-            executor.submit(fetch_commit_count, repo["name"]): repo for repo in repos
-        }
-        status_futures = {
-            executor.submit(fetch_ci_statuses, repo["name"]): repo for repo in repos
+
+def _fetch_repo_stats(
+    login: str,
+    names: list[str],
+    token: str | None,
+    since: str | None = None,
+    tag: str = "",
+    ci_window: int = DEFAULT_CI_WINDOW,
+) -> dict[str, dict[str, Any]]:
+    """Return commit counts and CI statuses for ``names`` keyed by repo name."""
+    return _drive(_repo_stats_steps(login, names, since, tag, ci_window), token)
+
+
+HISTORY_QUERY = """
+query($login: String!, $name: String!, $first: Int!, $after: String, $since: GitTimestamp) {
+  repository(owner: $login, name: $name) {
+    defaultBranchRef {
+      target {
+        ... on Commit {
+          history(first: $first, after: $after, since: $since) {
+            nodes { oid committedDate }
+            pageInfo { hasNextPage endCursor }
+          }
         }
-        for commit_future, repo in commit_futures.items():
-            repo["commitCount"] = commit_future.result()
-        for status_future, repo in status_futures.items():
-            repo["ciStatuses"] = status_future.result()
+      }
+    }
+  }
+  rateLimit { cost remaining resetAt }
+}
+"""
+
+
+def _history_steps(
+    login: str, name: str, known_oid: str | None, since: str | None
+) -> _Steps[tuple[Counter[str], str | None, bool] | None]:
+    """Count ``name``'s commits per ISO week, newest first.
+
+    Paging stops at ``known_oid``, the newest commit counted by an earlier
+    run. Returns the new weekly counts, the newest commit OID and whether
+    ``known_oid`` was reached, or ``None`` when the history is unavailable.
+    """
+    weeks: Counter[str] = Counter()
+    newest: str | None = None
+    size = _get_size("history", HISTORY_PAGE_SIZE)
+    variables: dict[str, Any] = {
+        "login": login,
+        "name": name,
+        "after": None,
+        "since": since,
+    }
+    while True:
+        variables["first"] = size.size
+        try:
+            data = yield _Call(HISTORY_QUERY, dict(variables), shape="history")
+        except QueryTimeout as exc:
+            if size.timeout():
+                continue
+            logging.warning("Could not fetch history for %s/%s: %s", login, name, exc)
+            return None
+        except RuntimeError as exc:
+            logging.warning("Could not fetch history for %s/%s: %s", login, name, exc)
+            return None
+        repo = (data.get("data") or {}).get("repository") or {}
+        target = (repo.get("defaultBranchRef") or {}).get("target") or {}
+        history = target.get("history") or {}
+        for node in history.get("nodes") or []:
+            if known_oid is not None and node["oid"] == known_oid:
+                return weeks, newest or known_oid, True
+            newest = newest or node["oid"]
+            weeks[iso_week(node["committedDate"])] += 1
+        page_info = history.get("pageInfo") or {}
+        if not page_info.get("hasNextPage"):
+            return weeks, newest, False
+        variables["after"] = page_info.get("endCursor")
+
+
+def _weekly_steps(
+    login: str, store: HistoryStore, repo: dict[str, Any], since: str | None
+) -> _Steps[None]:
+    """Bring ``repo``'s weekly histogram in ``store`` up to date.
+
+    Repositories without a push since the last walk are not queried. The
+    histogram is attached to ``repo`` as ``weeklyCommits``.
+    """
+    name = repo["name"]
+    pushed_at = repo.get("pushedAt")
+    if store.needs_walk(name, pushed_at):
+        known = store.newest_oid(name)
+        result = yield from _history_steps(login, name, known, since)
+        if result is not None:
+            weeks, oid, reached = result
+            store.record(name, pushed_at, oid, weeks, incremental=reached)
+    repo["weeklyCommits"] = store.weeks(name)
+
+
+def _accept_page(
+    checkpoint: Checkpoint,
+    nodes: list[dict[str, Any]],
+    after: str | None,
+    since: str | None,
+) -> list[dict[str, Any]]:
+    """Record one listing page and return the repositories pushed since ``since``.
+
+    Pages arrive in ``pushedAt`` order, so the first older repository ends
+    the listing and no further pages are requested.
+    """
+    if since:
+        kept = [r for r in nodes if r.get("pushedAt") and r["pushedAt"] >= since]
+        if len(kept) < len(nodes):
+            after = None
+        nodes = kept
+    checkpoint.record_page(nodes, after)
+    return nodes
+
+
+def _previous_stats(data_dir: Path, user: str) -> dict[str, dict[str, Any]]:
+    """Return repositories from ``user``'s newest snapshot keyed by name."""
+    path = latest_snapshot(data_dir, user)
+    if path is None:
+        return {}
+    try:
+        return {r["name"]: r for r in iter_records(path) if r.get("name")}
+    except (OSError, ValueError) as exc:
+        logging.warning("Ignoring unreadable snapshot %s: %s", path, exc)
+        return {}
+
+
+def _carry_forward(
+    repos: list[dict[str, Any]], previous: dict[str, dict[str, Any]] | None
+) -> list[dict[str, Any]]:
+    """Reuse stats for repos not pushed since ``previous`` and return the rest.
+
+    Repositories whose ``pushedAt`` matches the previous snapshot get their
+    ``commitCount`` and ``ciStatuses`` copied forward; only the returned
+    repositories, including those whose stats could not be fetched last
+    time, still need the per-repo stats queries.
+    """
+    if not previous:
+        return repos
+    pending = []
+    for repo in repos:
+        old = previous.get(repo["name"])
+        if (
+            old is not None
+            and old.get("pushedAt") == repo.get("pushedAt")
+            and "commitCount" in old
+            and "ciStatuses" in old
+        ):
+            repo["commitCount"] = old["commitCount"]
+            repo["ciStatuses"] = old["ciStatuses"]
+        else:
+            pending.append(repo)
+    return pending
+
+
+class _Account:
+    """One account being collected and where its finished records go.
+
+    Records are flushed to the account's snapshot before its checkpoint
+    marks them done, so a resumed run never loses a repository; records
+    flushed just before an interruption but not yet marked done are found
+    in the part file and marked done on resume instead of being written
+    again. ``previous`` holds the stats of the latest snapshot for
+    incremental runs and ``history`` the weekly commit histograms when
+    they are collected. ``stats_failures`` counts the records written with
+    ``statsError``, starting from those already in a resumed part file.
+    """
+
+    def __init__(
+        self,
+        login: str,
+        writer: SnapshotWriter,
+        checkpoint: Checkpoint,
+        previous: dict[str, dict[str, Any]] | None = None,
+        history: HistoryStore | None = None,
+    ) -> None:
+        self.login = login
+        self.writer = writer
+        self.checkpoint = checkpoint
+        self.previous = previous
+        self.history = history
+        self.stats_failures = 0
+        if writer.written:
+            self.stats_failures = sum(
+                1
+                for record in iter_records(writer.part_path)
+                if record.get("statsError")
+            )
+        self._lock = threading.Lock()
+
+    def emit(self, repos: list[dict[str, Any]]) -> None:
+        """Write ``repos`` to the snapshot and record them as done."""
+        if not repos:
+            return
+        for repo in repos:
+            self.writer.write(repo)
+        self.writer.flush()
+        failures = sum(1 for repo in repos if repo.get("statsError"))
+        if failures:
+            with self._lock:
+                self.stats_failures += failures
+        if self.history is not None:
+            self.history.save()
+        self.checkpoint.record_done([repo["name"] for repo in repos])
+
+    def plan(self, repos: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Return repos still needing stats, emitting carried-forward ones."""
+        done = self.checkpoint.done
+        todo = [repo for repo in repos if repo["name"] not in done]
+        pending = _carry_forward(todo, self.previous)
+        pending_ids = {id(repo) for repo in pending}
+        carried = [repo for repo in todo if id(repo) not in pending_ids]
+        if self.history is not None:
+            # carried-forward repos skip the consumers that attach histograms
+            for repo in carried:
+                if self.history.needs_walk(repo["name"], repo.get("pushedAt")):
+                    pending.append(repo)
+                else:
+                    repo["weeklyCommits"] = self.history.weeks(repo["name"])
+            pending_ids = {id(repo) for repo in pending}
+            carried = [repo for repo in carried if id(repo) not in pending_ids]
+        self.emit(carried)
+        return pending
+
+
+_Batch = tuple[list[dict[str, Any]], list[str], str]
+
+
+def _head_oid(repo: dict[str, Any]) -> str | None:
+    """Return the OID of ``repo``'s default-branch head from the listing."""
+    target = (repo.get("defaultBranchRef") or {}).get("target") or {}
+    return target.get("oid")
+
+
+def _batches(repos: list[dict[str, Any]], size: int) -> list[_Batch]:
+    """Split repositories into ``(repos, names, tag)`` chunks of ``size``.
+
+    The tag joins the batch's default-branch head OIDs (``pushedAt`` for
+    empty repositories) so cached stats survive until a head moves.
+    """
+    chunks = [repos[i : i + size] for i in range(0, len(repos), size)]
+    return [
+        (
+            chunk,
+            [repo["name"] for repo in chunk],
+            ",".join(_head_oid(repo) or str(repo.get("pushedAt")) for repo in chunk),
+        )
+        for chunk in chunks
+    ]
+
+
+_Work = tuple[_Account, _Batch]
+
+
+def _produce(
+    account: _Account,
+    batches: FairQueue[_Work],
+    failed: threading.Event,
+    token: str | None,
+    since: str | None,
+    include_private: bool,
+    batch_size: int,
+) -> None:
+    """List one account's repositories and queue their stats batches."""
+    retry_scope.set(account.login)
+    checkpoint = account.checkpoint
+    stats_size = _get_size("stats", batch_size)
+
+    def put(repos: list[dict[str, Any]]) -> None:
+        for batch in _batches(account.plan(repos), stats_size.size):
+            batches.put(account.login, (account, batch))
+
+    try:
+        put(list(checkpoint.listed))
+        after = checkpoint.after
+        while not checkpoint.listing_complete and not failed.is_set():
+            steps = _repo_page_steps(account.login, after, include_private)
+            nodes, after = _drive(steps, token)
+            put(_accept_page(checkpoint, nodes, after, since))
+    except BaseException:
+        failed.set()
+        raise
+    finally:
+        batches.close(account.login)
+
+
+def _consume(
+    batches: FairQueue[_Work],
+    failed: threading.Event,
+    token: str | None,
+    history_since: str | None,
+    history_window: str,
+    ci_window: int,
+) -> None:
+    """Enrich queued batches until every account's listing is drained.
+
+    After a failure the worker keeps draining the queue so producers never
+    block on a full queue, then re-raises the first error.
+    """
+    error: BaseException | None = None
+    while (work := batches.get()) is not None:
+        if error is not None or failed.is_set():
+            continue
+        account, (chunk, names, tag) = work
+        retry_scope.set(account.login)
+        try:
+            stats = _fetch_repo_stats(
+                account.login,
+                names,
+                token,
+                history_since,
+                f"{tag};{history_window}",
+                ci_window,
+            )
+            for repo in chunk:
+                repo.update(stats[repo["name"]])
+                if account.history is not None:
+                    steps = _weekly_steps(
+                        account.login, account.history, repo, history_since
+                    )
+                    _drive(steps, token)
+            account.emit(chunk)
+        except BaseException as exc:
+            error = exc
+            failed.set()
+    if error is not None:
+        raise error
+
+
+def _collect_threaded(
+    accounts: list[_Account],
+    token: str | None,
+    *,
+    since: str | None,
+    include_private: bool,
+    history_since: str | None,
+    history_window: str,
+    ci_window: int,
+    batch_size: int,
+    max_concurrency: int,
+) -> None:
+    """Collect repositories with blocking requests on a thread pool.
+
+    Each account is listed on its own thread, feeding stats batches into a
+    :class:`FairQueue` with room for ``PIPELINE_DEPTH`` batches per worker
+    and account. ``max_concurrency`` workers take batches from the accounts
+    in turn and write each one as soon as its stats arrive; a full queue
+    pauses that account's listing while enrichment catches up.
+    """
+    batches: FairQueue[_Work] = FairQueue(
+        [account.login for account in accounts], PIPELINE_DEPTH * max_concurrency
+    )
+    failed = threading.Event()
+    with ThreadPoolExecutor(max_workers=max_concurrency + len(accounts)) as executor:
+        futures = [
+            executor.submit(
+                _produce,
+                account,
+                batches,
+                failed,
+                token,
+                since,
+                include_private,
+                batch_size,
+            )
+            for account in accounts
+        ]
+        futures += [
+            executor.submit(
+                _consume,
+                batches,
+                failed,
+                token,
+                history_since,
+                history_window,
+                ci_window,
+            )
+            for _ in range(max_concurrency)
+        ]
+        for future in as_completed(futures):
+            future.result()
+
+
+async def _collect_async(
+    accounts: list[_Account],
+    token: str | None,
+    *,
+    since: str | None,
+    include_private: bool,
+    history_since: str | None,
+    history_window: str,
+    ci_window: int,
+    batch_size: int,
+    max_concurrency: int,
+) -> None:
+    """Collect repositories as coroutines on a single event loop.
+
+    Mirrors the threaded pipeline with an :class:`AsyncFairQueue` fed by one
+    listing task per account and drained by ``max_concurrency`` consumer
+    tasks, so the scheduler and connection pool see the same load. A
+    failing task cancels the rest of the run.
+    """
+    batches: AsyncFairQueue[_Work] = AsyncFairQueue(
+        [account.login for account in accounts], PIPELINE_DEPTH * max_concurrency
+    )
+
+    stats_size = _get_size("stats", batch_size)
+
+    async def produce(account: _Account) -> None:
+        retry_scope.set(account.login)
+        checkpoint = account.checkpoint
+
+        async def put(repos: list[dict[str, Any]]) -> None:
+            for batch in _batches(account.plan(repos), stats_size.size):
+                await batches.put(account.login, (account, batch))
+
+        await put(list(checkpoint.listed))
+        after = checkpoint.after
+        while not checkpoint.listing_complete:
+            steps = _repo_page_steps(account.login, after, include_private)
+            nodes, after = await _adrive(steps, token)
+            await put(_accept_page(checkpoint, nodes, after, since))
+        await batches.close(account.login)
+
+    async def consume() -> None:
+        while (work := await batches.get()) is not None:
+            account, (chunk, names, tag) = work
+            retry_scope.set(account.login)
+            steps = _repo_stats_steps(
+                account.login,
+                names,
+                history_since,
+                f"{tag};{history_window}",
+                ci_window,
+            )
+            stats = await _adrive(steps, token)
+            for repo in chunk:
+                repo.update(stats[repo["name"]])
+                if account.history is not None:
+                    weekly = _weekly_steps(
+                        account.login, account.history, repo, history_since
+                    )
+                    await _adrive(weekly, token)
+            account.emit(chunk)
+
+    try:
+        async with asyncio.TaskGroup() as group:
+            for account in accounts:
+                group.create_task(produce(account))
+            for _ in range(max_concurrency):
+                group.create_task(consume())
+    except BaseExceptionGroup as exc:
+        raise exc.exceptions[0] from None
+    finally:
+        await _get_async_session().close()
+
+
+def _record_metrics(data_dir: Path, login: str, snapshot: Path) -> None:
+    """Append the changes in ``login``'s new ``snapshot`` to its metric store.
 
-    data_dir.mkdir(parents=True, exist_ok=True)
+    A store that does not exist yet is first filled from the account's
+    earlier snapshots so its timeline starts with the first of them.
+    """
+    store = MetricStore(metrics_path(data_dir, login))
+    snapshots = user_snapshots(data_dir, login)
+    if store.entries:
+        snapshots = [(ts, path) for ts, path in snapshots if path.name == snapshot.name]
+    changes = sum(store.append(ts, iter_records(path)) for ts, path in snapshots)
+    logging.debug("Stored %d metric changes for %s", changes, login)
+
+
+def _open_checkpoint(data_dir: Path, login: str, resume: bool) -> Checkpoint:
+    """Return the checkpoint to resume for ``login`` or a fresh one."""
+    state = checkpoint_path(data_dir, login)
+    checkpoint = Checkpoint.load(state) if resume else None
+    if checkpoint is not None:
+        part = snapshot_name(login, checkpoint.collected_at) + PART_SUFFIX
+        if (data_dir / part).exists():
+            logging.info(
+                "Resuming %s from %s: %d repos listed, %d done",
+                login,
+                checkpoint.collected_at,
+                len(checkpoint.listed),
+                len(checkpoint.done),
+            )
+            return checkpoint
     ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-    outfile = data_dir / f"{user}-{ts}.json"
-    with open(outfile, "w", encoding="utf-8") as f:
-        json.dump(repos, f, indent=2)
+    return Checkpoint(state, ts)
+
+
+def collect(
+    *,
+    user: str | Sequence[str] | None = None,
+    token: str | None = None,
+    include_private: bool | None = None,
+    since: str | None = None,
+    data_dir: str | Path | None = None,
+    full_history: bool = False,
+    batch_size: int | None = None,
+    max_connections: int | None = None,
+    max_concurrency: int | None = None,
+    engine: str = "thread",
+    cache: bool | None = None,
+    refresh: bool = False,
+    incremental: bool = False,
+    resume: bool = False,
+    weekly_history: bool | None = None,
+    hedge: bool | None = None,
+    record: str | Path | None = None,
+    replay: str | Path | None = None,
+    replay_latency: bool = False,
+) -> None:
+    """Fetch repository metadata and stream it into NDJSON snapshots.
+
+    Parameters mirror the CLI. ``user`` is one user or organization login or
+    a sequence of them; several accounts are collected in one run sharing
+    the connection pool, scheduler and rate-limit budget, with stats batches
+    taken from each account in turn, and each gets its own snapshot.
+    ``include_private`` only takes effect when a
+    ``token`` with appropriate scopes is supplied and is applied by GitHub.
+    ``since`` filters repositories by ``pushed_at`` timestamp when provided;
+    the listing is ordered by push date so paging stops once it passes it.
+    ``user`` and ``include_private``
+    default to values from ``braggard.toml`` when omitted. ``data_dir`` controls
+    where ``<user>-<ts>.ndjson`` snapshots are written and defaults to
+    ``paths.data_dir`` in ``braggard.toml``. Records are appended as each
+    batch finishes and the file is renamed into place once the run completes.
+    CI statuses cover up to ``metrics.ci_pass_window`` check suites of each
+    repository's default-branch head.
+    ``full_history`` determines whether commit counts span the entire
+    repository lifetime instead of the default ``metrics.commit_history_years``
+    window from ``braggard.toml``.
+    ``batch_size`` sets how many repositories share one aliased stats query and
+    defaults to ``collector.batch_size`` in ``braggard.toml``.
+    ``max_connections`` bounds the keep-alive connection pool shared by every
+    request and defaults to ``collector.max_connections``.
+    ``max_concurrency`` caps how many requests the adaptive scheduler keeps in
+    flight and defaults to ``collector.max_concurrency``.
+    ``engine`` selects ``"thread"`` (the default thread pool) or ``"async"``,
+    which runs every request as a coroutine on one event loop.
+    ``cache`` toggles the on-disk response cache under ``data_dir`` (default
+    ``cache.enabled``); ``refresh`` ignores cached entries but stores fresh
+    responses for the next run.
+    ``incremental`` reuses commit counts and CI statuses from the latest
+    ``<user>-<ts>`` snapshot for repositories whose ``pushedAt`` has not
+    changed, so only pushed repositories are queried again.
+    Progress is checkpointed under ``data_dir`` after every page and batch;
+    ``resume`` continues an interrupted run from its checkpoint instead of
+    starting over, reusing its snapshot file and pagination cursor.
+    ``weekly_history`` (default ``collector.weekly_history``) adds a
+    ``weeklyCommits`` histogram per repository; the newest commit seen is
+    kept under ``data_dir`` so later runs only page back to it.
+    Transient failures are retried up to ``collector.max_retries`` times
+    with jittered backoff; ``hedge`` (default ``collector.hedge``) sends a
+    duplicate of any request slower than the observed p95. Retry and hedge
+    counts are recorded in each snapshot's metadata.
+    ``record`` saves every GitHub request and response of the run to a
+    cassette in that directory; ``replay`` serves a recorded cassette
+    instead of contacting GitHub, sleeping for each recorded latency when
+    ``replay_latency`` is set. Both bypass the response cache so the
+    cassette sees every request.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine}")
+    if record is not None and replay is not None:
+        raise ValueError("record and replay are mutually exclusive")
+    cfg: Config | None = None
+    if user is None or include_private is None or data_dir is None:
+        cfg = load_config()
+        if user is None:
+            user = cfg.user.handle
+        if include_private is None:
+            include_private = cfg.user.include_private
+        if data_dir is None:
+            data_dir = cfg.paths.data_dir
+    data_dir = Path(data_dir)
+    logins = [user] if isinstance(user, str) else list(dict.fromkeys(user or ()))
+    if not logins:
+        raise ValueError("user must be provided")
+    if (
+        max_connections is None
+        or max_concurrency is None
+        or batch_size is None
+        or cache is None
+        or weekly_history is None
+        or hedge is None
+        or not full_history
+    ) and cfg is None:
+        cfg = load_config()
+    if cfg is not None:
+        max_connections = max_connections or cfg.collector.max_connections
+        max_concurrency = max_concurrency or cfg.collector.max_concurrency
+        batch_size = batch_size or cfg.collector.batch_size
+        if cache is None:
+            cache = cfg.cache.enabled
+        if weekly_history is None:
+            weekly_history = cfg.collector.weekly_history
+        if hedge is None:
+            hedge = cfg.collector.hedge
+    max_concurrency = max_concurrency or DEFAULT_MAX_CONCURRENCY
+    batch_size = max(1, batch_size or DEFAULT_BATCH_SIZE)
+    _get_session(max_connections)
+    _get_scheduler(max_concurrency)
+    global _retry
+    _retry = RetryPolicy(
+        max_retries=cfg.collector.max_retries if cfg else DEFAULT_MAX_RETRIES,
+        hedge=bool(hedge),
+    )
+
+    # commit counts cover metrics.commit_history_years unless full_history
+    history_since: str | None = None
+    history_window = ""
+    if not full_history and cfg is not None and cfg.metrics.commit_history_years > 0:
+        cutoff = datetime.utcnow() - timedelta(
+            days=365 * cfg.metrics.commit_history_years
+        )
+        history_since = cutoff.strftime("%Y-%m-%dT00:00:00Z")
+        # the cache keys windowed counts by the window's length, not its start
+        history_window = f"{cfg.metrics.commit_history_years}y"
+
+    options: dict[str, Any] = {
+        "since": since,
+        "include_private": bool(include_private),
+        "history_since": history_since,
+        "history_window": history_window,
+        "ci_window": cfg.metrics.ci_pass_window if cfg else DEFAULT_CI_WINDOW,
+        "batch_size": batch_size,
+        "max_concurrency": max_concurrency,
+    }
+    global _cache, _cassette
+    cassette: CassetteRecorder | CassettePlayer | None = None
+    if record is not None:
+        cassette = CassetteRecorder(record)
+    elif replay is not None:
+        cassette = CassettePlayer(
+            replay, latency=replay_latency, timeout_error=QueryTimeout
+        )
+    response_cache = None
+    if cache and cassette is None:
+        cache_cfg = cfg.cache if cfg is not None else CacheConfig()
+        response_cache = ResponseCache(
+            cache_dir(data_dir),
+            ttls={
+                "repos": cache_cfg.repo_list_ttl,
+                "stats": cache_cfg.repo_stats_ttl,
+            },
+            max_bytes=cache_cfg.max_mb * 1024 * 1024,
+            read=not refresh,
+        )
+    _cache = response_cache
+    _cassette = cassette
+    accounts: list[_Account] = []
+    try:
+        with ExitStack() as stack:
+            for login in logins:
+                checkpoint = _open_checkpoint(data_dir, login, resume)
+                writer = stack.enter_context(
+                    SnapshotWriter(
+                        data_dir / snapshot_name(login, checkpoint.collected_at),
+                        append=resume,
+                    )
+                )
+                # a crash between flushing a batch and marking it done
+                if unmarked := writer.written - checkpoint.done:
+                    checkpoint.record_done(sorted(unmarked))
+                previous = _previous_stats(data_dir, login) if incremental else None
+                history = (
+                    HistoryStore(history_path(data_dir, login))
+                    if weekly_history
+                    else None
+                )
+                accounts.append(_Account(login, writer, checkpoint, previous, history))
+            if engine == "async":
+                asyncio.run(_collect_async(accounts, token, **options))
+            else:
+                _collect_threaded(accounts, token, **options)
+            for account in accounts:
+                path = account.writer.close(
+                    {
+                        "user": account.login,
+                        "collected_at": account.checkpoint.collected_at,
+                        "repo_count": account.writer.count,
+                        "engine": engine,
+                        **_retry.stats(account.login),
+                        "stats_failures": account.stats_failures,
+                    }
+                )
+                _record_metrics(data_dir, account.login, path)
+    finally:
+        _cache = None
+        _cassette = None
+        for account in accounts:
+            account.checkpoint.close()
+            if account.history is not None:
+                account.history.close()
+        if isinstance(cassette, CassetteRecorder):
+            cassette.close()
+            logging.info("Recorded %d responses to %s", cassette.count, cassette.path)
+    for account in accounts:
+        account.checkpoint.remove()
+    if response_cache is not None:
+        response_cache.prune()
+        logging.info(
+            "Response cache: %d hits, %d misses",
+            response_cache.hits,
+            response_cache.misses,
+        )
+    for shape, size in sorted(_sizes.items()):
+        logging.debug(
+            "Adaptive %s size %d after %d timeouts (latency %s s, cost %s)",
+            shape,
+            size.size,
+            size.timeouts,
+            size.latency,
+            size.cost,
+        )
@@ -25,6 +25,35 @@ class MetricsConfig:
     commit_history_years: int = 3
 
 
+@dataclass
+class CollectorConfig:
+    """Settings under the ``[collector]`` table."""
+
+    batch_size: int = 25
+    max_connections: int = 8
+    max_concurrency: int = 8
+    weekly_history: bool = False
+    max_retries: int = 3
+    hedge: bool = False
+
+
+@dataclass
+class AnalyzerConfig:
+    """Settings under the ``[analyzer]`` table."""
+
+    workers: int = 0
+
+
+@dataclass
+class CacheConfig:
+    """Settings under the ``[cache]`` table."""
+
+    enabled: bool = True
+    max_mb: int = 256
+    repo_list_ttl: float = 600.0
+    repo_stats_ttl: float = 7 * 24 * 3600.0
+
+
 @dataclass
 class PathsConfig:
     """Settings under the ``[paths]`` table."""
@@ -38,6 +67,9 @@ class Config:
 
     user: UserConfig = field(default_factory=lambda: UserConfig(handle=""))
     metrics: MetricsConfig = field(default_factory=MetricsConfig)
+    collector: CollectorConfig = field(default_factory=CollectorConfig)
+    analyzer: AnalyzerConfig = field(default_factory=AnalyzerConfig)
+    cache: CacheConfig = field(default_factory=CacheConfig)
     paths: PathsConfig = field(default_factory=PathsConfig)
 
 
@@ -87,9 +119,42 @@ def load_config(path: str | Path | None = None) -> Config:
                 commit_history_years=int(metrics_data.get("commit_history_years", 3)),
             )
 
+            collector_data = data.get("collector") or {}
+            collector = CollectorConfig(
+                batch_size=int(collector_data.get("batch_size", 25)),
+                max_connections=int(collector_data.get("max_connections", 8)),
+                max_concurrency=int(collector_data.get("max_concurrency", 8)),
+                weekly_history=bool(collector_data.get("weekly_history", False)),
+                max_retries=int(collector_data.get("max_retries", 3)),
+                hedge=bool(collector_data.get("hedge", False)),
+            )
+
+            analyzer_data = data.get("analyzer") or {}
+            analyzer = AnalyzerConfig(workers=int(analyzer_data.get("workers", 0)))
+
+            cache_data = data.get("cache") or {}
+            defaults = CacheConfig()
+            cache = CacheConfig(
+                enabled=bool(cache_data.get("enabled", defaults.enabled)),
+                max_mb=int(cache_data.get("max_mb", defaults.max_mb)),
+                repo_list_ttl=float(
+                    cache_data.get("repo_list_ttl", defaults.repo_list_ttl)
+                ),
+                repo_stats_ttl=float(
+                    cache_data.get("repo_stats_ttl", defaults.repo_stats_ttl)
+                ),
+            )
+
             paths_data = data.get("paths") or {}
             paths = PathsConfig(data_dir=str(paths_data.get("data_dir", "data")))
 
-            return Config(user=user, metrics=metrics, paths=paths)
+            return Config(
+                user=user,
+                metrics=metrics,
+                collector=collector,
+                analyzer=analyzer,
+                cache=cache,
+                paths=paths,
+            )
 
     raise FileNotFoundError("braggard.toml not found")
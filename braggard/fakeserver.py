@@ -0,0 +1,329 @@
+"""A local stand-in for GitHub's GraphQL API serving synthetic portfolios.
+
+It understands exactly the queries :mod:`braggard.collector` sends, so
+collector runs can be load-tested without a token or network access.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import re
+import threading
+import time
+from types import TracebackType
+from typing import Any
+
+
+LANGUAGES = ("Python", "TypeScript", "Go", "Rust", "Shell", "C", "HTML", "Java")
+# Push date of the most recently pushed synthetic repository.
+NEWEST_PUSH = datetime(2024, 6, 1, tzinfo=timezone.utc)
+DEFAULT_BUDGET = 5000
+DEFAULT_RESET_AFTER = 3600.0
+
+_ALIAS = re.compile(r"\br(\d+): repository\(")
+
+
+def _iso(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _cursor(offset: int) -> str:
+    return f"cursor:{offset}"
+
+
+def _offset(cursor: str | None) -> int:
+    if not cursor:
+        return 0
+    try:
+        return int(str(cursor).rsplit(":", 1)[-1])
+    except ValueError:
+        return 0
+
+
+def _page(items: int, first: int, after: str | None) -> tuple[range, dict]:
+    """Return the item indices of one page and its ``pageInfo``."""
+    start = _offset(after)
+    end = min(items, start + max(0, first))
+    info = {"hasNextPage": end < items, "endCursor": _cursor(end)}
+    return range(start, end), info
+
+
+class Portfolio:
+    """A deterministic synthetic set of ``size`` repositories.
+
+    Repository ``i`` is named ``repo-<i>`` and was pushed ``i`` hours before
+    :data:`NEWEST_PUSH`, so listing order matches GitHub's ``PUSHED_AT``
+    ordering. Every fifth repository is private.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = max(0, size)
+        self._index = {self.name(i): i for i in range(self.size)}
+        self.public = [i for i in range(self.size) if not self.private(i)]
+
+    @staticmethod
+    def name(i: int) -> str:
+        return f"repo-{i:06d}"
+
+    @staticmethod
+    def private(i: int) -> bool:
+        return i % 5 == 4
+
+    def find(self, name: str) -> int | None:
+        return self._index.get(name)
+
+    def pushed_at(self, i: int) -> datetime:
+        return NEWEST_PUSH - timedelta(hours=i)
+
+    def commit_count(self, i: int) -> int:
+        return 5 + (i * 37) % 400
+
+    def commit_date(self, i: int, n: int) -> datetime:
+        """Return the date of repository ``i``'s ``n``-th newest commit."""
+        return self.pushed_at(i) - timedelta(hours=19 * n)
+
+    def oid(self, i: int, n: int = 0) -> str:
+        return hashlib.sha1(f"{i}:{n}".encode()).hexdigest()
+
+    def suites(self, i: int) -> list[str]:
+        return ["FAILURE" if n % 7 == 3 else "SUCCESS" for n in range((i * 11) % 150)]
+
+    def languages(self, i: int) -> list[tuple[str, int]]:
+        count = 1 + i % 4
+        names = [LANGUAGES[(i + k) % len(LANGUAGES)] for k in range(count)]
+        return [(name, (10_000 >> k) + i) for k, name in enumerate(names)]
+
+    def node(self, i: int) -> dict[str, Any]:
+        """Return repository ``i`` as a listing node."""
+        languages = self.languages(i)
+        return {
+            "name": self.name(i),
+            "description": f"Synthetic repository {i}",
+            "stargazerCount": (i * 7) % 500,
+            "forkCount": (i * 3) % 60,
+            "primaryLanguage": {"name": languages[0][0]},
+            "isPrivate": self.private(i),
+            "pushedAt": _iso(self.pushed_at(i)),
+            "defaultBranchRef": {"target": {"oid": self.oid(i)}},
+            "languages": {
+                "edges": [{"size": size, "node": {"name": n}} for n, size in languages],
+                "pageInfo": {"hasNextPage": False, "endCursor": None},
+            },
+        }
+
+    def commits_since(self, i: int, since: str | None) -> int:
+        """Return how many of repository ``i``'s commits are newer than ``since``."""
+        total = self.commit_count(i)
+        if not since:
+            return total
+        cutoff = datetime.fromisoformat(since.replace("Z", "+00:00"))
+        age = (self.pushed_at(i) - cutoff).total_seconds()
+        if age < 0:
+            return 0
+        return min(total, int(age // (19 * 3600)) + 1)
+
+
+class _Server(ThreadingHTTPServer):
+    # the default listen backlog of 5 resets connections once a benchmark
+    # opens many at once, which the collector would count as retries
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class FakeGitHub:
+    """Serve a :class:`Portfolio` over HTTP the way GitHub's GraphQL API would.
+
+    Each response is delayed by ``latency`` seconds (jittered by ±50 %).
+    ``error_rate`` of requests fail with HTTP 503 and ``timeout_rate`` with a
+    502 gateway timeout. Every request costs one point of a ``budget`` that
+    refills ``reset_after`` seconds after the first request; the budget is
+    reported in ``rateLimit`` and ``x-ratelimit-*`` headers and exhausting
+    it returns 403 until the reset.
+    """
+
+    def __init__(
+        self,
+        portfolio: Portfolio,
+        *,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        budget: int = DEFAULT_BUDGET,
+        reset_after: float = DEFAULT_RESET_AFTER,
+        seed: int = 0,
+    ) -> None:
+        self.portfolio = portfolio
+        self.latency = latency
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.budget = budget
+        self.reset_after = reset_after
+        self.requests = 0
+        self.remaining = budget
+        self.reset_at: float | None = None
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), self._handler())
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/graphql"
+
+    def start(self) -> FakeGitHub:
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        """Stop serving and release the socket."""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self) -> FakeGitHub:
+        return self.start()
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # headers and body go out as separate writes on kept-alive sockets
+            disable_nagle_algorithm = True
+
+            def do_POST(self) -> None:
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                status, headers, payload = fake.handle(json.loads(body or b"{}"))
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        return Handler
+
+    def handle(self, request: dict[str, Any]) -> tuple[int, dict[str, str], Any]:
+        """Answer one GraphQL request with ``(status, headers, body)``."""
+        with self._lock:
+            self.requests += 1
+            now = time.time()
+            if self.reset_at is None or now >= self.reset_at:
+                self.reset_at = now + self.reset_after
+                self.remaining = self.budget
+            self.remaining = max(0, self.remaining - 1)
+            remaining, reset_at = self.remaining, self.reset_at
+            roll = self._random.random()
+            jitter = self._random.uniform(0.5, 1.5)
+        if self.latency:
+            time.sleep(self.latency * jitter)
+        headers = {
+            "x-ratelimit-remaining": str(remaining),
+            "x-ratelimit-reset": str(int(reset_at)),
+        }
+        if remaining <= 0:
+            headers["retry-after"] = str(max(1, int(reset_at - time.time())))
+            return 403, headers, {"message": "API rate limit exceeded"}
+        if roll < self.timeout_rate:
+            return 502, headers, {"message": "Bad gateway"}
+        if roll < self.timeout_rate + self.error_rate:
+            return 503, headers, {"message": "Service unavailable"}
+        data = self._resolve(request.get("query", ""), request.get("variables") or {})
+        data["rateLimit"] = {
+            "cost": 1,
+            "remaining": remaining,
+            "resetAt": _iso(datetime.fromtimestamp(reset_at, timezone.utc)),
+        }
+        return 200, headers, {"data": data}
+
+    def _resolve(self, query: str, variables: dict[str, Any]) -> dict[str, Any]:
+        if "repositoryOwner(" in query:
+            return {"repositoryOwner": self._listing(variables)}
+        if "history(first: $first" in query:
+            return {"repository": self._history(variables)}
+        data: dict[str, Any] = {}
+        for alias in _ALIAS.findall(query):
+            i = self.portfolio.find(variables.get(f"n{alias}", ""))
+            if i is None:
+                data[f"r{alias}"] = None
+            elif "languages(" in query:
+                data[f"r{alias}"] = {
+                    "languages": {"edges": [], "pageInfo": {"hasNextPage": False}}
+                }
+            else:
+                data[f"r{alias}"] = self._stats(i, alias, query, variables)
+        return data
+
+    def _listing(self, variables: dict[str, Any]) -> dict[str, Any]:
+        portfolio = self.portfolio
+        if variables.get("privacy") == "PUBLIC":
+            indices: Any = portfolio.public
+        else:
+            indices = range(portfolio.size)
+        page, info = _page(len(indices), variables["first"], variables.get("after"))
+        return {
+            "repositories": {
+                "nodes": [portfolio.node(indices[k]) for k in page],
+                "pageInfo": info,
+            }
+        }
+
+    def _stats(
+        self, i: int, alias: str, query: str, variables: dict[str, Any]
+    ) -> dict[str, Any]:
+        suites = self.portfolio.suites(i)
+        page, info = _page(
+            len(suites), variables["ciFirst"], variables.get(f"a{alias}")
+        )
+        target: dict[str, Any] = {
+            "checkSuites": {
+                "nodes": [{"conclusion": suites[k]} for k in page],
+                "pageInfo": info,
+            }
+        }
+        if "history(first: 0" in query:
+            count = self.portfolio.commits_since(i, variables.get("since"))
+            target["history"] = {"totalCount": count}
+        return {"defaultBranchRef": {"target": target}}
+
+    def _history(self, variables: dict[str, Any]) -> dict[str, Any] | None:
+        portfolio = self.portfolio
+        i = portfolio.find(variables.get("name", ""))
+        if i is None:
+            return None
+        total = portfolio.commits_since(i, variables.get("since"))
+        page, info = _page(total, variables["first"], variables.get("after"))
+        nodes = [
+            {
+                "oid": portfolio.oid(i, n),
+                "committedDate": _iso(portfolio.commit_date(i, n)),
+            }
+            for n in page
+        ]
+        history = {"nodes": nodes, "pageInfo": info}
+        return {"defaultBranchRef": {"target": {"history": history}}}
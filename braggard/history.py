@@ -0,0 +1,150 @@
+"""Weekly commit histograms kept between collection runs."""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from datetime import datetime
+import json
+import os
+from pathlib import Path
+import tempfile
+import threading
+from typing import IO, Any
+
+from .cache import STATE_DIR
+
+
+def history_path(data_dir: str | Path, login: str) -> Path:
+    """Return where ``login``'s weekly commit histograms are kept."""
+    return Path(data_dir) / STATE_DIR / "history" / f"{login}.ndjson"
+
+
+def iso_week(committed_date: str) -> str:
+    """Return the ISO week (``YYYY-Www``) of a GitHub ``committedDate``."""
+    year, week, _ = datetime.fromisoformat(
+        committed_date.replace("Z", "+00:00")
+    ).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+class HistoryStore:
+    """Per-repository weekly commit counts and the newest commit seen.
+
+    Remembering the newest commit OID lets later runs page ``history`` only
+    back to that commit instead of re-walking the whole branch, and the
+    ``pushedAt`` of the last walk lets repositories without pushes skip the
+    walk entirely.
+
+    The file is a journal with one line per recorded walk: :meth:`save`
+    appends only the repositories recorded since the previous save, and
+    loading replays the lines so the newest one per repository wins. A
+    torn final line is ignored, and a journal holding more than twice as
+    many lines as repositories is compacted on the next save.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._repos: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._dirty: set[str] = set()
+        self._file: IO[str] | None = None
+        # Length of the journal's intact prefix, or None to rewrite it whole.
+        self._keep: int | None = None
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return
+        end = data.rfind(b"\n") + 1
+        lines = data[:end].splitlines()
+        for line in lines:
+            try:
+                entry = json.loads(line)
+                self._repos[entry.pop("name")] = entry
+            except (ValueError, KeyError, AttributeError):
+                continue
+        if len(lines) <= 2 * len(self._repos):
+            self._keep = end
+
+    def needs_walk(self, name: str, pushed_at: str | None) -> bool:
+        """Return whether ``name`` may have commits not yet counted."""
+        with self._lock:
+            entry = self._repos.get(name)
+            return entry is None or pushed_at is None or entry["pushedAt"] != pushed_at
+
+    def newest_oid(self, name: str) -> str | None:
+        """Return the newest commit counted for ``name``, if any."""
+        with self._lock:
+            entry = self._repos.get(name)
+            return entry["oid"] if entry else None
+
+    def record(
+        self,
+        name: str,
+        pushed_at: str | None,
+        oid: str | None,
+        weeks: Mapping[str, int],
+        *,
+        incremental: bool,
+    ) -> None:
+        """Store a walk of ``name``'s history.
+
+        With ``incremental`` the ``weeks`` counted back to the previous newest
+        commit are added to the stored histogram; otherwise they replace it,
+        e.g. after a force push removed that commit from the branch.
+        """
+        with self._lock:
+            entry = self._repos.get(name) if incremental else None
+            counts = dict(entry["weeks"]) if entry else {}
+            for week, count in weeks.items():
+                counts[week] = counts.get(week, 0) + count
+            self._repos[name] = {
+                "pushedAt": pushed_at,
+                "oid": oid,
+                "weeks": dict(sorted(counts.items())),
+            }
+            self._dirty.add(name)
+
+    def weeks(self, name: str) -> dict[str, int]:
+        """Return ``name``'s commit counts keyed by ISO week."""
+        with self._lock:
+            entry = self._repos.get(name)
+            return dict(entry["weeks"]) if entry else {}
+
+    def save(self) -> None:
+        """Append the walks recorded since the last save to the journal."""
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                if self._keep is None:
+                    self._rewrite_locked()
+                self._file = open(self.path, "a", encoding="utf-8")
+                self._file.truncate(self._keep)
+            lines = [
+                json.dumps({"name": name, **self._repos[name]}, separators=(",", ":"))
+                + "\n"
+                for name in self._dirty
+            ]
+            self._dirty.clear()
+            self._file.write("".join(lines))
+            self._file.flush()
+
+    def _rewrite_locked(self) -> None:
+        """Replace the journal with one line per repository."""
+        data = "".join(
+            json.dumps({"name": name, **entry}, separators=(",", ":")) + "\n"
+            for name, entry in self._repos.items()
+        ).encode("utf-8")
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+        self._keep = len(data)
+        self._dirty.clear()
+
+    def close(self) -> None:
+        """Close the journal."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,172 @@
+"""Append-only store of how each repository's metrics changed over time."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from datetime import datetime, timezone
+import json
+import os
+from pathlib import Path
+import tempfile
+from typing import Any
+
+import numpy as np
+
+from .cache import STATE_DIR
+
+
+# Record fields tracked by the store; an entry names its field by index.
+FIELDS = ("stargazerCount", "forkCount", "commitCount")
+# prev: 1 + number of the repository's previous entry (0 for its first),
+# time: collection time in epoch seconds, delta: change from the last value.
+ENTRY = np.dtype(
+    [
+        ("prev", "<u4"),
+        ("repo", "<u4"),
+        ("field", "u1"),
+        ("time", "<u4"),
+        ("delta", "<i8"),
+    ]
+)
+
+
+def metrics_path(data_dir: str | Path, login: str) -> Path:
+    """Return where ``login``'s metric log is kept; its index sits beside it."""
+    return Path(data_dir) / STATE_DIR / "metrics" / f"{login}.log"
+
+
+def metrics_paths(data_dir: str | Path) -> dict[str, Path]:
+    """Return the metric log of every login in ``data_dir``."""
+    folder = Path(data_dir) / STATE_DIR / "metrics"
+    return {path.stem: path for path in sorted(folder.glob("*.log"))}
+
+
+def stamp_time(stamp: str) -> int:
+    """Return epoch seconds of a ``collected_at`` stamp.
+
+    Accepts both ``20240101T000000Z`` and ``2024-01-01T00:00:00Z``.
+    """
+    digits = stamp.replace("-", "").replace(":", "")
+    moment = datetime.strptime(digits[:15], "%Y%m%dT%H%M%S")
+    return int(moment.replace(tzinfo=timezone.utc).timestamp())
+
+
+class MetricStore:
+    """Changes of the :data:`FIELDS` of one account's repositories.
+
+    Each collection appends one fixed-size binary entry per repository and
+    field whose value differs from the last one stored, holding the change
+    rather than the value. Entries of one repository are chained backwards,
+    and an index beside the log keeps every repository's newest entry and
+    current values, so appending never reads the log and :meth:`history`
+    reads only that repository's entries. The index also records how many
+    entries are committed; a log tail beyond that count, left by an
+    interrupted append, is cut off by the next one.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.index_path = self.path.with_suffix(".idx")
+        self.names: list[str] = []
+        self.entries = 0
+        self._ids: dict[str, int] = {}
+        self._last: list[int] = []
+        self._values: list[list[int | None]] = []
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.entries = int(index["entries"])
+        for name, last, values in index["repos"]:
+            self._ids[name] = len(self.names)
+            self.names.append(name)
+            self._last.append(last)
+            self._values.append(values)
+
+    def append(self, collected_at: str, records: Iterable[dict[str, Any]]) -> int:
+        """Store the changes of one collection and return how many there were."""
+        time = stamp_time(collected_at)
+        rows: list[tuple[int, int, int, int, int]] = []
+        for record in records:
+            name = str(record.get("name"))
+            repo = self._ids.get(name)
+            if repo is None:
+                repo = self._ids[name] = len(self.names)
+                self.names.append(name)
+                self._last.append(0)
+                self._values.append([None] * len(FIELDS))
+            values = self._values[repo]
+            for field, key in enumerate(FIELDS):
+                value = record.get(key)
+                if value is None or value == values[field]:
+                    continue
+                rows.append(
+                    (self._last[repo], repo, field, time, value - (values[field] or 0))
+                )
+                values[field] = value
+                self._last[repo] = self.entries + len(rows)
+        if not rows:
+            return 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "ab") as f:
+            f.truncate(self.entries * ENTRY.itemsize)
+            f.write(np.array(rows, dtype=ENTRY).tobytes())
+        self.entries += len(rows)
+        self._save_index()
+        return len(rows)
+
+    def _save_index(self) -> None:
+        index = {
+            "entries": self.entries,
+            "repos": [list(repo) for repo in zip(self.names, self._last, self._values)],
+        }
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(index, f, separators=(",", ":"))
+        os.replace(tmp, self.index_path)
+
+    def history(self, name: str) -> list[tuple[int, str, int]]:
+        """Return ``(time, field, value)`` of every change to ``name``, oldest first."""
+        repo = self._ids.get(name)
+        if repo is None:
+            return []
+        chain = []
+        with open(self.path, "rb") as f:
+            entry = self._last[repo]
+            while entry:
+                f.seek((entry - 1) * ENTRY.itemsize)
+                row = np.frombuffer(f.read(ENTRY.itemsize), dtype=ENTRY)[0]
+                chain.append(row)
+                entry = int(row["prev"])
+        values = [0] * len(FIELDS)
+        changes = []
+        for row in reversed(chain):
+            values[row["field"]] += int(row["delta"])
+            changes.append(
+                (int(row["time"]), FIELDS[row["field"]], values[row["field"]])
+            )
+        return changes
+
+    def columns(self, field: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return ``(repos, times, values)`` of every change to ``field``.
+
+        ``repos`` index :attr:`names`; changes are ordered oldest first.
+        """
+        try:
+            log = np.fromfile(self.path, dtype=ENTRY, count=self.entries)
+        except OSError:
+            log = np.zeros(0, dtype=ENTRY)
+        log = log[log["field"] == FIELDS.index(field)]
+        repos = log["repo"].astype(np.int64)
+        # values are running sums of each repository's deltas
+        order = np.argsort(repos, kind="stable")
+        running = np.cumsum(log["delta"][order])
+        starts = np.flatnonzero(np.diff(repos[order], prepend=-1))
+        offsets = np.repeat(
+            running[starts] - log["delta"][order][starts],
+            np.diff(starts, append=len(order)),
+        )
+        values = np.empty(len(log), dtype=np.int64)
+        values[order] = running - offsets
+        return repos, log["time"].astype(np.int64), values
@@ -0,0 +1,133 @@
+"""Retry and request-hedging policy for GitHub API calls."""
+
+from __future__ import annotations
+
+from collections import Counter, deque
+from contextvars import ContextVar
+from http.client import IncompleteRead, RemoteDisconnected
+import random
+import threading
+
+
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 30.0
+# HTTP statuses worth retrying as-is. 502 and 504 mean GitHub gave up on a
+# query; those are retried smaller by the adaptive sizing instead.
+RETRY_STATUSES = frozenset({500, 503})
+# Transport errors where the request most likely never reached GitHub or the
+# connection died mid-response. A refused connection is not retried.
+RETRY_ERRORS = (
+    ConnectionResetError,
+    ConnectionAbortedError,
+    BrokenPipeError,
+    RemoteDisconnected,
+    IncompleteRead,
+)
+# Latency samples kept for the hedging percentile and needed before hedging.
+LATENCY_WINDOW = 256
+MIN_HEDGE_SAMPLES = 20
+# Who the current request is made for, e.g. the account being collected.
+# Counters are kept per scope as well as for the whole run.
+retry_scope: ContextVar[str] = ContextVar("retry_scope", default="")
+
+
+class RetryPolicy:
+    """Decide which failed requests to retry, when, and when to hedge.
+
+    Retries wait a "full jitter" exponential backoff: a random delay of up to
+    ``base_delay * 2**attempt`` seconds, capped at ``max_delay``, so many
+    workers that failed together do not retry in lockstep. With ``hedge``
+    set, a request still running after the observed p95 latency gets a
+    duplicate and whichever answers first wins. Counters of retries and
+    hedges are kept for the whole run and per :data:`retry_scope`, and each
+    account's are reported in its snapshot metadata.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        base_delay: float = DEFAULT_BASE_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        hedge: bool = False,
+    ) -> None:
+        self.max_retries = max(0, max_retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._scoped: dict[str, Counter[str]] = {}
+        self._latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def should_retry(
+        self,
+        attempt: int,
+        *,
+        status: int | None = None,
+        exc: BaseException | None = None,
+    ) -> bool:
+        """Return whether failed ``attempt`` (0-based) should be retried."""
+        if attempt >= self.max_retries:
+            return False
+        if exc is not None:
+            return isinstance(exc, RETRY_ERRORS)
+        return status in RETRY_STATUSES
+
+    def backoff(self, attempt: int) -> float:
+        """Return the jittered delay before retry number ``attempt + 1``."""
+        ceiling = min(self.max_delay, self.base_delay * 2**attempt)
+        return random.uniform(0, ceiling)
+
+    def count_retry(self) -> None:
+        """Count one retried request, including rate-limit retries."""
+        with self._lock:
+            self.retries += 1
+            self._count_scoped("retries")
+
+    def observe(self, latency: float) -> None:
+        """Record the latency of one completed request."""
+        with self._lock:
+            self._latencies.append(latency)
+
+    def hedge_after(self) -> float | None:
+        """Return the p95 latency after which to hedge, or ``None``."""
+        if not self.hedge:
+            return None
+        with self._lock:
+            if len(self._latencies) < MIN_HEDGE_SAMPLES:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def count_hedge(self, *, won: bool = False) -> None:
+        """Count a hedged duplicate, or that a duplicate answered first."""
+        with self._lock:
+            if won:
+                self.hedge_wins += 1
+                self._count_scoped("hedge_wins")
+            else:
+                self.hedges += 1
+                self._count_scoped("hedges")
+
+    def _count_scoped(self, counter: str) -> None:
+        self._scoped.setdefault(retry_scope.get(), Counter())[counter] += 1
+
+    def stats(self, scope: str | None = None) -> dict[str, int]:
+        """Return the retry and hedge counters, of ``scope`` if given."""
+        with self._lock:
+            if scope is not None:
+                counts = self._scoped.get(scope, Counter())
+                return {
+                    "retries": counts["retries"],
+                    "hedges": counts["hedges"],
+                    "hedge_wins": counts["hedge_wins"],
+                }
+            return {
+                "retries": self.retries,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+            }
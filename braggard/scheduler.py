@@ -0,0 +1,279 @@
+"""Rate-limit-aware concurrency control for GitHub API requests."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator, Iterable, Iterator, Mapping
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime
+import threading
+import time
+from typing import Any, Generic, TypeVar
+
+
+DEFAULT_MAX_CONCURRENCY = 8
+# Wait used for secondary rate limits that arrive without ``Retry-After``.
+SECONDARY_LIMIT_BACKOFF = 60.0
+# Poll interval for coroutines waiting on a full concurrency window.
+_ASYNC_POLL = 0.005
+# Requests left in the budget below which request starts get paced.
+DEFAULT_PACING_RESERVE = 200
+
+T = TypeVar("T")
+
+
+def _parse_reset(value: Any) -> float | None:
+    """Return a wall-clock epoch for a ``resetAt`` or ``x-ratelimit-reset``."""
+    if value in (None, ""):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+class Scheduler:
+    """Adapt in-flight request concurrency to GitHub's rate-limit feedback.
+
+    The window of concurrent requests follows AIMD: it grows by ``1/limit``
+    after every successful response and halves when GitHub throttles us with
+    a 403 or 429. The remaining point budget reported by ``rateLimit`` (or the
+    ``x-ratelimit-*`` headers) is used to pace request starts so the budget
+    lasts until ``resetAt`` once fewer than ``pacing_reserve`` requests are
+    left, instead of running dry early and stalling on hard 403s.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        min_concurrency: int = 1,
+        pacing_reserve: int = DEFAULT_PACING_RESERVE,
+    ) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.limit = float(max(self.min_concurrency, self.max_concurrency // 2))
+        self.pacing_reserve = pacing_reserve
+        self.in_flight = 0
+        self.remaining: int | None = None
+        self.reset_at: float | None = None
+        self.cost = 1.0
+        self.throttled = 0
+        self._paused_until = 0.0
+        self._next_start = 0.0
+        self._cond = threading.Condition(threading.RLock())
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold one concurrency slot for the duration of the block."""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def aslot(self) -> AsyncIterator[None]:
+        """Asyncio flavour of :meth:`slot` that never blocks the event loop."""
+        while (wait := self._try_acquire()) is not None:
+            await asyncio.sleep(wait or _ASYNC_POLL)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def acquire(self) -> None:
+        """Block until a request may start."""
+        with self._cond:
+            while (wait := self._try_acquire()) is not None:
+                self._cond.wait(timeout=wait or None)
+
+    def _try_acquire(self) -> float | None:
+        """Take a slot and return ``None``, or return how long to wait.
+
+        A wait of ``0`` means the window is full and the caller should wait
+        for a release rather than for a deadline.
+        """
+        with self._cond:
+            now = time.monotonic()
+            wait = max(self._paused_until, self._next_start) - now
+            if wait > 0:
+                return wait
+            if self.in_flight >= int(self.limit):
+                return 0.0
+            self.in_flight += 1
+            self._next_start = now + self._pace_interval()
+            return None
+
+    def release(self) -> None:
+        """Return a slot taken by :meth:`acquire`."""
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def _pace_interval(self) -> float:
+        """Seconds between request starts needed to stretch the budget."""
+        if self.remaining is None or self.reset_at is None:
+            return 0.0
+        window = self.reset_at - time.time()
+        if window <= 0:
+            return 0.0
+        if self.remaining <= 0:
+            return window
+        requests_left = self.remaining / self.cost
+        if requests_left > self.pacing_reserve:
+            return 0.0
+        return window / max(1.0, requests_left)
+
+    def record(
+        self,
+        status: int,
+        headers: Mapping[str, str] | None = None,
+        rate_limit: Mapping[str, Any] | None = None,
+        *,
+        secondary: bool = False,
+    ) -> float | None:
+        """Feed back one response and return a retry delay when throttled.
+
+        ``headers`` are the lower-cased response headers and ``rate_limit`` the
+        ``rateLimit { cost remaining resetAt }`` object from the response body,
+        if requested. ``secondary`` flags a 403 whose body mentions GitHub's
+        secondary rate limit. ``None`` means the response was not throttled.
+        """
+        headers = headers or {}
+        with self._cond:
+            self._update_budget(headers, rate_limit or {})
+            delay = self._throttle_delay(status, headers, secondary)
+            if delay is None:
+                self.limit = min(
+                    float(self.max_concurrency), self.limit + 1.0 / self.limit
+                )
+            else:
+                self.throttled += 1
+                self.limit = max(float(self.min_concurrency), self.limit / 2)
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            self._cond.notify_all()
+        return delay
+
+    def _update_budget(
+        self, headers: Mapping[str, str], rate_limit: Mapping[str, Any]
+    ) -> None:
+        remaining = rate_limit.get("remaining", headers.get("x-ratelimit-remaining"))
+        reset = rate_limit.get("resetAt", headers.get("x-ratelimit-reset"))
+        if rate_limit.get("cost"):
+            self.cost = 0.8 * self.cost + 0.2 * float(rate_limit["cost"])
+        if remaining is not None:
+            try:
+                self.remaining = int(remaining)
+            except (TypeError, ValueError):
+                pass
+        reset_at = _parse_reset(reset)
+        if reset_at is not None:
+            self.reset_at = reset_at
+
+    def _throttle_delay(
+        self, status: int, headers: Mapping[str, str], secondary: bool
+    ) -> float | None:
+        if status not in (403, 429):
+            return None
+        retry_after = headers.get("retry-after")
+        if retry_after is not None:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                pass
+        if self.remaining == 0 and self.reset_at is not None:
+            return max(0.0, self.reset_at - time.time())
+        if status == 429 or secondary:
+            return SECONDARY_LIMIT_BACKOFF
+        return None
+
+
+class FairQueue(Generic[T]):
+    """Bounded per-key queues drained round-robin by shared consumers.
+
+    Each key (an account being collected) gets its own queue of at most
+    ``maxsize`` items; :meth:`put` blocks while that queue is full so one
+    busy producer cannot starve the others. :meth:`get` takes the next item
+    from the following non-empty queue in turn and returns ``None`` once
+    every key has been closed and drained.
+    """
+
+    def __init__(self, keys: Iterable[str], maxsize: int) -> None:
+        self.maxsize = max(1, maxsize)
+        self._queues: dict[str, deque[T]] = {key: deque() for key in keys}
+        self._open = set(self._queues)
+        self._order = list(self._queues)
+        self._next = 0
+        self._cond = threading.Condition()
+
+    def put(self, key: str, item: T) -> None:
+        """Append ``item`` to ``key``'s queue, waiting while it is full."""
+        with self._cond:
+            while len(self._queues[key]) >= self.maxsize:
+                self._cond.wait()
+            self._queues[key].append(item)
+            self._cond.notify_all()
+
+    def close(self, key: str) -> None:
+        """Mark that no more items will be put for ``key``."""
+        with self._cond:
+            self._open.discard(key)
+            self._cond.notify_all()
+
+    def get(self) -> T | None:
+        """Return the next item in round-robin order, or ``None`` when done."""
+        with self._cond:
+            while True:
+                item = self._take()
+                if item is not None or not self._open:
+                    self._cond.notify_all()
+                    return item
+                self._cond.wait()
+
+    def _take(self) -> T | None:
+        for offset in range(len(self._order)):
+            index = (self._next + offset) % len(self._order)
+            items = self._queues[self._order[index]]
+            if items:
+                self._next = index + 1
+                return items.popleft()
+        return None
+
+
+class AsyncFairQueue(Generic[T]):
+    """Asyncio flavour of :class:`FairQueue` for a single event loop."""
+
+    def __init__(self, keys: Iterable[str], maxsize: int) -> None:
+        self._queue: FairQueue[T] = FairQueue(keys, maxsize)
+        self._cond = asyncio.Condition()
+
+    async def put(self, key: str, item: T) -> None:
+        """Append ``item`` to ``key``'s queue, waiting while it is full."""
+        queue = self._queue
+        async with self._cond:
+            await self._cond.wait_for(lambda: len(queue._queues[key]) < queue.maxsize)
+            queue._queues[key].append(item)
+            self._cond.notify_all()
+
+    async def close(self, key: str) -> None:
+        """Mark that no more items will be put for ``key``."""
+        async with self._cond:
+            self._queue._open.discard(key)
+            self._cond.notify_all()
+
+    async def get(self) -> T | None:
+        """Return the next item in round-robin order, or ``None`` when done."""
+        queue = self._queue
+        async with self._cond:
+            while True:
+                item = queue._take()
+                if item is not None or not queue._open:
+                    self._cond.notify_all()
+                    return item
+                await self._cond.wait()
@@ -0,0 +1,299 @@
+"""Pooled keep-alive HTTP connections for talking to the GitHub API."""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+import gzip
+import http.client
+import json
+import queue
+import ssl
+import threading
+from typing import Any
+from urllib.parse import urlsplit
+
+
+DEFAULT_MAX_CONNECTIONS = 8
+
+# Errors that mean a pooled socket was closed by the server while idle.
+_STALE_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    BrokenPipeError,
+    ConnectionResetError,
+)
+_ASYNC_STALE_ERRORS = (
+    asyncio.IncompleteReadError,
+    http.client.RemoteDisconnected,
+    BrokenPipeError,
+    ConnectionResetError,
+)
+
+
+@dataclass
+class Response:
+    """A fully read HTTP response."""
+
+    status: int
+    headers: dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+
+    def json(self) -> Any:
+        """Return the body decoded as JSON."""
+        return json.loads(self.body)
+
+
+def _split_url(url: str) -> tuple[str, str, int | None, str]:
+    """Return ``(scheme, host, port, path)`` for an HTTP(S) ``url``."""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError(f"Unsupported URL: {url}")
+    path = parts.path or "/"
+    if parts.query:
+        path += f"?{parts.query}"
+    return parts.scheme, parts.hostname, parts.port, path
+
+
+def _decode_body(raw: bytes, headers: dict[str, str]) -> bytes:
+    if headers.get("content-encoding", "").lower() == "gzip":
+        return gzip.decompress(raw)
+    return raw
+
+
+class Session:
+    """Thread-safe pool of persistent HTTP(S) connections to one endpoint.
+
+    Connections are kept alive between requests and handed out LIFO so a busy
+    pool keeps reusing warm sockets. At most ``max_connections`` requests are
+    in flight at once; further callers block until a connection frees up.
+    Responses are requested and transparently decoded as gzip.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        timeout: float = 30.0,
+    ) -> None:
+        self._scheme, self._host, self._port, self._path = _split_url(url)
+        self.url = url
+        self.max_connections = max(1, max_connections)
+        self.timeout = timeout
+        self.connections_opened = 0
+        self._idle: queue.LifoQueue[http.client.HTTPConnection] = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.max_connections)
+        self._lock = threading.Lock()
+
+    def _connect(self) -> http.client.HTTPConnection:
+        conn_cls = (
+            http.client.HTTPSConnection
+            if self._scheme == "https"
+            else http.client.HTTPConnection
+        )
+        with self._lock:
+            self.connections_opened += 1
+        return conn_cls(self._host, self._port, timeout=self.timeout)
+
+    def _checkout(self) -> tuple[http.client.HTTPConnection, bool]:
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            return self._connect(), False
+
+    def _send(
+        self,
+        conn: http.client.HTTPConnection,
+        method: str,
+        body: bytes | None,
+        headers: dict[str, str],
+    ) -> tuple[Response, bool]:
+        conn.request(method, self._path, body=body, headers=headers)
+        resp = conn.getresponse()
+        raw = resp.read()
+        resp_headers = {k.lower(): v for k, v in resp.getheaders()}
+        raw = _decode_body(raw, resp_headers)
+        return Response(resp.status, resp_headers, raw), resp.will_close
+
+    def request(
+        self,
+        method: str,
+        body: bytes | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> Response:
+        """Send one request over a pooled connection and return the response.
+
+        A reused connection that turns out to have been closed by the server
+        is replaced and the request retried once. Other socket or protocol
+        errors propagate as :class:`OSError` or
+        :class:`http.client.HTTPException`.
+        """
+        send_headers = {"Accept-Encoding": "gzip", "Connection": "keep-alive"}
+        send_headers.update(headers or {})
+        with self._slots:
+            conn, reused = self._checkout()
+            while True:
+                try:
+                    response, will_close = self._send(conn, method, body, send_headers)
+                except _STALE_ERRORS:
+                    conn.close()
+                    if not reused:
+                        raise
+                    conn, reused = self._connect(), False
+                    continue
+                except BaseException:
+                    conn.close()
+                    raise
+                break
+            if will_close:
+                conn.close()
+            else:
+                self._idle.put(conn)
+        return response
+
+    def post(self, body: bytes, headers: dict[str, str] | None = None) -> Response:
+        """Shorthand for ``request("POST", body, headers)``."""
+        return self.request("POST", body, headers)
+
+    def close(self) -> None:
+        """Close every idle connection in the pool."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_Stream = tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class AsyncSession:
+    """Asyncio counterpart of :class:`Session` built on asyncio streams.
+
+    Speaks just enough HTTP/1.1 for the GraphQL endpoint: keep-alive,
+    ``Content-Length`` or chunked bodies and gzip. Instances belong to the
+    event loop they are first used on.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        timeout: float = 30.0,
+    ) -> None:
+        self._scheme, self._host, self._port, self._path = _split_url(url)
+        self.url = url
+        self.max_connections = max(1, max_connections)
+        self.timeout = timeout
+        self.connections_opened = 0
+        self._idle: list[_Stream] = []
+        self._slots = asyncio.BoundedSemaphore(self.max_connections)
+
+    async def _connect(self) -> _Stream:
+        self.connections_opened += 1
+        https = self._scheme == "https"
+        port = self._port or (443 if https else 80)
+        return await asyncio.open_connection(
+            self._host, port, ssl=ssl.create_default_context() if https else None
+        )
+
+    async def _send(
+        self, stream: _Stream, method: str, body: bytes | None, headers: dict[str, str]
+    ) -> tuple[Response, bool]:
+        reader, writer = stream
+        lines = [f"{method} {self._path} HTTP/1.1", f"Host: {self._host}"]
+        lines += [f"{k}: {v}" for k, v in headers.items()]
+        lines.append(f"Content-Length: {len(body or b'')}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        if body:
+            writer.write(body)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise http.client.RemoteDisconnected("Connection closed by server")
+        version, status, *_ = status_line.decode("latin-1").split(" ", 2)
+        resp_headers: dict[str, str] = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").rstrip("\r\n")
+            if not line:
+                break
+            key, _, value = line.partition(":")
+            resp_headers[key.strip().lower()] = value.strip()
+
+        if resp_headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            raw = b"".join(chunks)
+        elif "content-length" in resp_headers:
+            raw = await reader.readexactly(int(resp_headers["content-length"]))
+        else:
+            raw = await reader.read()
+            resp_headers["connection"] = "close"
+
+        will_close = resp_headers.get("connection", "").lower() == "close" or (
+            version == "HTTP/1.0"
+        )
+        raw = _decode_body(raw, resp_headers)
+        return Response(int(status), resp_headers, raw), will_close
+
+    async def request(
+        self,
+        method: str,
+        body: bytes | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> Response:
+        """Send one request over a pooled connection and return the response.
+
+        Error handling mirrors :meth:`Session.request`; timeouts surface as
+        :class:`TimeoutError`.
+        """
+        send_headers = {"Accept-Encoding": "gzip", "Connection": "keep-alive"}
+        send_headers.update(headers or {})
+        async with self._slots:
+            reused = bool(self._idle)
+            stream = self._idle.pop() if reused else await self._connect()
+            while True:
+                try:
+                    response, will_close = await asyncio.wait_for(
+                        self._send(stream, method, body, send_headers), self.timeout
+                    )
+                except _ASYNC_STALE_ERRORS:
+                    stream[1].close()
+                    if not reused:
+                        raise
+                    stream, reused = await self._connect(), False
+                    continue
+                except BaseException:
+                    stream[1].close()
+                    raise
+                break
+            if will_close:
+                stream[1].close()
+            else:
+                self._idle.append(stream)
+        return response
+
+    async def post(
+        self, body: bytes, headers: dict[str, str] | None = None
+    ) -> Response:
+        """Shorthand for ``request("POST", body, headers)``."""
+        return await self.request("POST", body, headers)
+
+    async def close(self) -> None:
+        """Close every idle connection in the pool."""
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
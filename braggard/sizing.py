@@ -0,0 +1,75 @@
+"""Adaptive page and batch sizes for expensive GraphQL queries."""
+
+from __future__ import annotations
+
+import threading
+
+
+# Responses faster than this (in seconds) let a size grow again.
+DEFAULT_FAST_LATENCY = 2.0
+# Multiplicative growth applied after a fast response.
+GROWTH = 1.1
+# Weight of the newest sample in the latency and cost moving averages.
+_EWMA = 0.2
+
+
+class AdaptiveSize:
+    """Page or batch size for one query shape, tuned from its responses.
+
+    GitHub answers oversized GraphQL queries with a timeout or a 502. A
+    timed-out query halves the size so it can be retried smaller, and each
+    response faster than ``fast_latency`` grows it back by ``GROWTH`` up to
+    ``maximum``, so sizes settle just below what GitHub handles without any
+    hand tuning. Average latency and point cost are kept for reporting.
+    """
+
+    def __init__(
+        self,
+        maximum: int,
+        *,
+        minimum: int = 1,
+        fast_latency: float = DEFAULT_FAST_LATENCY,
+    ) -> None:
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.fast_latency = fast_latency
+        self.latency: float | None = None
+        self.cost: float | None = None
+        self.timeouts = 0
+        self._size = float(self.maximum)
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        """Current size to request."""
+        with self._lock:
+            return max(self.minimum, min(self.maximum, int(self._size)))
+
+    def set_maximum(self, maximum: int) -> None:
+        """Change the upper bound, e.g. when the configured batch size moves."""
+        with self._lock:
+            self.maximum = max(1, maximum)
+            self.minimum = min(self.minimum, self.maximum)
+            self._size = min(self._size, float(self.maximum))
+
+    def success(self, latency: float, cost: float | None = None) -> None:
+        """Record a response that took ``latency`` seconds."""
+        with self._lock:
+            self.latency = _average(self.latency, latency)
+            if cost is not None:
+                self.cost = _average(self.cost, float(cost))
+            if latency < self.fast_latency:
+                self._size = min(float(self.maximum), self._size * GROWTH)
+
+    def timeout(self) -> bool:
+        """Halve the size after a timeout; ``False`` if already at the minimum."""
+        with self._lock:
+            self.timeouts += 1
+            if self._size <= self.minimum:
+                return False
+            self._size = max(float(self.minimum), self._size // 2)
+            return True
+
+
+def _average(current: float | None, sample: float) -> float:
+    return sample if current is None else (1 - _EWMA) * current + _EWMA * sample
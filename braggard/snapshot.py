@@ -0,0 +1,232 @@
+"""Reading and writing collector snapshot files.
+
+Snapshots are either legacy JSON documents (a list of repositories or an
+object with a ``repos`` list) or line-delimited ``.ndjson`` files holding one
+repository per line plus a trailing ``{"_meta": {...}}`` record.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+import hashlib
+import json
+import mmap
+import os
+from pathlib import Path
+import re
+import threading
+from types import TracebackType
+from typing import Any
+
+
+SNAPSHOT_SUFFIXES = (".json", ".ndjson")
+PART_SUFFIX = ".part"
+META_KEY = "_meta"
+DEFAULT_FLUSH_EVERY = 100
+
+
+def snapshot_name(user: str, ts: str) -> str:
+    """Return the file name for ``user``'s snapshot taken at ``ts``."""
+    return f"{user}-{ts}.ndjson"
+
+
+def snapshot_paths(data_dir: str | Path) -> list[Path]:
+    """Return every finished snapshot in ``data_dir`` sorted by file name."""
+    data_dir = Path(data_dir)
+    if not data_dir.is_dir():
+        return []
+    return sorted(p for p in data_dir.iterdir() if p.suffix in SNAPSHOT_SUFFIXES)
+
+
+def user_snapshots(data_dir: str | Path, user: str) -> list[tuple[str, Path]]:
+    """Return ``(ts, path)`` of ``user``'s ``<user>-<ts>`` snapshots, oldest first."""
+    data_dir = Path(data_dir)
+    if not data_dir.is_dir():
+        return []
+    pattern = re.compile(rf"{re.escape(user)}-(\d{{8}}T\d{{6}}Z)\.(?:nd)?json")
+    return sorted(
+        (match.group(1), path)
+        for path in data_dir.glob(f"{user}-*")
+        if (match := pattern.fullmatch(path.name))
+    )
+
+
+def latest_snapshot(data_dir: str | Path, user: str) -> Path | None:
+    """Return ``user``'s newest ``<user>-<ts>`` snapshot in ``data_dir``."""
+    candidates = user_snapshots(data_dir, user)
+    return candidates[-1][1] if candidates else None
+
+
+def iter_records(path: str | Path) -> Iterator[dict[str, Any]]:
+    """Yield repository records from a snapshot in either format.
+
+    Line-delimited files are streamed; metadata lines and a truncated final
+    line (from an interrupted write) are skipped.
+    """
+    path = Path(path)
+    if path.suffix == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        yield from data if isinstance(data, list) else data.get("repos", [])
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                if not line.endswith("\n"):
+                    break
+                raise
+            if isinstance(record, dict) and META_KEY not in record:
+                yield record
+
+
+def scan_snapshot(path: str | Path) -> tuple[list[dict[str, Any]], dict[str, Any], str]:
+    """Return a snapshot's records, ``_meta`` record and SHA-256 in one pass.
+
+    The file is memory-mapped rather than read into a buffer; records follow
+    the same rules as :func:`iter_records`.
+    """
+    path = Path(path)
+    records: list[dict[str, Any]] = []
+    meta: dict[str, Any] = {}
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return records, meta, hashlib.sha256().hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            digest = hashlib.sha256(mm).hexdigest()
+            if path.suffix == ".json":
+                data = json.loads(mm[:])
+                records = data if isinstance(data, list) else data.get("repos", [])
+                return records, meta, digest
+            for line in iter(mm.readline, b""):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    if not line.endswith(b"\n"):
+                        break
+                    raise
+                if not isinstance(record, dict):
+                    continue
+                if META_KEY in record:
+                    meta = record[META_KEY]
+                else:
+                    records.append(record)
+    return records, meta, digest
+
+
+def read_meta(path: str | Path) -> dict[str, Any]:
+    """Return the ``_meta`` record of a line-delimited snapshot, if any."""
+    path = Path(path)
+    if path.suffix != ".ndjson":
+        return {}
+    meta: dict[str, Any] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if META_KEY in line:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict) and META_KEY in record:
+                    meta = record[META_KEY]
+    return meta
+
+
+class SnapshotWriter:
+    """Stream repository records into an ``.ndjson`` snapshot.
+
+    Records go to ``<path>.part`` and are flushed every ``flush_every``
+    records, so a crashed run still leaves its finished repositories on disk.
+    :meth:`close` appends the metadata record and atomically renames the part
+    file to ``path``. With ``append`` an existing part file is continued
+    after dropping any half-written final line, and :attr:`written` holds
+    the names of the records it already contains. Writes are thread-safe.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        flush_every: int = DEFAULT_FLUSH_EVERY,
+        append: bool = False,
+    ) -> None:
+        self.path = Path(path)
+        self.part_path = self.path.with_name(self.path.name + PART_SUFFIX)
+        self.flush_every = max(1, flush_every)
+        self.count = 0
+        self.written: set[str] = set()
+        self._buffer: list[str] = []
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if append and self.part_path.exists():
+            self.count = self._repair_part()
+        self._file = open(self.part_path, "a" if append else "w", encoding="utf-8")
+
+    def _repair_part(self) -> int:
+        """Truncate a torn trailing line and return the records kept."""
+        with open(self.part_path, "rb+") as f:
+            data = f.read()
+            end = data.rfind(b"\n") + 1
+            if end < len(data):
+                f.truncate(end)
+        records = [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+        self.written = {str(record.get("name")) for record in records}
+        return len(records)
+
+    def write(self, record: dict[str, Any]) -> None:
+        """Queue one repository record, flushing when the batch is full."""
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._buffer.append(line)
+            self.count += 1
+            if len(self._buffer) >= self.flush_every:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        """Write buffered records to the part file."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if self._buffer:
+            self._file.write("".join(self._buffer))
+            self._buffer.clear()
+        self._file.flush()
+
+    def close(self, meta: dict[str, Any] | None = None) -> Path:
+        """Finish the snapshot and atomically publish it at :attr:`path`."""
+        with self._lock:
+            if meta is not None:
+                self._buffer.append(json.dumps({META_KEY: meta}) + "\n")
+            self._flush_locked()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            os.replace(self.part_path, self.path)
+        return self.path
+
+    def abort(self) -> None:
+        """Flush and close without publishing, keeping the part file."""
+        with self._lock:
+            self._flush_locked()
+            self._file.close()
+
+    def __enter__(self) -> SnapshotWriter:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        if self._file.closed:
+            return
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
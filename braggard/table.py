@@ -0,0 +1,197 @@
+"""Columnar in-memory table of repository summaries for the analyzer."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+from typing import Any
+
+import numpy as np
+
+
+# Set bits in every byte value, for counting bits across packed bitsets.
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+WEEKS_PER_YEAR = 52
+
+
+class _Dictionary:
+    """Dictionary encoding of strings as dense integer codes."""
+
+    def __init__(self) -> None:
+        self.values: list[str] = []
+        self._codes: dict[str, int] = {}
+
+    def encode(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+def pack_statuses(statuses: Iterable[str | None]) -> tuple[int, int]:
+    """Return ``(count, bits)`` for CI conclusions; bit ``i`` marks a success."""
+    bits = count = 0
+    for count, status in enumerate(statuses, 1):
+        if status == "SUCCESS":
+            bits |= 1 << (count - 1)
+    return count, bits
+
+
+def _ends(offsets: np.ndarray, total: int) -> np.ndarray:
+    """Return where each slice starting at ``offsets`` ends."""
+    return np.append(offsets[1:], total)
+
+
+class RepoTable:
+    """Repository summaries stored column by column.
+
+    Names and languages are dictionary-encoded; stars, forks and commit
+    counts are ``int64`` columns. CI outcomes are bitsets packed into one
+    byte buffer with per-repository offsets, and per-language bytes and
+    weekly commits are ``(key, value)`` columns sliced per repository by
+    offset columns. Metrics are
+    computed over whole columns at once.
+
+    Rows are built from the summaries produced by
+    :func:`braggard.analyzer._summarize`.
+    """
+
+    def __init__(self, summaries: Iterable[dict[str, Any]]) -> None:
+        self.names = _Dictionary()
+        self.languages = _Dictionary()
+        name: list[int] = []
+        language: list[int] = []
+        stars: list[int] = []
+        forks: list[int] = []
+        commits: list[int] = []
+        ci_count: list[int] = []
+        ci_offset: list[int] = []
+        ci_bytes = bytearray()
+        lang_offset: list[int] = []
+        lang_code: list[int] = []
+        lang_size: list[int] = []
+        week_offset: list[int] = []
+        week_day: list[int] = []
+        week_count: list[int] = []
+        for summary in summaries:
+            name.append(self.names.encode(str(summary.get("name"))))
+            primary = summary.get("language")
+            language.append(self.languages.encode(primary) if primary else -1)
+            stars.append(int(summary.get("stars") or 0))
+            forks.append(int(summary.get("forks") or 0))
+            commits.append(int(summary.get("commits") or 0))
+            count, bits = summary.get("ci") or (0, 0)
+            ci_count.append(count)
+            ci_offset.append(len(ci_bytes))
+            ci_bytes += int(bits).to_bytes((count + 7) // 8, "little")
+            lang_offset.append(len(lang_code))
+            for lang, size in (summary.get("languages") or {}).items():
+                lang_code.append(self.languages.encode(lang))
+                lang_size.append(int(size))
+            week_offset.append(len(week_day))
+            for day, count in summary.get("weeks") or ():
+                week_day.append(day)
+                week_count.append(count)
+        self.name = np.array(name, dtype=np.int32)
+        self.language = np.array(language, dtype=np.int32)
+        self.stars = np.array(stars, dtype=np.int64)
+        self.forks = np.array(forks, dtype=np.int64)
+        self.commits = np.array(commits, dtype=np.int64)
+        self.ci_count = np.array(ci_count, dtype=np.int32)
+        self.ci_offset = np.array(ci_offset, dtype=np.int64)
+        self.ci_bits = np.frombuffer(bytes(ci_bytes), dtype=np.uint8)
+        self.lang_offset = np.array(lang_offset, dtype=np.int64)
+        self.lang_code = np.array(lang_code, dtype=np.int32)
+        self.lang_size = np.array(lang_size, dtype=np.int64)
+        self.week_offset = np.array(week_offset, dtype=np.int64)
+        self.week_day = np.array(week_day, dtype=np.int32)
+        self.week_count = np.array(week_count, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.name)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the table's columns."""
+        return sum(
+            column.nbytes
+            for column in vars(self).values()
+            if isinstance(column, np.ndarray)
+        )
+
+    def ci_successes(self) -> np.ndarray:
+        """Return each repository's number of successful CI runs."""
+        if not len(self):
+            return np.zeros(0, dtype=np.int64)
+        per_byte = _POPCOUNT[self.ci_bits].astype(np.int64)
+        # a running total turns every repository's byte range into a difference
+        running = np.concatenate(([0], np.cumsum(per_byte)))
+        return (
+            running[_ends(self.ci_offset, len(self.ci_bits))] - running[self.ci_offset]
+        )
+
+    def ci_pass_rates(self) -> np.ndarray:
+        """Return each repository's CI pass rate, ``nan`` without CI runs."""
+        rates = np.full(len(self), np.nan)
+        has_ci = self.ci_count > 0
+        rates[has_ci] = self.ci_successes()[has_ci] / self.ci_count[has_ci]
+        return rates
+
+    def commit_velocities(self, now: datetime) -> np.ndarray:
+        """Return average weekly commits over the 52 weeks before ``now``.
+
+        Repositories without weekly history get ``nan``.
+        """
+        start = (now - timedelta(weeks=WEEKS_PER_YEAR)).date().toordinal()
+        lengths = _ends(self.week_offset, len(self.week_day)) - self.week_offset
+        rows = np.repeat(np.arange(len(self)), lengths)
+        recent = self.week_day > start
+        totals = np.bincount(
+            rows[recent], weights=self.week_count[recent], minlength=len(self)
+        )
+        velocities = totals / WEEKS_PER_YEAR
+        velocities[lengths == 0] = np.nan
+        return velocities
+
+    def weekly_commits(self) -> dict[int, int]:
+        """Return commits per week, keyed by Monday ordinal, over all rows."""
+        weeks, inverse = np.unique(self.week_day, return_inverse=True)
+        counts = np.bincount(inverse, weights=self.week_count, minlength=len(weeks))
+        return dict(zip(weeks.tolist(), counts.astype(np.int64).tolist()))
+
+    def name_of(self, row: int) -> str:
+        """Return the name of the repository in ``row``."""
+        return self.names.values[self.name[row]]
+
+    def languages_of(self, row: int) -> dict[str, int]:
+        """Return bytes of code per language of the repository in ``row``."""
+        start = self.lang_offset[row]
+        end = self.lang_offset[row + 1] if row + 1 < len(self) else len(self.lang_code)
+        return {
+            self.languages.values[code]: size
+            for code, size in zip(
+                self.lang_code[start:end].tolist(), self.lang_size[start:end].tolist()
+            )
+        }
+
+    def language_counts(self) -> dict[str, int]:
+        """Return how many repositories have each primary language."""
+        codes = self.language[self.language >= 0]
+        counts = np.bincount(codes, minlength=len(self.languages.values))
+        return {
+            self.languages.values[code]: int(counts[code])
+            for code in dict.fromkeys(codes.tolist())
+        }
+
+    def language_bytes(self) -> dict[str, int]:
+        """Return bytes of code per language across all repositories."""
+        totals = np.bincount(
+            self.lang_code,
+            weights=self.lang_size,
+            minlength=len(self.languages.values),
+        )
+        return {
+            self.languages.values[code]: int(totals[code])
+            for code in dict.fromkeys(self.lang_code.tolist())
+        }
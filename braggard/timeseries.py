@@ -0,0 +1,175 @@
+"""Metrics over time, computed across every collected snapshot."""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from datetime import date
+from typing import Any
+
+import numpy as np
+
+from .table import WEEKS_PER_YEAR
+
+
+# Trailing window of growth rates and rolling commit velocity, in days.
+WINDOW_DAYS = 7 * WEEKS_PER_YEAR
+
+
+# Proleptic ordinal of 1970-01-01.
+EPOCH = date(1970, 1, 1).toordinal()
+
+
+def epoch_days(seconds: np.ndarray) -> np.ndarray:
+    """Return the day ordinals of epoch timestamps in seconds."""
+    return seconds // 86400 + EPOCH
+
+
+def day_strings(days: np.ndarray) -> list[str]:
+    """Return ISO dates (``2024-01-01``) for day ordinals."""
+    return np.datetime_as_string((days - EPOCH).astype("datetime64[D]")).tolist()
+
+
+class SnapshotMatrix:
+    """One metric per repository (rows) and snapshot day (columns).
+
+    Built from ``(repo, day, value)`` points in any order; when a repository
+    has several points on one day the last one wins. A repository keeps its
+    last known value on days it was not collected and is ``nan`` before its
+    first point.
+    """
+
+    def __init__(self, repos: np.ndarray, days: np.ndarray, values: np.ndarray):
+        self.days, columns = np.unique(days, return_inverse=True)
+        count = int(repos.max()) + 1 if len(repos) else 0
+        cells = repos.astype(np.int64) * len(self.days) + columns
+        # np.unique keeps the first occurrence, so search the points reversed
+        _, first = np.unique(cells[::-1], return_index=True)
+        keep = len(cells) - 1 - first
+        matrix = np.full((count, len(self.days)), np.nan)
+        matrix.flat[cells[keep]] = values[keep]
+        self.values = _forward_fill(matrix)
+
+    def totals(self) -> np.ndarray:
+        """Return the sum over repositories for every day."""
+        return np.nansum(self.values, axis=0)
+
+    def group_totals(self, groups: np.ndarray, count: int) -> np.ndarray:
+        """Return per-day sums of the repositories in each of ``count`` groups.
+
+        ``groups`` gives each repository's group; negative means none.
+        """
+        out = np.zeros((count, len(self.days)))
+        member = groups >= 0
+        np.add.at(out, groups[member], np.nan_to_num(self.values[member]))
+        return out
+
+    def baseline(self, window: int = WINDOW_DAYS) -> np.ndarray:
+        """Return the column of the newest day at least ``window`` days back.
+
+        ``-1`` marks days without such an earlier snapshot.
+        """
+        return np.searchsorted(self.days, self.days - window, side="right") - 1
+
+
+def _forward_fill(matrix: np.ndarray) -> np.ndarray:
+    """Replace ``nan`` cells with the last value to their left."""
+    columns = np.arange(matrix.shape[1])
+    source = np.where(np.isnan(matrix), 0, columns)
+    np.maximum.accumulate(source, axis=1, out=source)
+    return matrix[np.arange(matrix.shape[0])[:, None], source]
+
+
+def deltas(series: np.ndarray) -> np.ndarray:
+    """Return each value's change since the previous one (``0`` for the first)."""
+    return np.diff(series, prepend=series[:1])
+
+
+def growth(series: np.ndarray, baseline: np.ndarray) -> np.ndarray:
+    """Return relative change against ``series[baseline]``.
+
+    ``nan`` where there is no baseline or it is zero.
+    """
+    base = np.where(baseline >= 0, series[np.maximum(baseline, 0)], 0.0)
+    rates = np.full(len(series), np.nan)
+    valid = base > 0
+    rates[valid] = (series[valid] - base[valid]) / base[valid]
+    return rates
+
+
+def rolling_velocity(
+    weeks: np.ndarray, counts: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return every week and its average weekly commits over the trailing 52.
+
+    ``weeks`` are Monday day ordinals of the weeks with ``counts`` commits,
+    in any order and possibly repeated; weeks between them count as empty.
+    """
+    if not len(weeks):
+        return weeks, np.zeros(0)
+    first = int(weeks.min())
+    dense = np.bincount((weeks - first) // 7, weights=counts)
+    running = np.cumsum(dense)
+    window = running.copy()
+    window[WEEKS_PER_YEAR:] -= running[:-WEEKS_PER_YEAR]
+    return first + 7 * np.arange(len(dense)), window / WEEKS_PER_YEAR
+
+
+def _values(series: np.ndarray, digits: int | None = None) -> list[Any]:
+    """Return ``series`` as JSON-ready numbers, ``None`` for ``nan``."""
+    if digits is None:
+        return [int(v) for v in series.tolist()]
+    return [None if v != v else round(v, digits) for v in series.tolist()]
+
+
+def build_timeseries(
+    repos: np.ndarray,
+    days: np.ndarray,
+    stars: np.ndarray,
+    languages: Mapping[int, str | None],
+) -> dict[str, Any]:
+    """Return the snapshot-date series of ``summary.json``.
+
+    ``repos``, ``days`` and ``stars`` are the columns of star counts seen
+    per repository and day; a repository keeps its count until its next
+    point. ``languages`` maps repositories to their latest primary
+    language. The result holds the ``dates`` of all points with the total
+    ``stars`` on each, their change since the previous date, their growth
+    over the trailing 52 weeks and the stars of each primary language.
+    """
+    if not len(repos):
+        return {}
+    matrix = SnapshotMatrix(repos, days, stars)
+    totals = matrix.totals()
+
+    names: list[str] = []
+    codes: dict[str, int] = {}
+    groups = np.full(len(matrix.values), -1)
+    for repo, language in languages.items():
+        if language and repo < len(groups):
+            if language not in codes:
+                codes[language] = len(names)
+                names.append(language)
+            groups[repo] = codes[language]
+    by_language = matrix.group_totals(groups, len(names))
+    order = np.argsort(-by_language[:, -1], kind="stable").tolist()
+    return {
+        "dates": day_strings(matrix.days),
+        "stars": _values(totals),
+        "stars_delta": _values(deltas(totals)),
+        "stars_growth": _values(growth(totals, matrix.baseline()), 4),
+        "language_stars": {names[i]: _values(by_language[i]) for i in order},
+    }
+
+
+def velocity_series(weeks: Mapping[int, int]) -> dict[str, Any]:
+    """Return the rolling 52-week commit velocity of weekly commit totals.
+
+    ``weeks`` maps Monday day ordinals to commits across all repositories.
+    """
+    if not weeks:
+        return {}
+    days, velocity = rolling_velocity(
+        np.fromiter(weeks.keys(), dtype=np.int64, count=len(weeks)),
+        np.fromiter(weeks.values(), dtype=np.float64, count=len(weeks)),
+    )
+    return {"weeks": day_strings(days), "commit_velocity": _values(velocity, 4)}
@@ -1,8 +1,10 @@
+from datetime import datetime, timedelta, timezone
 import json
 
 import pytest
 
 from braggard import analyzer
+from braggard.metrics import MetricStore, metrics_path
 
 
 def test_analyze_creates_summary(tmp_path, monkeypatch):
@@ -49,3 +51,217 @@ def test_analyze_writes_to_custom_path(tmp_path, monkeypatch):
     summary = json.loads(out_path.read_text())
     assert summary["aggregate"]["repo_count"] == 1
     assert not (tmp_path / "summary.json").exists()
+
+
+def test_analyze_reads_ndjson_and_legacy_snapshots(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "old.json").write_text(
+        json.dumps([{"name": "legacy", "stargazerCount": 2}])
+    )
+    (data_dir / "demo-20240101T000000Z.ndjson").write_text(
+        json.dumps({"name": "new", "stargazerCount": 3})
+        + "\n"
+        + json.dumps({"_meta": {"user": "demo"}})
+        + "\n"
+    )
+    (data_dir / "demo-20240102T000000Z.ndjson.part").write_text(
+        json.dumps({"name": "partial", "stargazerCount": 100}) + "\n"
+    )
+
+    out_path = tmp_path / "summary.json"
+    analyzer.analyze(data_dir=data_dir, summary_path=out_path)
+
+    summary = json.loads(out_path.read_text())
+    assert summary["aggregate"]["repo_count"] == 2
+    assert summary["aggregate"]["total_stars"] == 5
+
+
+def test_analyze_commit_velocity_from_weekly_history(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    now = datetime.now(timezone.utc)
+    recent = now - timedelta(weeks=2)
+    week = "{}-W{:02d}".format(*recent.isocalendar()[:2])
+    weeks = {week: 26, "2001-W01": 500}
+    (data_dir / "demo-20240101T000000Z.ndjson").write_text(
+        json.dumps({"name": "busy", "weeklyCommits": weeks})
+        + "\n"
+        + json.dumps({"name": "quiet"})
+        + "\n"
+    )
+
+    out_path = tmp_path / "summary.json"
+    analyzer.analyze(data_dir=data_dir, summary_path=out_path)
+
+    summary = json.loads(out_path.read_text())
+    entries = {r["name"]: r for r in summary["repos"]}
+    assert entries["busy"]["commit_velocity"] == 0.5
+    assert "commit_velocity" not in entries["quiet"]
+    assert summary["aggregate"]["commits_per_week"] == 0.5
+
+
+def test_analyze_aggregates_language_bytes(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "demo-20240101T000000Z.ndjson").write_text(
+        json.dumps({"name": "a", "languages": {"Python": 300, "C": 50}})
+        + "\n"
+        + json.dumps({"name": "b", "languages": {"C": 400}})
+        + "\n"
+    )
+
+    out_path = tmp_path / "summary.json"
+    analyzer.analyze(data_dir=data_dir, summary_path=out_path)
+
+    summary = json.loads(out_path.read_text())
+    assert summary["aggregate"]["language_bytes"] == {"C": 450, "Python": 300}
+    assert summary["repos"][0]["language_bytes"] == {"Python": 300, "C": 50}
+
+
+def test_analyze_counts_each_repo_once_across_snapshots(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    for day, stars in (("01", 1), ("02", 4)):
+        (data_dir / f"demo-202401{day}T000000Z.ndjson").write_text(
+            json.dumps({"name": "demo", "stargazerCount": stars}) + "\n"
+        )
+
+    out_path = tmp_path / "summary.json"
+    analyzer.analyze(data_dir=data_dir, summary_path=out_path)
+    (data_dir / "demo-20240103T000000Z.ndjson").write_text(
+        json.dumps({"name": "demo", "stargazerCount": 6}) + "\n"
+    )
+    analyzer.analyze(data_dir=data_dir, summary_path=out_path)
+
+    summary = json.loads(out_path.read_text())
+    assert summary["aggregate"]["repo_count"] == 1
+    assert summary["aggregate"]["total_stars"] == 6
+
+
+def test_analyze_reuses_cached_partials(tmp_path, monkeypatch):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "demo-20240101T000000Z.ndjson").write_text(
+        json.dumps({"name": "a", "stargazerCount": 2, "ciStatuses": ["SUCCESS"]}) + "\n"
+    )
+    out_path = tmp_path / "summary.json"
+    analyzer.analyze(data_dir=data_dir, summary_path=out_path)
+    first = json.loads(out_path.read_text())
+
+    def unexpected(*args, **kwargs):
+        raise AssertionError("unchanged snapshots must not be re-read")
+
+    monkeypatch.setattr("braggard.catalog.scan_snapshot", unexpected)
+    monkeypatch.setattr(analyzer, "_summarize", unexpected)
+    analyzer.analyze(data_dir=data_dir, summary_path=out_path)
+    second = json.loads(out_path.read_text())
+
+    assert second["aggregate"] == first["aggregate"]
+    assert second["repos"] == [{"name": "a", "stars": 2, "ci_pass_rate": 1.0}]
+
+
+def test_analyze_streams_summary_in_json_dump_layout(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    now = datetime.now(timezone.utc)
+    week = "{}-W{:02d}".format(*(now - timedelta(weeks=1)).isocalendar()[:2])
+    (data_dir / "demo-20240101T000000Z.ndjson").write_text(
+        "".join(
+            json.dumps(
+                {
+                    "name": f"r{i}",
+                    "stargazerCount": i,
+                    "languages": {"Go": i + 1},
+                    "weeklyCommits": {week: 52},
+                }
+            )
+            + "\n"
+            for i in range(3)
+        )
+    )
+
+    out_path = tmp_path / "summary.json"
+    analyzer.analyze(data_dir=data_dir, summary_path=out_path)
+
+    text = out_path.read_text()
+    summary = json.loads(text)
+    series = summary.pop("timeseries")
+    layout = json.dumps(summary, indent=2)
+    assert text.startswith(layout[:-2])
+    assert '\n    "stars": [3],\n' in text
+    assert series["dates"] == ["2024-01-01"]
+    assert [r["name"] for r in summary["repos"]] == ["r0", "r1", "r2"]
+    assert summary["aggregate"]["commits_per_week"] == 3.0
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_analyze_writes_stars_timeline_across_snapshots(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    for day, stars in (("20240101", [1, 2]), ("20240102", [4, 2])):
+        (data_dir / f"demo-{day}T000000Z.ndjson").write_text(
+            "".join(
+                json.dumps(
+                    {
+                        "name": f"r{i}",
+                        "stargazerCount": count,
+                        "primaryLanguage": {"name": "Go"},
+                    }
+                )
+                + "\n"
+                for i, count in enumerate(stars)
+            )
+        )
+
+    out_path = tmp_path / "summary.json"
+    analyzer.analyze(data_dir=data_dir, summary_path=out_path)
+
+    series = json.loads(out_path.read_text())["timeseries"]
+    assert series["dates"] == ["2024-01-01", "2024-01-02"]
+    assert series["stars"] == [3, 6]
+    assert series["stars_delta"] == [0, 3]
+    assert series["language_stars"] == {"Go": [3, 6]}
+    assert "commit_velocity" not in series
+
+
+def test_analyze_builds_timeline_from_metric_store(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    store = MetricStore(metrics_path(data_dir, "demo"))
+    store.append("20240101T000000Z", [{"name": "a", "stargazerCount": 1}])
+    store.append("20240105T000000Z", [{"name": "a", "stargazerCount": 4}])
+    (data_dir / "demo-20240105T000000Z.ndjson").write_text(
+        json.dumps(
+            {"name": "a", "stargazerCount": 4, "primaryLanguage": {"name": "Go"}}
+        )
+        + "\n"
+    )
+
+    out_path = tmp_path / "summary.json"
+    analyzer.analyze(data_dir=data_dir, summary_path=out_path)
+
+    series = json.loads(out_path.read_text())["timeseries"]
+    assert series["dates"] == ["2024-01-01", "2024-01-05"]
+    assert series["stars"] == [1, 4]
+    assert series["language_stars"] == {"Go": [1, 4]}
+
+
+def test_analyze_timeline_falls_back_to_snapshots_without_store(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    for day, stars in (("20240101", 100), ("20240102", 120)):
+        (data_dir / f"alice-{day}T000000Z.json").write_text(
+            json.dumps([{"name": "a", "stargazerCount": stars}])
+        )
+    bob = {"name": "b", "stargazerCount": 5}
+    (data_dir / "bob-20240103T000000Z.ndjson").write_text(json.dumps(bob) + "\n")
+    MetricStore(metrics_path(data_dir, "bob")).append("20240103T000000Z", [bob])
+
+    out_path = tmp_path / "summary.json"
+    analyzer.analyze(data_dir=data_dir, summary_path=out_path)
+
+    summary = json.loads(out_path.read_text())
+    assert summary["aggregate"]["total_stars"] == 125
+    assert summary["timeseries"]["dates"] == ["2024-01-01", "2024-01-02", "2024-01-03"]
+    assert summary["timeseries"]["stars"] == [100, 120, 125]
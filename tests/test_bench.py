@@ -0,0 +1,35 @@
+from braggard import collector
+from braggard.bench import run_benchmark
+
+
+def test_benchmark_collects_synthetic_portfolio(monkeypatch):
+    url = collector.GITHUB_GRAPHQL_URL
+    monkeypatch.setattr(collector, "_sizes", {})
+    monkeypatch.setattr(collector, "_scheduler", None)
+
+    result = run_benchmark(repos=60, batch_size=10, max_concurrency=2)
+
+    assert result["repos"] == 60
+    # one listing page plus six stats batches and their check-suite pages
+    assert result["requests"] >= 7
+    assert result["requests_per_sec"] > 0
+    assert result["peak_memory_mb"] > 0
+    assert collector.GITHUB_GRAPHQL_URL == url
+
+
+def test_benchmark_pools_enough_connections_for_concurrency(monkeypatch):
+    monkeypatch.setattr(collector, "_sizes", {})
+    monkeypatch.setattr(collector, "_scheduler", None)
+    seen: list[int] = []
+    collect = collector.collect
+
+    def spy(**kwargs):
+        seen.append(kwargs["max_connections"])
+        return collect(**kwargs)
+
+    monkeypatch.setattr(collector, "collect", spy)
+
+    run_benchmark(repos=20, max_concurrency=16)
+    run_benchmark(repos=20, max_concurrency=16, max_connections=4)
+
+    assert seen == [16, 16, 4, 4]
@@ -0,0 +1,62 @@
+import os
+import time
+
+from braggard.cache import ResponseCache, cache_dir
+
+
+def test_cache_key_depends_on_inputs():
+    key = ResponseCache.key("q", {"a": 1}, "tok")
+
+    assert key == ResponseCache.key("q", {"a": 1}, "tok")
+    assert key != ResponseCache.key("q", {"a": 2}, "tok")
+    assert key != ResponseCache.key("q", {"a": 1}, "other")
+    assert key != ResponseCache.key("q", {"a": 1}, "tok", tag="2024-01-01")
+
+
+def test_cache_round_trip_and_ttl(tmp_path):
+    cache = ResponseCache(tmp_path, ttls={"repos": 60})
+    key = cache.key("q", {}, None)
+
+    assert cache.get(key, "repos") is None
+    cache.put(key, {"data": {"x": 1}})
+    assert cache.get(key, "repos") == {"data": {"x": 1}}
+    assert cache.get(key, "uncached-kind") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_expires_after_ttl(tmp_path, monkeypatch):
+    cache = ResponseCache(tmp_path, ttls={"repos": 60})
+    key = cache.key("q", {}, "secret-token")
+    cache.put(key, {"data": {}})
+
+    later = time.time() + 120
+    monkeypatch.setattr(time, "time", lambda: later)
+
+    assert cache.get(key, "repos") is None
+    assert "secret-token" not in cache._path(key).read_text()
+
+
+def test_cache_refresh_skips_reads(tmp_path):
+    ResponseCache(tmp_path).put("ab" * 32, {"data": {}})
+    cache = ResponseCache(tmp_path, read=False)
+
+    assert cache.get("ab" * 32, "repos") is None
+
+
+def test_cache_prune_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(tmp_path, max_bytes=0)
+    keys = [ResponseCache.key("q", {"i": i}, None) for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, {"data": {"i": i}})
+        os.utime(cache._path(key), (1000 + i, 1000 + i))
+    cache.max_bytes = sum(cache._path(key).stat().st_size for key in keys[1:])
+
+    cache.prune()
+
+    assert not cache._path(keys[0]).exists()
+    assert cache._path(keys[1]).exists()
+    assert cache._path(keys[2]).exists()
+
+
+def test_cache_dir_lives_under_data_dir(tmp_path):
+    assert cache_dir(tmp_path) == tmp_path / ".braggard" / "cache"
@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+import pytest
+
+from braggard.cassette import CassettePlayer, CassetteRecorder, cassette_path
+
+
+class Timeout(RuntimeError):
+    pass
+
+
+def _record(tmp_path, *entries):
+    recorder = CassetteRecorder(tmp_path)
+    for query, variables, kwargs in entries:
+        recorder.record(query, variables, 0.05, **kwargs)
+    recorder.close()
+    return recorder
+
+
+def test_cassette_round_trips_responses(tmp_path):
+    recorder = _record(
+        tmp_path,
+        ("query", {"login": "demo"}, {"response": {"data": {"n": 1}}}),
+        ("query", {"login": "other"}, {"response": {"data": {"n": 2}}}),
+    )
+
+    player = CassettePlayer(tmp_path)
+
+    assert recorder.count == 2
+    assert cassette_path(tmp_path).exists()
+    assert player.play("query", {"login": "other"}) == {"data": {"n": 2}}
+    assert player.play("query", {"login": "demo"}) == {"data": {"n": 1}}
+
+
+def test_cassette_serves_repeated_requests_in_order(tmp_path):
+    _record(
+        tmp_path,
+        ("query", {}, {"error": RuntimeError("HTTP 502"), "timeout": True}),
+        ("query", {}, {"response": {"data": {"ok": True}}}),
+    )
+    player = CassettePlayer(tmp_path, timeout_error=Timeout)
+
+    with pytest.raises(Timeout, match="HTTP 502"):
+        player.play("query", {})
+    assert player.play("query", {}) == {"data": {"ok": True}}
+    assert player.play("query", {}) == {"data": {"ok": True}}
+
+
+def test_cassette_matches_requests_with_moved_since(tmp_path):
+    _record(
+        tmp_path,
+        ("query", {"since": "2024-01-01T00:00:00Z"}, {"response": {"data": {}}}),
+    )
+    player = CassettePlayer(tmp_path)
+
+    assert player.play("query", {"since": "2024-02-01T00:00:00Z"}) == {"data": {}}
+    with pytest.raises(RuntimeError, match="No recorded response"):
+        player.play("other query", {})
+
+
+def test_cassette_replays_latency(tmp_path):
+    _record(tmp_path, ("query", {}, {"response": {"data": {}}}))
+    player = CassettePlayer(tmp_path, latency=True)
+
+    start = time.monotonic()
+    asyncio.run(player.aplay("query", {}))
+
+    assert time.monotonic() - start >= 0.05
+
+
+def test_cassette_missing_file_raises(tmp_path):
+    with pytest.raises(RuntimeError, match="Cannot read cassette"):
+        CassettePlayer(tmp_path / "missing")
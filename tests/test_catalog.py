@@ -0,0 +1,217 @@
+import json
+import os
+
+from braggard import catalog as catalog_module
+from braggard.catalog import Catalog, catalog_path
+
+
+def _write(path, *records, meta=None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lines = [json.dumps(r) for r in records]
+    if meta is not None:
+        lines.append(json.dumps({"_meta": meta}))
+    path.write_text("".join(line + "\n" for line in lines))
+
+
+def test_catalog_ingests_each_snapshot_once(tmp_path):
+    _write(tmp_path / "demo-20240101T000000Z.ndjson", {"name": "a"}, {"name": "b"})
+
+    with Catalog(catalog_path(tmp_path)) as catalog:
+        assert catalog.sync(tmp_path) == 1
+        assert catalog.sync(tmp_path) == 0
+        assert [r["name"] for r in catalog.latest()] == ["a", "b"]
+
+    assert catalog_path(tmp_path) == tmp_path / ".braggard" / "catalog.sqlite"
+
+
+def test_catalog_keeps_newest_record_per_repo(tmp_path):
+    _write(tmp_path / "demo-20240101T000000Z.ndjson", {"name": "a", "stars": 1})
+    _write(
+        tmp_path / "demo-20240102T000000Z.ndjson",
+        {"name": "a", "stars": 2},
+        {"name": "b", "stars": 5},
+    )
+    _write(tmp_path / "other-20240101T000000Z.ndjson", {"name": "a", "stars": 9})
+
+    with Catalog(catalog_path(tmp_path)) as catalog:
+        catalog.sync(tmp_path)
+        latest = [(r["name"], r["stars"]) for r in catalog.latest()]
+        history = [(ts, r["stars"]) for ts, r in catalog.history("demo", "a")]
+
+    assert sorted(latest) == [("a", 2), ("a", 9), ("b", 5)]
+    assert history == [("20240101T000000Z", 1), ("20240102T000000Z", 2)]
+
+
+def test_catalog_follows_changed_and_deleted_snapshots(tmp_path):
+    old = tmp_path / "demo-20240101T000000Z.ndjson"
+    new = tmp_path / "demo-20240102T000000Z.ndjson"
+    _write(old, {"name": "a", "stars": 1})
+    _write(new, {"name": "a", "stars": 2})
+    catalog = Catalog(catalog_path(tmp_path))
+    catalog.sync(tmp_path)
+
+    new.unlink()
+    catalog.sync(tmp_path)
+    after_delete = [r["stars"] for r in catalog.latest()]
+    _write(old, {"name": "a", "stars": 3}, {"name": "c", "stars": 4})
+    os.utime(old, ns=(1, 1))
+    ingested = catalog.sync(tmp_path)
+    after_change = [r["stars"] for r in catalog.latest()]
+    catalog.close()
+
+    assert after_delete == [1]
+    assert ingested == 1
+    assert after_change == [3, 4]
+
+
+def test_catalog_reads_owner_from_meta(tmp_path):
+    _write(
+        tmp_path / "snap.ndjson",
+        {"name": "a"},
+        meta={"user": "demo", "collected_at": "20240101T000000Z"},
+    )
+
+    with Catalog(catalog_path(tmp_path)) as catalog:
+        catalog.sync(tmp_path)
+        history = list(catalog.history("demo", "a"))
+
+    assert history == [("20240101T000000Z", {"name": "a"})]
+
+
+def _stars(record):
+    return {"stars": record.get("stars", 0)}
+
+
+def _total(summaries):
+    _total.calls += 1
+    return {"stars": sum(s["stars"] for s in summaries)}
+
+
+def test_catalog_caches_partials_per_snapshot(tmp_path):
+    _total.calls = 0
+    _write(tmp_path / "demo-20240101T000000Z.ndjson", {"name": "a", "stars": 1})
+    _write(tmp_path / "other-20240101T000000Z.ndjson", {"name": "b", "stars": 5})
+    catalog = Catalog(catalog_path(tmp_path), summarize=_stars, combine=_total)
+    catalog.sync(tmp_path)
+
+    first = catalog.partials()
+    again = catalog.partials()
+    _write(tmp_path / "demo-20240102T000000Z.ndjson", {"name": "a", "stars": 3})
+    catalog.sync(tmp_path)
+    updated = catalog.partials()
+    catalog.close()
+
+    assert sorted(p["stars"] for p in first) == [1, 5]
+    assert again == first
+    assert sorted(p["stars"] for p in updated) == [3, 5]
+    # two initial partials, then the superseded snapshot and the new one
+    assert _total.calls == 3
+
+
+def test_catalog_skips_touched_but_unchanged_snapshots(tmp_path):
+    path = tmp_path / "demo-20240101T000000Z.ndjson"
+    _write(path, {"name": "a"})
+    catalog = Catalog(catalog_path(tmp_path))
+    catalog.sync(tmp_path)
+
+    os.utime(path, ns=(1, 1))
+    ingested = catalog.sync(tmp_path)
+    catalog.close()
+
+    assert ingested == 0
+
+
+def test_catalog_rebuilds_summaries_for_new_summary_key(tmp_path):
+    _total.calls = 0
+    _write(tmp_path / "demo-20240101T000000Z.ndjson", {"name": "a", "stars": 2})
+    with Catalog(
+        catalog_path(tmp_path), summarize=_stars, combine=_total, summary_key="1"
+    ) as catalog:
+        catalog.sync(tmp_path)
+        catalog.partials()
+
+    def doubled(record):
+        return {"stars": 2 * record["stars"]}
+
+    with Catalog(
+        catalog_path(tmp_path), summarize=doubled, combine=_total, summary_key="2"
+    ) as catalog:
+        assert catalog.sync(tmp_path) == 0
+        assert list(catalog.latest_summaries()) == [{"stars": 4}]
+        assert catalog.partials() == [{"stars": 4}]
+
+
+def test_catalog_rebuilds_summaries_in_chunks(tmp_path, monkeypatch):
+    for day in (1, 2):
+        _write(
+            tmp_path / f"demo-2024010{day}T000000Z.ndjson",
+            *({"name": f"r{i}", "stars": day * i} for i in range(5)),
+        )
+    with Catalog(
+        catalog_path(tmp_path), summarize=_stars, combine=_total, summary_key="1"
+    ) as catalog:
+        catalog.sync(tmp_path)
+
+    monkeypatch.setattr(catalog_module, "REBUILD_CHUNK", 3)
+
+    def doubled(record):
+        return {"stars": 2 * record["stars"]}
+
+    with Catalog(
+        catalog_path(tmp_path), summarize=doubled, combine=_total, summary_key="2"
+    ) as catalog:
+        summaries = catalog._db.execute("SELECT summary FROM records").fetchall()
+        assert sorted(json.loads(s)["stars"] for (s,) in summaries) == sorted(
+            2 * day * i for day in (1, 2) for i in range(5)
+        )
+
+
+def test_catalog_parallel_ingest_matches_serial(tmp_path):
+    for day in range(1, 5):
+        _write(
+            tmp_path / "data" / f"demo-2024010{day}T000000Z.ndjson",
+            *({"name": f"r{i}", "stars": day * i} for i in range(day, 8)),
+        )
+    results = []
+    for workers in (1, 2):
+        with Catalog(
+            tmp_path / f"catalog-{workers}.sqlite", summarize=_stars, combine=_total
+        ) as catalog:
+            assert catalog.sync(tmp_path / "data", workers=workers) == 4
+            results.append(
+                (
+                    list(catalog.latest()),
+                    list(catalog.latest_summaries()),
+                    catalog.partials(),
+                )
+            )
+
+    assert results[0] == results[1]
+
+
+def test_catalog_series_caches_points_per_snapshot(tmp_path):
+    _write(tmp_path / "demo-20240102T000000Z.ndjson", {"name": "a"}, {"name": "b"})
+    _write(tmp_path / "demo-20240101T000000Z.ndjson", {"name": "b"})
+
+    def summarize(record):
+        return {"stars": len(record["name"]) + 10, "language": "Go"}
+
+    with Catalog(catalog_path(tmp_path), summarize=summarize) as catalog:
+        catalog.sync(tmp_path)
+        repos, snapshots, values = catalog.series("stars")
+        stamps = catalog.stamps()
+        languages = catalog.latest_values("language")
+        names = catalog.repos()
+        catalog._db.execute("UPDATE records SET summary = '{}'")
+        again = catalog.series("stars")
+
+    assert [stamps[s] for s in snapshots] == [
+        "20240101T000000Z",
+        "20240102T000000Z",
+        "20240102T000000Z",
+    ]
+    assert values.tolist() == [11.0, 11.0, 11.0]
+    assert repos[0] == repos[2] != repos[1]
+    assert names[repos[0]] == names[repos[2]] == ("demo", "b")
+    assert languages == {("demo", "a"): "Go", ("demo", "b"): "Go"}
+    assert all((a == b).all() for a, b in zip(again, (repos, snapshots, values)))
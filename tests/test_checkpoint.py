@@ -0,0 +1,86 @@
+from braggard.checkpoint import Checkpoint, checkpoint_path
+
+
+def test_checkpoint_round_trip(tmp_path):
+    path = checkpoint_path(tmp_path, "demo")
+    checkpoint = Checkpoint(path, "20240101T000000Z")
+
+    checkpoint.record_page([{"name": "a"}], "c1")
+    checkpoint.record_done(["a"])
+    loaded = Checkpoint.load(path)
+
+    assert path == tmp_path / ".braggard" / "checkpoints" / "demo.ndjson"
+    assert loaded.collected_at == "20240101T000000Z"
+    assert loaded.after == "c1"
+    assert not loaded.listing_complete
+    assert loaded.listed == [{"name": "a"}]
+    assert loaded.done == {"a"}
+
+
+def test_checkpoint_marks_listing_complete(tmp_path):
+    path = checkpoint_path(tmp_path, "demo")
+    checkpoint = Checkpoint(path, "20240101T000000Z")
+
+    checkpoint.record_page([{"name": "a"}], "c1")
+    checkpoint.record_page([{"name": "b"}], None)
+
+    loaded = Checkpoint.load(path)
+    assert loaded.listing_complete
+    assert loaded.after == "c1"
+    assert [n["name"] for n in loaded.listed] == ["a", "b"]
+
+
+def test_checkpoint_load_missing_or_corrupt(tmp_path):
+    path = checkpoint_path(tmp_path, "demo")
+    assert Checkpoint.load(path) is None
+
+    path.parent.mkdir(parents=True)
+    path.write_text("{\n")
+    assert Checkpoint.load(path) is None
+
+
+def test_checkpoint_appends_after_torn_line(tmp_path):
+    path = checkpoint_path(tmp_path, "demo")
+    checkpoint = Checkpoint(path, "20240101T000000Z")
+    checkpoint.record_page([{"name": "a"}, {"name": "b"}], None)
+    checkpoint.record_done(["a"])
+    checkpoint.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"done": ["b"')
+
+    resumed = Checkpoint.load(path)
+    resumed.record_done(["b"])
+    resumed.close()
+    loaded = Checkpoint.load(path)
+
+    assert resumed.done == {"a", "b"}
+    assert loaded.done == {"a", "b"}
+    assert [n["name"] for n in loaded.listed] == ["a", "b"]
+
+
+def test_checkpoint_done_does_not_reserialise_listed_nodes(tmp_path):
+    path = checkpoint_path(tmp_path, "demo")
+    checkpoint = Checkpoint(path, "20240101T000000Z")
+    nodes = [{"name": f"repo-{i}"} for i in range(1000)]
+    checkpoint.record_page(nodes, None)
+    listed = path.stat().st_size
+
+    # workers add stats to listed nodes while batches are marked done
+    for node in nodes:
+        node["commitCount"] = 1
+    checkpoint.record_done(["repo-0"])
+    checkpoint.close()
+
+    assert path.stat().st_size - listed < 100
+    assert "commitCount" not in Checkpoint.load(path).listed[0]
+
+
+def test_checkpoint_remove(tmp_path):
+    path = checkpoint_path(tmp_path, "demo")
+    checkpoint = Checkpoint(path, "20240101T000000Z")
+    checkpoint.record_done(["a"])
+
+    checkpoint.remove()
+    checkpoint.remove()
+
+    assert not path.exists()
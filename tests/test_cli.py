@@ -22,6 +22,20 @@ def test_cli_collect_invokes_collect(monkeypatch):
     assert called.get("called") is True
 
 
+def test_cli_collect_many_users(monkeypatch):
+    called = {}
+
+    def fake_collect(**kwargs):
+        called.update(kwargs)
+
+    monkeypatch.setattr("braggard.cli.collect", fake_collect)
+    runner = CliRunner()
+    result = runner.invoke(main, ["collect", "alice", "acme"])
+
+    assert result.exit_code == 0
+    assert called.get("user") == ["alice", "acme"]
+
+
 def test_cli_collect_full_history(monkeypatch):
     called = {}
 
@@ -36,6 +50,124 @@ def test_cli_collect_full_history(monkeypatch):
     assert called.get("full_history") is True
 
 
+def test_cli_collect_batch_size(monkeypatch):
+    called = {}
+
+    def fake_collect(**kwargs):
+        called.update(kwargs)
+
+    monkeypatch.setattr("braggard.cli.collect", fake_collect)
+    runner = CliRunner()
+    result = runner.invoke(main, ["collect", "demo", "--batch-size", "10"])
+
+    assert result.exit_code == 0
+    assert called.get("batch_size") == 10
+
+
+def test_cli_collect_engine(monkeypatch):
+    called = {}
+
+    def fake_collect(**kwargs):
+        called.update(kwargs)
+
+    monkeypatch.setattr("braggard.cli.collect", fake_collect)
+    runner = CliRunner()
+    result = runner.invoke(main, ["collect", "demo", "--engine", "async"])
+
+    assert result.exit_code == 0
+    assert called.get("engine") == "async"
+
+
+def test_cli_collect_cache_flags(monkeypatch):
+    called = {}
+
+    def fake_collect(**kwargs):
+        called.update(kwargs)
+
+    monkeypatch.setattr("braggard.cli.collect", fake_collect)
+    runner = CliRunner()
+    result = runner.invoke(main, ["collect", "demo", "--no-cache", "--refresh"])
+
+    assert result.exit_code == 0
+    assert called.get("cache") is False
+    assert called.get("refresh") is True
+    assert called.get("incremental") is False
+
+
+def test_cli_collect_incremental(monkeypatch):
+    called = {}
+
+    def fake_collect(**kwargs):
+        called.update(kwargs)
+
+    monkeypatch.setattr("braggard.cli.collect", fake_collect)
+    runner = CliRunner()
+    result = runner.invoke(main, ["collect", "demo", "--incremental"])
+
+    assert result.exit_code == 0
+    assert called.get("incremental") is True
+
+
+def test_cli_collect_resume(monkeypatch):
+    called = {}
+
+    def fake_collect(**kwargs):
+        called.update(kwargs)
+
+    monkeypatch.setattr("braggard.cli.collect", fake_collect)
+    runner = CliRunner()
+    result = runner.invoke(main, ["collect", "demo", "--resume"])
+
+    assert result.exit_code == 0
+    assert called.get("resume") is True
+
+
+def test_cli_collect_weekly_history(monkeypatch):
+    called = {}
+
+    def fake_collect(**kwargs):
+        called.update(kwargs)
+
+    monkeypatch.setattr("braggard.cli.collect", fake_collect)
+    runner = CliRunner()
+    result = runner.invoke(main, ["collect", "demo", "--weekly-history"])
+
+    assert result.exit_code == 0
+    assert called.get("weekly_history") is True
+
+
+def test_cli_collect_hedge(monkeypatch):
+    called = {}
+
+    def fake_collect(**kwargs):
+        called.update(kwargs)
+
+    monkeypatch.setattr("braggard.cli.collect", fake_collect)
+    runner = CliRunner()
+    result = runner.invoke(main, ["collect", "demo", "--hedge"])
+
+    assert result.exit_code == 0
+    assert called.get("hedge") is True
+
+
+def test_cli_collect_replay(tmp_path, monkeypatch):
+    called = {}
+
+    def fake_collect(**kwargs):
+        called.update(kwargs)
+
+    monkeypatch.setattr("braggard.cli.collect", fake_collect)
+    runner = CliRunner()
+    result = runner.invoke(
+        main, ["collect", "demo", "--replay", str(tmp_path), "--replay-latency"]
+    )
+
+    assert result.exit_code == 0
+    assert called["replay"] == str(tmp_path)
+    assert called["replay_latency"] is True
+    assert called["record"] is None
+
+
 def test_cli_analyze_invokes_analyze(monkeypatch):
     called = {}
 
@@ -70,6 +202,30 @@ def test_cli_render_invokes_render(monkeypatch):
     assert called.get("output_format") == "html"
 
 
+def test_cli_bench_reports_throughput(monkeypatch):
+    called = {}
+
+    def fake_benchmark(**kwargs):
+        called.update(kwargs)
+        return {
+            "repos": 50,
+            "requests": 10,
+            "wall_time": 2.0,
+            "requests_per_sec": 5.0,
+            "peak_memory_mb": 1.5,
+            "retries": 0,
+        }
+
+    monkeypatch.setattr("braggard.cli.run_benchmark", fake_benchmark)
+    runner = CliRunner()
+    result = runner.invoke(main, ["bench", "--repos", "50", "--engine", "async"])
+
+    assert result.exit_code == 0
+    assert called["repos"] == 50
+    assert called["engine"] == "async"
+    assert "requests/sec: 5.0" in result.output
+
+
 def test_cli_deploy_invokes_deploy(monkeypatch):
     called = {}
 
@@ -1,45 +1,74 @@
-import io
+import asyncio
+from datetime import datetime
 import json
-import urllib.error
-import urllib.request
+import threading
+import time
 
 import pytest
 
 from braggard import collector
+from braggard.cache import cache_dir
+from braggard.checkpoint import Checkpoint, checkpoint_path
+from braggard.metrics import MetricStore, metrics_path, stamp_time
+from braggard.retry import RetryPolicy
+from braggard.scheduler import Scheduler
+from braggard.session import Response
+from braggard.snapshot import iter_records, read_meta
 
 
-def test_request_error_raises(monkeypatch):
-    def fail(_):
-        raise urllib.error.URLError("boom")
+class FakeSession:
+    def __init__(self, payload=None, status=200, exc=None):
+        self.payload = payload
+        self.status = status
+        self.exc = exc
+        self.sent: list[tuple[bytes, dict]] = []
+
+    def post(self, body, headers=None):
+        self.sent.append((body, headers))
+        if self.exc:
+            raise self.exc
+        return Response(self.status, {}, json.dumps(self.payload).encode())
+
 
-    monkeypatch.setattr(urllib.request, "urlopen", fail)
+def test_request_error_raises(monkeypatch):
+    session = FakeSession(exc=ConnectionRefusedError("boom"))
+    monkeypatch.setattr(collector, "_get_session", lambda *a: session)
     with pytest.raises(RuntimeError, match="Request to GitHub failed"):
         collector._request("query", {}, None)
 
 
-def test_request_api_errors_raise(monkeypatch):
-    class FakeResp(io.BytesIO):
-        def __enter__(self):
-            return self
-
-        def __exit__(self, *args):
-            pass
+def test_request_http_status_raises(monkeypatch):
+    session = FakeSession({"message": "Bad credentials"}, status=401)
+    monkeypatch.setattr(collector, "_get_session", lambda *a: session)
+    with pytest.raises(RuntimeError, match="HTTP 401"):
+        collector._request("query", {}, None)
 
-    def fake_urlopen(_):
-        data = {"errors": [{"message": "bad"}]}
-        return FakeResp(json.dumps(data).encode())
 
-    monkeypatch.setattr(urllib.request, "urlopen", fake_urlopen)
+def test_request_api_errors_raise(monkeypatch):
+    session = FakeSession({"errors": [{"message": "bad"}]})
+    monkeypatch.setattr(collector, "_get_session", lambda *a: session)
 
     with pytest.raises(RuntimeError, match="GitHub API errors"):
         collector._request("query", {}, None)
 
 
+def test_request_sends_token_through_session(monkeypatch):
+    session = FakeSession({"data": {}})
+    monkeypatch.setattr(collector, "_get_session", lambda *a: session)
+
+    collector._request("query", {"login": "demo"}, "secret")
+
+    body, headers = session.sent[0]
+    assert json.loads(body)["variables"] == {"login": "demo"}
+    assert headers["Authorization"] == "bearer secret"
+    assert headers["User-Agent"].startswith("braggard/")
+
+
 def test_collect_creates_snapshot(tmp_path, monkeypatch):
-    def fake_request(query, variables, token):
+    def fake_request(query, variables, token, **kwargs):
         return {
             "data": {
-                "user": {
+                "repositoryOwner": {
                     "repositories": {
                         "nodes": [
                             {
@@ -58,33 +87,83 @@ def test_collect_creates_snapshot(tmp_path, monkeypatch):
 
     collector.collect(user="demo", include_private=True, data_dir=tmp_path)
 
-    files = list(tmp_path.glob("*.json"))
+    files = list(tmp_path.glob("*.ndjson"))
     assert len(files) == 1
+    assert not list(tmp_path.glob("*.part"))
+    meta = read_meta(files[0])
+    assert meta["user"] == "demo"
+    assert meta["repo_count"] == 1
 
 
-def test_collect_full_history_includes_commits(tmp_path, monkeypatch):
-    def fake_request(query, variables, token):
-        if "repositories(" in query:
-            return {
-                "data": {
-                    "user": {
-                        "repositories": {
-                            "nodes": [
-                                {
-                                    "name": "demo",
-                                    "isPrivate": False,
-                                    "pushedAt": "2024-01-01T00:00:00Z",
-                                }
-                            ],
-                            "pageInfo": {"hasNextPage": False},
-                        }
+def test_collect_appends_metric_changes_after_older_snapshots(tmp_path, monkeypatch):
+    (tmp_path / "demo-20240101T000000Z.ndjson").write_text(
+        json.dumps({"name": "demo", "stargazerCount": 3}) + "\n"
+    )
+    node = {
+        "name": "demo",
+        "stargazerCount": 5,
+        "isPrivate": False,
+        "pushedAt": "2024-01-01T00:00:00Z",
+    }
+
+    def fake_request(query, variables, token, **kwargs):
+        return {
+            "data": {
+                "repositoryOwner": {
+                    "repositories": {
+                        "nodes": [node],
+                        "pageInfo": {"hasNextPage": False},
                     }
                 }
             }
+        }
+
+    monkeypatch.setattr(collector, "_request", fake_request)
+
+    collector.collect(user="demo", include_private=True, data_dir=tmp_path)
+
+    store = MetricStore(metrics_path(tmp_path, "demo"))
+    stars = [
+        (t, v) for t, field, v in store.history("demo") if field == "stargazerCount"
+    ]
+    assert [value for _, value in stars] == [3, 5]
+    assert stars[0][0] == stamp_time("20240101T000000Z") < stars[1][0]
+
+
+def _snapshot(data_dir):
+    files = list(data_dir.glob("*.ndjson"))
+    assert len(files) == 1
+    return list(iter_records(files[0]))
+
+
+def _listing(*names):
+    return {
+        "data": {
+            "repositoryOwner": {
+                "repositories": {
+                    "nodes": [
+                        {
+                            "name": name,
+                            "isPrivate": False,
+                            "pushedAt": "2024-01-01T00:00:00Z",
+                        }
+                        for name in names
+                    ],
+                    "pageInfo": {"hasNextPage": False},
+                }
+            }
+        }
+    }
+
+
+def test_collect_full_history_includes_commits(tmp_path, monkeypatch):
+    def fake_request(query, variables, token, **kwargs):
+        if "repositories(" in query:
+            return _listing("demo")
         if "history(" in query:
             return {
                 "data": {
-                    "repository": {
+                    "r0": {
                         "defaultBranchRef": {"target": {"history": {"totalCount": 7}}}
                     }
                 }
@@ -97,34 +176,18 @@ def test_collect_full_history_includes_commits(tmp_path, monkeypatch):
         user="demo", include_private=True, data_dir=tmp_path, full_history=True
     )
 
-    files = list(tmp_path.glob("*.json"))
-    data = json.loads(files[0].read_text())
+    data = _snapshot(tmp_path)
     assert data[0]["commitCount"] == 7
 
 
 def test_collect_includes_ci_statuses(tmp_path, monkeypatch):
-    def fake_request(query, variables, token):
+    def fake_request(query, variables, token, **kwargs):
         if "repositories(" in query:
-            return {
-                "data": {
-                    "user": {
-                        "repositories": {
-                            "nodes": [
-                                {
-                                    "name": "demo",
-                                    "isPrivate": False,
-                                    "pushedAt": "2024-01-01T00:00:00Z",
-                                }
-                            ],
-                            "pageInfo": {"hasNextPage": False},
-                        }
-                    }
-                }
-            }
+            return _listing("demo")
         if "checkSuites" in query:
             return {
                 "data": {
-                    "repository": {
+                    "r0": {
                         "defaultBranchRef": {
                             "target": {
                                 "checkSuites": {
@@ -144,84 +207,1049 @@ def test_collect_includes_ci_statuses(tmp_path, monkeypatch):
 
     collector.collect(user="demo", include_private=True, data_dir=tmp_path)
 
-    files = list(tmp_path.glob("*.json"))
-    data = json.loads(files[0].read_text())
+    data = _snapshot(tmp_path)
     assert data[0]["ciStatuses"] == ["SUCCESS", "FAILURE"]
 
 
-def test_collect_dispatches_parallel_requests(tmp_path, monkeypatch):
-    calls: list[tuple[str, str]] = []
+def test_collect_batches_repo_stats(tmp_path, monkeypatch):
+    calls: list[dict] = []
 
-    def fake_request(query, variables, token):
-        repo = variables.get("repo")
+    def fake_request(query, variables, token, **kwargs):
         if "repositories(" in query:
-            return {
-                "data": {
-                    "user": {
-                        "repositories": {
-                            "nodes": [
-                                {
-                                    "name": "one",
-                                    "isPrivate": False,
-                                    "pushedAt": "2024-01-01T00:00:00Z",
-                                },
-                                {
-                                    "name": "two",
-                                    "isPrivate": False,
-                                    "pushedAt": "2024-01-01T00:00:00Z",
-                                },
-                            ],
-                            "pageInfo": {"hasNextPage": False},
+            return _listing("one", "two", "three")
+        calls.append(dict(variables))
+        aliases = sorted(k for k in variables if k.startswith("n"))
+        return {
+            "data": {
+                "r" + alias[1:]: {
+                    "defaultBranchRef": {"target": {"history": {"totalCount": 1}}}
+                }
+                for alias in aliases
+            }
+        }
+
+    monkeypatch.setattr(collector, "_request", fake_request)
+
+    collector.collect(
+        user="demo",
+        include_private=True,
+        data_dir=tmp_path,
+        batch_size=2,
+        max_concurrency=1,
+    )
+
+    assert len(calls) == 2
+    assert [c["n0"] for c in calls] == ["one", "three"]
+    assert calls[0]["n1"] == "two"
+    data = _snapshot(tmp_path)
+    assert [r["commitCount"] for r in data] == [1, 1, 1]
+
+
+def test_fetch_repo_stats_splits_alias_errors(monkeypatch):
+    def fake_request(query, variables, token, **kwargs):
+        assert kwargs.get("partial") is True
+        assert "r0: repository(owner: $login, name: $n0)" in query
+        return {
+            "data": {
+                "r0": {
+                    "defaultBranchRef": {
+                        "target": {
+                            "history": {"totalCount": 4},
+                            "checkSuites": {"nodes": [{"conclusion": "SUCCESS"}]},
                         }
                     }
+                },
+                "r1": None,
+            },
+            "errors": [{"path": ["r1"], "message": "Could not resolve"}],
+        }
+
+    monkeypatch.setattr(collector, "_request", fake_request)
+
+    stats = collector._fetch_repo_stats("demo", ["ok", "gone"], None)
+
+    assert stats["ok"] == {"commitCount": 4, "ciStatuses": ["SUCCESS"]}
+    assert stats["gone"] == {"statsError": True}
+
+
+def test_fetch_repo_stats_request_failure(monkeypatch):
+    def fail(query, variables, token, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(collector, "_request", fail)
+
+    stats = collector._fetch_repo_stats("demo", ["a", "b"], None)
+
+    assert stats == {"a": {"statsError": True}, "b": {"statsError": True}}
+
+
+def test_request_partial_returns_data(monkeypatch):
+    session = FakeSession({"data": {"r0": {}}, "errors": [{"path": ["r1"]}]})
+    monkeypatch.setattr(collector, "_get_session", lambda *a: session)
+
+    data = collector._request("query", {}, None, partial=True)
+
+    assert data["data"] == {"r0": {}}
+
+
+def _stats_response(variables):
+    aliases = sorted(k for k in variables if k.startswith("n"))
+    return {
+        "data": {
+            "r" + alias[1:]: {
+                "defaultBranchRef": {
+                    "target": {
+                        "history": {"totalCount": len(variables[alias])},
+                        "checkSuites": {"nodes": [{"conclusion": "SUCCESS"}]},
+                    }
                 }
             }
-        if "history(" in query:
-            calls.append(("commit", repo))
+            for alias in aliases
+        }
+    }
+
+
+def test_collect_async_engine_matches_threaded(tmp_path, monkeypatch):
+    def fake_request(query, variables, token, **kwargs):
+        if "repositories(" in query:
+            return _listing("alpha", "be", "gamma")
+        return _stats_response(variables)
+
+    async def fake_arequest(query, variables, token, **kwargs):
+        return fake_request(query, variables, token, **kwargs)
+
+    monkeypatch.setattr(collector, "_request", fake_request)
+    monkeypatch.setattr(collector, "_arequest", fake_arequest)
+
+    threaded = tmp_path / "thread"
+    async_dir = tmp_path / "async"
+    collector.collect(
+        user="demo", include_private=True, data_dir=threaded, batch_size=2
+    )
+    collector.collect(
+        user="demo",
+        include_private=True,
+        data_dir=async_dir,
+        batch_size=2,
+        engine="async",
+    )
+
+    thread_data = sorted(_snapshot(threaded), key=lambda r: r["name"])
+    async_data = sorted(_snapshot(async_dir), key=lambda r: r["name"])
+    assert async_data == thread_data
+    assert [r["commitCount"] for r in async_data] == [5, 2, 5]
+
+
+def test_collect_rejects_unknown_engine(tmp_path):
+    with pytest.raises(ValueError, match="Unknown engine"):
+        collector.collect(
+            user="demo", include_private=True, data_dir=tmp_path, engine="fork"
+        )
+
+
+def test_collect_reuses_cached_responses(tmp_path, monkeypatch):
+    calls: list[str] = []
+
+    def fake_request(query, variables, token, **kwargs):
+        calls.append("list" if "repositories(" in query else "stats")
+        if "repositories(" in query:
+            return _listing("demo")
+        return _stats_response(variables)
+
+    monkeypatch.setattr(collector, "_request", fake_request)
+
+    collector.collect(user="demo", include_private=True, data_dir=tmp_path)
+    collector.collect(user="demo", include_private=True, data_dir=tmp_path)
+    assert calls == ["list", "stats"]
+
+    collector.collect(
+        user="demo", include_private=True, data_dir=tmp_path, refresh=True
+    )
+    collector.collect(user="demo", include_private=True, data_dir=tmp_path, cache=False)
+    assert calls == ["list", "stats"] * 3
+
+
+def test_collect_incremental_refetches_failed_stats(tmp_path, monkeypatch):
+    fail = {"stats": True}
+
+    def fake_request(query, variables, token, **kwargs):
+        if "repositories(" in query:
+            return _listing("app")
+        if fail["stats"]:
+            raise RuntimeError("boom")
+        return _stats_response(variables)
+
+    monkeypatch.setattr(collector, "_request", fake_request)
+    options = dict(user="demo", include_private=True, data_dir=tmp_path, cache=False)
+
+    collector.collect(**options)
+    (first,) = _snapshot(tmp_path)
+    assert first["statsError"] is True
+    assert "commitCount" not in first
+    snapshot = next(tmp_path.glob("*.ndjson"))
+    assert read_meta(snapshot)["stats_failures"] == 1
+    snapshot.rename(tmp_path / "demo-20240101T000000Z.ndjson")
+
+    fail["stats"] = False
+    collector.collect(incremental=True, **options)
+
+    latest = max(tmp_path.glob("*.ndjson"))
+    assert read_meta(latest)["stats_failures"] == 0
+    (second,) = iter_records(latest)
+    assert second["commitCount"] == 3
+    assert "statsError" not in second
+    store = MetricStore(metrics_path(tmp_path, "demo"))
+    assert [c[1:] for c in store.history("app") if c[1] == "commitCount"] == [
+        ("commitCount", 3)
+    ]
+
+
+def test_collect_reuses_windowed_stats_the_next_day(tmp_path, monkeypatch):
+    calls: list[str] = []
+    now = [datetime(2024, 1, 1, 12)]
+
+    class FakeDatetime(datetime):
+        @classmethod
+        def utcnow(cls):
+            return now[0]
+
+    def fake_request(query, variables, token, **kwargs):
+        calls.append("list" if "repositories(" in query else "stats")
+        if "repositories(" in query:
+            return _listing("demo")
+        assert variables["since"].startswith("2021-01-0")
+        return _stats_response(variables)
+
+    monkeypatch.setattr(collector, "datetime", FakeDatetime)
+    monkeypatch.setattr(collector, "_request", fake_request)
+    options = dict(user="demo", include_private=True, data_dir=tmp_path)
+
+    collector.collect(**options)
+    now[0] = datetime(2024, 1, 2, 12)
+    collector.collect(**options)
+    assert calls == ["list", "stats"]
+
+
+def test_collect_incremental_only_queries_pushed_repos(tmp_path, monkeypatch):
+    previous = [
+        {
+            "name": "stale",
+            "pushedAt": "2024-01-01T00:00:00Z",
+            "commitCount": 40,
+            "ciStatuses": ["FAILURE"],
+        },
+        {
+            "name": "fresh",
+            "pushedAt": "2023-06-01T00:00:00Z",
+            "commitCount": 1,
+            "ciStatuses": [],
+        },
+    ]
+    (tmp_path / "demo-20240101T000000Z.json").write_text(json.dumps(previous))
+    (tmp_path / "demo-20230101T000000Z.json").write_text("[]")
+    queried: list[str] = []
+
+    def fake_request(query, variables, token, **kwargs):
+        if "repositories(" in query:
+            return _listing("stale", "fresh")
+        queried.extend(v for k, v in variables.items() if k.startswith("n"))
+        return _stats_response(variables)
+
+    monkeypatch.setattr(collector, "_request", fake_request)
+
+    collector.collect(
+        user="demo",
+        include_private=True,
+        data_dir=tmp_path,
+        cache=False,
+        incremental=True,
+    )
+
+    assert queried == ["fresh"]
+    data = {r["name"]: r for r in _snapshot(tmp_path)}
+    assert data["stale"]["commitCount"] == 40
+    assert data["stale"]["ciStatuses"] == ["FAILURE"]
+    assert data["fresh"]["commitCount"] == 5
+
+
+def test_collect_resume_continues_listing_from_cursor(tmp_path, monkeypatch):
+    cursors: list[str | None] = []
+    fail = {"page": True}
+
+    def fake_request(query, variables, token, **kwargs):
+        if "repositories(" not in query:
+            return _stats_response(variables)
+        cursors.append(variables["after"])
+        if variables["after"] is None:
+            page = _listing("alpha")
+            page["data"]["repositoryOwner"]["repositories"]["pageInfo"] = {
+                "hasNextPage": True,
+                "endCursor": "c1",
+            }
+            return page
+        if fail["page"]:
+            raise RuntimeError("boom")
+        return _listing("beta")
+
+    monkeypatch.setattr(collector, "_request", fake_request)
+    options = dict(user="demo", include_private=True, data_dir=tmp_path, cache=False)
+
+    with pytest.raises(RuntimeError, match="boom"):
+        collector.collect(**options)
+    assert list(tmp_path.glob("*.part"))
+
+    fail["page"] = False
+    collector.collect(resume=True, **options)
+
+    assert cursors == [None, "c1", "c1"]
+    assert sorted(r["name"] for r in _snapshot(tmp_path)) == ["alpha", "beta"]
+    assert not list(tmp_path.glob("*.part"))
+    assert not checkpoint_path(tmp_path, "demo").exists()
+
+
+def test_collect_resume_skips_finished_repos(tmp_path, monkeypatch):
+    queried: list[str] = []
+    fail = {"gamma": True}
+
+    def fake_request(query, variables, token, **kwargs):
+        if "repositories(" in query:
+            return _listing("alpha", "beta", "gamma")
+        names = [v for k, v in variables.items() if k.startswith("n")]
+        queried.extend(names)
+        if fail["gamma"] and "gamma" in names:
+            raise KeyboardInterrupt
+        return _stats_response(variables)
+
+    monkeypatch.setattr(collector, "_request", fake_request)
+    options = dict(
+        user="demo",
+        include_private=True,
+        data_dir=tmp_path,
+        batch_size=1,
+        max_concurrency=1,
+        cache=False,
+    )
+
+    with pytest.raises(KeyboardInterrupt):
+        collector.collect(**options)
+    done = Checkpoint.load(checkpoint_path(tmp_path, "demo")).done
+    part = next(tmp_path.glob("*.part"))
+    assert done == {r["name"] for r in iter_records(part)}
+    assert "gamma" not in done
+
+    queried.clear()
+    fail["gamma"] = False
+    collector.collect(resume=True, **options)
+
+    assert sorted(queried) == sorted({"alpha", "beta", "gamma"} - done)
+    data = _snapshot(tmp_path)
+    assert sorted(r["name"] for r in data) == ["alpha", "beta", "gamma"]
+    assert read_meta(next(tmp_path.glob("*.ndjson")))["repo_count"] == 3
+
+
+def test_collect_resume_does_not_duplicate_unmarked_records(tmp_path, monkeypatch):
+    queried: list[str] = []
+    record_done = Checkpoint.record_done
+
+    def fake_request(query, variables, token, **kwargs):
+        if "repositories(" in query:
+            return _listing("alpha", "beta", "gamma")
+        queried.extend(v for k, v in variables.items() if k.startswith("n"))
+        return _stats_response(variables)
+
+    def crash_after_flush(self, names):
+        if "beta" in names:
+            raise KeyboardInterrupt
+        record_done(self, names)
+
+    monkeypatch.setattr(collector, "_request", fake_request)
+    monkeypatch.setattr(Checkpoint, "record_done", crash_after_flush)
+    options = dict(
+        user="demo",
+        include_private=True,
+        data_dir=tmp_path,
+        batch_size=1,
+        max_concurrency=1,
+        cache=False,
+    )
+
+    with pytest.raises(KeyboardInterrupt):
+        collector.collect(**options)
+    part = next(tmp_path.glob("*.part"))
+    assert "beta" in {r["name"] for r in iter_records(part)}
+
+    monkeypatch.setattr(Checkpoint, "record_done", record_done)
+    queried.clear()
+    collector.collect(resume=True, **options)
+
+    assert "beta" not in queried
+    assert sorted(r["name"] for r in _snapshot(tmp_path)) == ["alpha", "beta", "gamma"]
+    assert read_meta(next(tmp_path.glob("*.ndjson")))["repo_count"] == 3
+
+
+def test_collect_resume_counts_earlier_stats_failures(tmp_path, monkeypatch):
+    fail = {"gamma": True}
+
+    def fake_request(query, variables, token, **kwargs):
+        if "repositories(" in query:
+            return _listing("alpha", "beta", "gamma")
+        names = [v for k, v in variables.items() if k.startswith("n")]
+        if "alpha" in names:
+            raise RuntimeError("boom")
+        if fail["gamma"] and "gamma" in names:
+            raise KeyboardInterrupt
+        return _stats_response(variables)
+
+    monkeypatch.setattr(collector, "_request", fake_request)
+    options = dict(
+        user="demo",
+        include_private=True,
+        data_dir=tmp_path,
+        batch_size=1,
+        max_concurrency=1,
+        cache=False,
+    )
+
+    with pytest.raises(KeyboardInterrupt):
+        collector.collect(**options)
+    fail["gamma"] = False
+    collector.collect(resume=True, **options)
+
+    meta = read_meta(next(tmp_path.glob("*.ndjson")))
+    assert meta["repo_count"] == 3
+    assert meta["stats_failures"] == 1
+
+
+def _page(nodes, cursor=None):
+    return {
+        "data": {
+            "repositoryOwner": {
+                "repositories": {
+                    "nodes": nodes,
+                    "pageInfo": {
+                        "hasNextPage": cursor is not None,
+                        "endCursor": cursor,
+                    },
+                }
+            }
+        }
+    }
+
+
+def test_collect_stops_paging_past_since(tmp_path, monkeypatch):
+    pages = {
+        None: _page(
+            [
+                {"name": "new", "pushedAt": "2024-03-01T00:00:00Z"},
+                {"name": "mid", "pushedAt": "2024-02-01T00:00:00Z"},
+            ],
+            "c1",
+        ),
+        "c1": _page(
+            [
+                {"name": "edge", "pushedAt": "2024-01-15T00:00:00Z"},
+                {"name": "old", "pushedAt": "2023-06-01T00:00:00Z"},
+            ],
+            "c2",
+        ),
+    }
+    listed: list[dict] = []
+
+    def fake_request(query, variables, token, **kwargs):
+        if "repositories(" in query:
+            listed.append(variables)
+            return pages[variables["after"]]
+        return _stats_response(variables)
+
+    monkeypatch.setattr(collector, "_request", fake_request)
+
+    collector.collect(
+        user="demo",
+        include_private=False,
+        since="2024-01-01",
+        data_dir=tmp_path,
+        cache=False,
+    )
+
+    assert [v["after"] for v in listed] == [None, "c1"]
+    assert all(v["privacy"] == "PUBLIC" for v in listed)
+    assert sorted(r["name"] for r in _snapshot(tmp_path)) == ["edge", "mid", "new"]
+
+
+def test_collect_enriches_pages_as_they_arrive(tmp_path, monkeypatch):
+    first_stats = threading.Event()
+
+    def fake_request(query, variables, token, **kwargs):
+        if "repositories(" in query:
+            if variables["after"] is None:
+                return _page([{"name": "a", "pushedAt": "2024-01-02T00:00:00Z"}], "c1")
+            # the second page is only served once page one is being enriched
+            assert first_stats.wait(timeout=5)
+            return _page([{"name": "b", "pushedAt": "2024-01-01T00:00:00Z"}])
+        first_stats.set()
+        return _stats_response(variables)
+
+    monkeypatch.setattr(collector, "_request", fake_request)
+
+    collector.collect(user="demo", include_private=True, data_dir=tmp_path)
+
+    assert sorted(r["name"] for r in _snapshot(tmp_path)) == ["a", "b"]
+
+
+@pytest.mark.parametrize("engine", ["thread", "async"])
+def test_collect_listing_waits_for_full_queue(tmp_path, monkeypatch, engine):
+    pages_listed = 0
+    max_ahead = 0
+    enriched = 0
+    lock = threading.Lock()
+
+    def fake_request(query, variables, token, **kwargs):
+        nonlocal pages_listed, max_ahead, enriched
+        with lock:
+            if "repositories(" in query:
+                page = int(variables["after"] or 0)
+                pages_listed += 1
+                max_ahead = max(max_ahead, pages_listed - enriched)
+                node = {"name": f"r{page}", "pushedAt": "2024-01-01T00:00:00Z"}
+                return _page([node], str(page + 1) if page < 9 else None)
+            enriched += 1
+        time.sleep(0.01)
+        return _stats_response(variables)
+
+    async def fake_arequest(query, variables, token, **kwargs):
+        return fake_request(query, variables, token, **kwargs)
+
+    monkeypatch.setattr(collector, "_request", fake_request)
+    monkeypatch.setattr(collector, "_arequest", fake_arequest)
+    monkeypatch.setattr(collector, "PIPELINE_DEPTH", 1)
+
+    collector.collect(
+        user="demo",
+        include_private=True,
+        data_dir=tmp_path,
+        batch_size=1,
+        max_concurrency=1,
+        engine=engine,
+        cache=False,
+    )
+
+    assert len(_snapshot(tmp_path)) == 10
+    # one batch in flight, one queued and one page waiting to be queued
+    assert max_ahead <= 3
+
+
+@pytest.mark.parametrize("engine", ["thread", "async"])
+def test_collect_many_accounts_in_one_run(tmp_path, monkeypatch, engine):
+    listings = {"alice": ("a1", "a2"), "acme": ("o1", "o2", "o3")}
+    owners: list[str] = []
+
+    def fake_request(query, variables, token, **kwargs):
+        if "repositories(" in query:
+            return _listing(*listings[variables["login"]])
+        owners.append(variables["login"])
+        return _stats_response(variables)
+
+    async def fake_arequest(query, variables, token, **kwargs):
+        return fake_request(query, variables, token, **kwargs)
+
+    monkeypatch.setattr(collector, "_request", fake_request)
+    monkeypatch.setattr(collector, "_arequest", fake_arequest)
+
+    collector.collect(
+        user=["alice", "acme"],
+        include_private=True,
+        data_dir=tmp_path,
+        batch_size=1,
+        engine=engine,
+        cache=False,
+    )
+
+    assert sorted(owners) == ["acme"] * 3 + ["alice"] * 2
+    for login, names in listings.items():
+        (path,) = tmp_path.glob(f"{login}-*.ndjson")
+        assert sorted(r["name"] for r in iter_records(path)) == sorted(names)
+        assert read_meta(path)["user"] == login
+    assert not list(checkpoint_path(tmp_path, "alice").parent.iterdir())
+
+
+def test_collect_weekly_history_pages_back_to_last_seen_commit(tmp_path, monkeypatch):
+    commits = [
+        {"oid": "c3", "committedDate": "2024-01-10T00:00:00Z"},
+        {"oid": "c2", "committedDate": "2024-01-09T00:00:00Z"},
+        {"oid": "c1", "committedDate": "2024-01-02T00:00:00Z"},
+    ]
+    pushed = {"app": "2024-01-03T00:00:00Z", "idle": "2023-01-01T00:00:00Z"}
+    history_calls: list[tuple[str, str | None]] = []
+
+    def fake_request(query, variables, token, **kwargs):
+        if "repositories(" in query:
+            nodes = [{"name": n, "pushedAt": p} for n, p in pushed.items()]
+            return _page(nodes)
+        if "committedDate" in query:
+            history_calls.append((variables["name"], variables["after"]))
+            visible = commits if pushed["app"] > "2024-01-05" else commits[2:]
+            start = int(variables["after"] or 0)
+            nodes = visible[start : start + 2] if variables["name"] == "app" else []
+            more = start + 2 < len(visible) and variables["name"] == "app"
             return {
                 "data": {
                     "repository": {
-                        "defaultBranchRef": {"target": {"history": {"totalCount": 1}}}
+                        "defaultBranchRef": {
+                            "target": {
+                                "history": {
+                                    "nodes": nodes,
+                                    "pageInfo": {
+                                        "hasNextPage": more,
+                                        "endCursor": str(start + 2),
+                                    },
+                                }
+                            }
+                        }
                     }
                 }
             }
-        if "checkSuites" in query:
-            calls.append(("status", repo))
+        return _stats_response(variables)
+
+    monkeypatch.setattr(collector, "_request", fake_request)
+    options = dict(
+        user="demo",
+        include_private=True,
+        data_dir=tmp_path,
+        cache=False,
+        weekly_history=True,
+        max_concurrency=1,
+    )
+
+    collector.collect(**options)
+    assert sorted(history_calls) == [("app", None), ("idle", None)]
+    first = {r["name"]: r for r in _snapshot(tmp_path)}
+    assert first["app"]["weeklyCommits"] == {"2024-W01": 1}
+    assert first["idle"]["weeklyCommits"] == {}
+
+    for path in tmp_path.glob("*.ndjson"):
+        path.unlink()
+    history_calls.clear()
+    pushed["app"] = "2024-01-10T00:00:00Z"
+    collector.collect(**options)
+
+    # c3, c2 on the first page, then c1 ends the walk on the second page
+    assert history_calls == [("app", None), ("app", "2")]
+    data = {r["name"]: r for r in _snapshot(tmp_path)}
+    assert data["app"]["weeklyCommits"] == {"2024-W01": 1, "2024-W02": 2}
+    assert data["idle"]["weeklyCommits"] == {}
+
+
+def test_collect_does_not_cache_history_pages(tmp_path, monkeypatch):
+    def fake_request(query, variables, token, **kwargs):
+        if "repositories(" in query:
+            return _page([{"name": "app", "pushedAt": "2024-01-03T00:00:00Z"}])
+        if "committedDate" in query:
+            history = {"nodes": [], "pageInfo": {"hasNextPage": False}}
             return {
                 "data": {
-                    "repository": {
-                        "defaultBranchRef": {"target": {"checkSuites": {"nodes": []}}}
-                    }
+                    "repository": {"defaultBranchRef": {"target": {"history": history}}}
                 }
             }
-        return {}
+        return _stats_response(variables)
 
     monkeypatch.setattr(collector, "_request", fake_request)
+    collector.collect(
+        user="demo", include_private=True, data_dir=tmp_path, weekly_history=True
+    )
 
-    submissions: list[tuple] = []
+    cached = [
+        json.loads(path.read_text())["response"]
+        for path in cache_dir(tmp_path).glob("*/*.json")
+    ]
+    assert len(cached) == 2
+    assert not any("repository" in response["data"] for response in cached)
 
-    class DummyExecutor:
-        def submit(self, fn, *args, **kwargs):
-            submissions.append(args)
 
-            class DummyFuture:
-                def result(self):
-                    return fn(*args, **kwargs)
+def test_collect_incremental_keeps_weekly_history_of_carried_repos(
+    tmp_path, monkeypatch
+):
+    stats_calls: list[str] = []
 
-            return DummyFuture()
+    def fake_request(query, variables, token, **kwargs):
+        if "repositories(" in query:
+            return _page([{"name": "app", "pushedAt": "2024-01-03T00:00:00Z"}])
+        if "committedDate" in query:
+            nodes = [{"oid": "c1", "committedDate": "2024-01-02T00:00:00Z"}]
+            history = {"nodes": nodes, "pageInfo": {"hasNextPage": False}}
+            return {
+                "data": {
+                    "repository": {"defaultBranchRef": {"target": {"history": history}}}
+                }
+            }
+        stats_calls.extend(v for k, v in variables.items() if k.startswith("n"))
+        return _stats_response(variables)
 
-        def __enter__(self):
-            return self
+    monkeypatch.setattr(collector, "_request", fake_request)
+    options = dict(
+        user="demo",
+        include_private=True,
+        data_dir=tmp_path,
+        cache=False,
+        weekly_history=True,
+    )
 
-        def __exit__(self, *exc):
-            return False
+    collector.collect(**options)
+    (first,) = tmp_path.glob("*.ndjson")
+    first.rename(tmp_path / "demo-20240101T000000Z.ndjson")
+    stats_calls.clear()
+    collector.collect(**options, incremental=True)
 
-    monkeypatch.setattr(collector, "ThreadPoolExecutor", lambda: DummyExecutor())
+    (second,) = set(tmp_path.glob("*.ndjson")) - {
+        tmp_path / "demo-20240101T000000Z.ndjson"
+    }
+    (record,) = iter_records(second)
+    assert stats_calls == []
+    assert record["weeklyCommits"] == {"2024-W01": 1}
+
+
+def _suites_node(conclusions, cursor=None):
+    return {
+        "defaultBranchRef": {
+            "target": {
+                "checkSuites": {
+                    "nodes": [{"conclusion": c} for c in conclusions],
+                    "pageInfo": {
+                        "hasNextPage": cursor is not None,
+                        "endCursor": cursor,
+                    },
+                }
+            }
+        }
+    }
+
+
+def test_fetch_repo_stats_pages_check_suites_up_to_window(monkeypatch):
+    suites = {"big": ["SUCCESS"] * 3 + ["FAILURE"] * 4, "small": ["SUCCESS"]}
+    requests: list[dict] = []
+
+    def fake_request(query, variables, token, **kwargs):
+        requests.append(variables)
+        size = variables["ciFirst"]
+        data = {}
+        for key, name in variables.items():
+            if not key.startswith("n"):
+                continue
+            start = int(variables.get("a" + key[1:]) or 0)
+            page = suites[name][start : start + size]
+            more = start + size < len(suites[name])
+            data["r" + key[1:]] = _suites_node(
+                page, str(start + size) if more else None
+            )
+        return {"data": data}
+
+    monkeypatch.setattr(collector, "_request", fake_request)
+    monkeypatch.setattr(collector, "_sizes", {})
+    monkeypatch.setattr(collector, "CI_NODE_BUDGET", 4)
+
+    stats = collector._fetch_repo_stats("demo", ["big", "small"], None, ci_window=6)
+
+    assert stats["big"]["ciStatuses"] == ["SUCCESS"] * 3 + ["FAILURE"] * 3
+    assert stats["small"]["ciStatuses"] == ["SUCCESS"]
+    # two repos share the first query, then "big" pages alone with more room
+    assert [r["ciFirst"] for r in requests] == [2, 4]
+    assert requests[1]["n0"] == "big" and requests[1]["a0"] == "2"
+
+
+def test_ci_page_size_shrinks_with_batch_width():
+    assert collector._ci_page_size(100, 1) == 100
+    assert collector._ci_page_size(100, 25) == 40
+    assert collector._ci_page_size(20, 25) == 20
+    assert collector._ci_page_size(100, 5000) == 1
+
+
+def test_batches_tag_stats_by_default_branch_head():
+    repos = [
+        {
+            "name": "app",
+            "pushedAt": "2024-02-01T00:00:00Z",
+            "defaultBranchRef": {"target": {"oid": "abc"}},
+        },
+        {"name": "empty", "pushedAt": "2024-01-01T00:00:00Z"},
+    ]
+
+    ((chunk, names, tag),) = collector._batches(repos, 2)
+
+    assert names == ["app", "empty"]
+    assert tag == "abc,2024-01-01T00:00:00Z"
+
+
+def _languages(pairs, cursor=None):
+    return {
+        "edges": [{"size": size, "node": {"name": name}} for name, size in pairs],
+        "pageInfo": {"hasNextPage": cursor is not None, "endCursor": cursor},
+    }
+
+
+def test_listing_flattens_languages_and_pages_overflow(monkeypatch):
+    queries: list[dict] = []
+
+    def fake_request(query, variables, token, **kwargs):
+        queries.append(variables)
+        if "repositories(" in query:
+            assert variables["langFirst"] == collector.LANGUAGES_FIRST
+            return _page(
+                [
+                    {"name": "poly", "languages": _languages([("C", 50)], "l1")},
+                    {"name": "mono", "languages": _languages([("Go", 9)])},
+                ]
+            )
+        assert kwargs.get("partial") is True
+        assert variables == {"login": "demo", "n0": "poly", "a0": "l1"}
+        return {"data": {"r0": {"languages": _languages([("Rust", 7), ("C", 1)])}}}
+
+    monkeypatch.setattr(collector, "_request", fake_request)
+
+    nodes, cursor = collector._drive(collector._repo_page_steps("demo", None), None)
+
+    assert cursor is None
+    assert len(queries) == 2
+    assert nodes[0]["languages"] == {"C": 51, "Rust": 7}
+    assert nodes[1]["languages"] == {"Go": 9}
+
+
+def test_request_gateway_timeout_raises_query_timeout(monkeypatch):
+    session = FakeSession({"message": "Bad gateway"}, status=502)
+    monkeypatch.setattr(collector, "_get_session", lambda *a: session)
+
+    with pytest.raises(collector.QueryTimeout):
+        collector._request("query", {}, None)
+
+
+def test_request_graphql_timeout_raises_query_timeout(monkeypatch):
+    errors = [
+        {"message": "Something went wrong... This may be the result of a timeout"}
+    ]
+    session = FakeSession({"data": None, "errors": errors})
+    monkeypatch.setattr(collector, "_get_session", lambda *a: session)
+
+    with pytest.raises(collector.QueryTimeout):
+        collector._request("query", {}, None, partial=True)
+
+
+def test_listing_halves_page_size_on_timeout(monkeypatch):
+    sizes: list[int] = []
+
+    def fake_request(query, variables, token, **kwargs):
+        sizes.append(variables["first"])
+        if variables["first"] > 25:
+            raise collector.QueryTimeout("HTTP 502")
+        return _listing("demo")
+
+    monkeypatch.setattr(collector, "_request", fake_request)
+    monkeypatch.setattr(collector, "_sizes", {})
+
+    nodes, _ = collector._drive(collector._repo_page_steps("demo", "c1"), None)
+
+    assert [n["name"] for n in nodes] == ["demo"]
+    assert sizes == [100, 50, 25]
+    assert collector._sizes["repos"].timeouts == 2
+
+
+def test_stats_batch_splits_on_timeout(monkeypatch):
+    batches: list[list[str]] = []
+
+    def fake_request(query, variables, token, **kwargs):
+        names = [v for k, v in variables.items() if k.startswith("n")]
+        batches.append(names)
+        if len(names) > 2:
+            raise collector.QueryTimeout("HTTP 504")
+        return _stats_response(variables)
+
+    monkeypatch.setattr(collector, "_request", fake_request)
+    monkeypatch.setattr(collector, "_sizes", {})
+    stats_size = collector._get_size("stats", 4)
+
+    stats = collector._fetch_repo_stats("demo", ["a", "bb", "ccc", "dddd"], None)
+
+    assert batches == [["a", "bb", "ccc", "dddd"], ["a", "bb"], ["ccc", "dddd"]]
+    assert [stats[n]["commitCount"] for n in ("a", "bb", "ccc", "dddd")] == [1, 2, 3, 4]
+    assert stats_size.size == 2
+
+
+class FlakySession:
+    def __init__(self, failures, payload):
+        self.failures = list(failures)
+        self.payload = payload
+        self.calls = 0
+
+    def post(self, body, headers=None):
+        self.calls += 1
+        if self.failures:
+            failure = self.failures.pop(0)
+            if isinstance(failure, BaseException):
+                raise failure
+            return Response(failure, {}, b"{}")
+        return Response(200, {}, json.dumps(self.payload).encode())
+
+
+def test_request_retries_transient_failures(monkeypatch):
+    session = FlakySession([503, ConnectionResetError("reset")], {"data": {"ok": 1}})
+    monkeypatch.setattr(collector, "_get_session", lambda *a: session)
+    monkeypatch.setattr(collector, "_retry", RetryPolicy(base_delay=0.0))
+
+    data = collector._request("query", {}, None)
+
+    assert data == {"data": {"ok": 1}}
+    assert session.calls == 3
+    assert collector._retry.stats()["retries"] == 2
+
+
+def test_request_gives_up_after_max_retries(monkeypatch):
+    session = FlakySession([503] * 5, {"data": {}})
+    monkeypatch.setattr(collector, "_get_session", lambda *a: session)
+    monkeypatch.setattr(collector, "_retry", RetryPolicy(max_retries=2, base_delay=0.0))
+
+    with pytest.raises(RuntimeError, match="HTTP 503"):
+        collector._request("query", {}, None)
+    assert session.calls == 3
+
+
+def _hedging_policy():
+    policy = RetryPolicy(hedge=True)
+    for _ in range(50):
+        policy.observe(0.01)
+    return policy
+
+
+class SlowFirstSession:
+    def __init__(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def post(self, body, headers=None):
+        with self.lock:
+            self.calls += 1
+            slow = self.calls == 1
+        time.sleep(0.5 if slow else 0.0)
+        return Response(200, {}, json.dumps({"data": {"slow": slow}}).encode())
+
+
+def test_request_hedges_slow_requests(monkeypatch):
+    session = SlowFirstSession()
+    monkeypatch.setattr(collector, "_get_session", lambda *a: session)
+    monkeypatch.setattr(collector, "_retry", _hedging_policy())
+    monkeypatch.setattr(collector, "_scheduler", Scheduler())
+
+    started = time.monotonic()
+    data = collector._request("query", {}, None)
+
+    assert time.monotonic() - started < 0.4
+    assert data == {"data": {"slow": False}}
+    assert collector._retry.stats() == {"retries": 0, "hedges": 1, "hedge_wins": 1}
+
+
+def test_arequest_hedges_slow_requests(monkeypatch):
+    class AsyncSlowFirstSession:
+        calls = 0
+
+        async def post(self, body, headers=None):
+            type(self).calls += 1
+            slow = type(self).calls == 1
+            await asyncio.sleep(0.5 if slow else 0.0)
+            return Response(200, {}, json.dumps({"data": {"slow": slow}}).encode())
+
+    session = AsyncSlowFirstSession()
+    monkeypatch.setattr(collector, "_get_async_session", lambda *a: session)
+    monkeypatch.setattr(collector, "_retry", _hedging_policy())
+    monkeypatch.setattr(collector, "_scheduler", Scheduler())
+
+    data = asyncio.run(collector._arequest("query", {}, None))
+
+    assert data == {"data": {"slow": False}}
+    assert collector._retry.stats()["hedge_wins"] == 1
+
+
+def test_collect_reports_retries_in_meta(tmp_path, monkeypatch):
+    def fake_request(query, variables, token, **kwargs):
+        collector._retry.count_retry()
+        if "repositories(" in query:
+            return _listing("demo")
+        return _stats_response(variables)
+
+    monkeypatch.setattr(collector, "_request", fake_request)
+
+    collector.collect(user="demo", include_private=True, data_dir=tmp_path, cache=False)
+
+    meta = read_meta(next(tmp_path.glob("*.ndjson")))
+    assert meta["retries"] == 2
+    assert meta["hedges"] == 0
+
+
+@pytest.mark.parametrize("engine", ["thread", "async"])
+def test_collect_reports_retries_per_account(tmp_path, monkeypatch, engine):
+    def fake_request(query, variables, token, **kwargs):
+        if variables["login"] == "beta":
+            collector._retry.count_retry()
+        if "repositories(" in query:
+            return _listing(variables["login"] + "-app")
+        return _stats_response(variables)
+
+    async def fake_arequest(query, variables, token, **kwargs):
+        return fake_request(query, variables, token, **kwargs)
+
+    monkeypatch.setattr(collector, "_request", fake_request)
+    monkeypatch.setattr(collector, "_arequest", fake_arequest)
+
+    collector.collect(
+        user=["alpha", "beta"],
+        include_private=True,
+        data_dir=tmp_path,
+        cache=False,
+        engine=engine,
+    )
+
+    metas = {
+        read_meta(path)["user"]: read_meta(path) for path in tmp_path.glob("*.ndjson")
+    }
+    assert metas["alpha"]["retries"] == 0
+    assert metas["beta"]["retries"] == 2
+
+
+@pytest.mark.parametrize("engine", ["thread", "async"])
+def test_collect_replays_recorded_cassette_offline(tmp_path, monkeypatch, engine):
+    def fake_fetch(query, variables, token, **kwargs):
+        if "repositories(" in query:
+            return _listing("a", "b")
+        return _stats_response(variables)
+
+    async def fake_afetch(query, variables, token, **kwargs):
+        return fake_fetch(query, variables, token, **kwargs)
+
+    monkeypatch.setattr(collector, "_fetch", fake_fetch)
+    monkeypatch.setattr(collector, "_afetch", fake_afetch)
+    monkeypatch.setattr(collector, "_sizes", {})
+    cassette = tmp_path / "cassette"
+    collector.collect(
+        user="demo",
+        include_private=True,
+        data_dir=tmp_path / "recorded",
+        engine=engine,
+        record=cassette,
+    )
+
+    def offline(*args, **kwargs):
+        raise AssertionError("replay must not reach GitHub")
+
+    monkeypatch.setattr(collector, "_fetch", offline)
+    monkeypatch.setattr(collector, "_afetch", offline)
+    collector.collect(
+        user="demo",
+        include_private=True,
+        data_dir=tmp_path / "replayed",
+        engine=engine,
+        replay=cassette,
+    )
+
+    assert _snapshot(tmp_path / "replayed") == _snapshot(tmp_path / "recorded")
 
-    collector.collect(user="demo", include_private=True, data_dir=tmp_path)
 
-    assert len(submissions) == 4
-    assert calls.count(("commit", "one")) == 1
-    assert calls.count(("commit", "two")) == 1
-    assert calls.count(("status", "one")) == 1
-    assert calls.count(("status", "two")) == 1
+def test_collect_rejects_record_with_replay(tmp_path):
+    with pytest.raises(ValueError, match="mutually exclusive"):
+        collector.collect(
+            user="demo", data_dir=tmp_path, record=tmp_path, replay=tmp_path
+        )
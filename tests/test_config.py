@@ -7,6 +7,8 @@ def test_load_config(tmp_path, monkeypatch):
     toml = (
         "[user]\nhandle='demo'\ninclude_private=true\n"
         "[metrics]\nci_pass_window=42\ncommit_history_years=2\n"
+        "[collector]\nbatch_size=10\nweekly_history=true\n"
+        "[analyzer]\nworkers=3\n"
         "[paths]\ndata_dir='snapshots'\n"
     )
     (tmp_path / "braggard.toml").write_text(toml)
@@ -19,6 +21,9 @@ def test_load_config(tmp_path, monkeypatch):
     assert cfg.user.include_private is True
     assert cfg.metrics.ci_pass_window == 42
     assert cfg.metrics.commit_history_years == 2
+    assert cfg.collector.batch_size == 10
+    assert cfg.collector.weekly_history is True
+    assert cfg.analyzer.workers == 3
     assert cfg.paths.data_dir == "snapshots"
 
 
@@ -61,6 +66,15 @@ def test_load_config_defaults(tmp_path, monkeypatch):
     assert cfg.user.include_private is False
     assert cfg.metrics.ci_pass_window == 100
     assert cfg.metrics.commit_history_years == 3
+    assert cfg.collector.batch_size == 25
+    assert cfg.collector.max_connections == 8
+    assert cfg.collector.max_concurrency == 8
+    assert cfg.collector.weekly_history is False
+    assert cfg.collector.max_retries == 3
+    assert cfg.collector.hedge is False
+    assert cfg.analyzer.workers == 0
+    assert cfg.cache.enabled is True
+    assert cfg.cache.repo_list_ttl == 600
     assert cfg.paths.data_dir == "data"
 
 
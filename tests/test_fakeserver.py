@@ -0,0 +1,74 @@
+from braggard import collector
+from braggard.fakeserver import FakeGitHub, Portfolio
+
+
+def _listing(fake, **variables):
+    variables = {"login": "demo", "first": 10, "after": None, **variables}
+    status, _, body = fake.handle(
+        {"query": collector.REPO_QUERY, "variables": variables}
+    )
+    assert status == 200
+    return body["data"]["repositoryOwner"]["repositories"]
+
+
+def test_fake_lists_repositories_newest_first_in_pages():
+    fake = FakeGitHub(Portfolio(25))
+
+    first = _listing(fake)
+    second = _listing(fake, after=first["pageInfo"]["endCursor"], first=20)
+    public = _listing(fake, privacy="PUBLIC", first=100)
+
+    names = [n["name"] for n in first["nodes"] + second["nodes"]]
+    pushed = [n["pushedAt"] for n in first["nodes"] + second["nodes"]]
+    assert first["pageInfo"]["hasNextPage"]
+    assert not second["pageInfo"]["hasNextPage"]
+    assert len(set(names)) == 25
+    assert pushed == sorted(pushed, reverse=True)
+    assert len(public["nodes"]) == 20
+    assert not any(n["isPrivate"] for n in public["nodes"])
+    fake.close()
+
+
+def test_fake_answers_aliased_stats_and_check_suite_pages():
+    portfolio = Portfolio(20)
+    fake = FakeGitHub(portfolio)
+    names = [portfolio.name(3), portfolio.name(13)]
+    variables = {"login": "demo", "ciFirst": 5, "n0": names[0], "n1": names[1]}
+
+    _, _, body = fake.handle(
+        {"query": collector._repo_stats_query(2), "variables": variables}
+    )
+    target = body["data"]["r1"]["defaultBranchRef"]["target"]
+    _, _, more = fake.handle(
+        {
+            "query": collector._check_suite_query(1),
+            "variables": {
+                "login": "demo",
+                "ciFirst": 200,
+                "n0": names[1],
+                "a0": target["checkSuites"]["pageInfo"]["endCursor"],
+            },
+        }
+    )
+    rest = more["data"]["r0"]["defaultBranchRef"]["target"]["checkSuites"]
+
+    assert target["history"]["totalCount"] == portfolio.commit_count(13)
+    assert len(target["checkSuites"]["nodes"]) == 5
+    assert len(rest["nodes"]) == len(portfolio.suites(13)) - 5
+    assert not rest["pageInfo"]["hasNextPage"]
+    assert body["data"]["rateLimit"]["remaining"] == fake.budget - 1
+    fake.close()
+
+
+def test_fake_injects_errors_and_enforces_budget():
+    fake = FakeGitHub(Portfolio(10), timeout_rate=1.0, budget=2)
+    request = {"query": collector.REPO_QUERY, "variables": {"first": 1}}
+
+    status, headers, _ = fake.handle(request)
+    throttled, throttle_headers, _ = fake.handle(request)
+
+    assert status == 502
+    assert headers["x-ratelimit-remaining"] == "1"
+    assert throttled == 403
+    assert "retry-after" in throttle_headers
+    fake.close()
@@ -0,0 +1,95 @@
+import json
+
+from braggard.history import HistoryStore, history_path, iso_week
+
+
+def test_iso_week_uses_iso_calendar():
+    assert iso_week("2024-01-01T12:00:00Z") == "2024-W01"
+    assert iso_week("2021-01-03T00:00:00Z") == "2020-W53"
+
+
+def test_history_store_merges_incremental_walks(tmp_path):
+    path = history_path(tmp_path, "demo")
+    store = HistoryStore(path)
+    assert store.needs_walk("app", "2024-01-01T00:00:00Z")
+
+    store.record("app", "2024-01-01T00:00:00Z", "b", {"2024-W01": 2}, incremental=False)
+    store.record(
+        "app",
+        "2024-01-09T00:00:00Z",
+        "c",
+        {"2024-W01": 1, "2024-W02": 1},
+        incremental=True,
+    )
+    store.save()
+
+    loaded = HistoryStore(path)
+    assert path == tmp_path / ".braggard" / "history" / "demo.ndjson"
+    assert loaded.newest_oid("app") == "c"
+    assert loaded.weeks("app") == {"2024-W01": 3, "2024-W02": 1}
+    assert not loaded.needs_walk("app", "2024-01-09T00:00:00Z")
+    assert loaded.needs_walk("app", "2024-01-10T00:00:00Z")
+
+
+def test_history_store_replaces_rewritten_history(tmp_path):
+    store = HistoryStore(history_path(tmp_path, "demo"))
+    store.record("app", "t1", "b", {"2024-W01": 5}, incremental=False)
+
+    store.record("app", "t2", "x", {"2024-W03": 2}, incremental=False)
+
+    assert store.weeks("app") == {"2024-W03": 2}
+
+
+def test_history_store_appends_only_new_walks(tmp_path):
+    path = history_path(tmp_path, "demo")
+    store = HistoryStore(path)
+    store.record("app", "t1", "a", {"2024-W01": 1}, incremental=False)
+    store.record("lib", "t1", "b", {"2024-W01": 2}, incremental=False)
+    store.save()
+    store.record("app", "t2", "c", {"2024-W02": 1}, incremental=True)
+    store.save()
+    store.save()
+    store.close()
+
+    lines = path.read_text().splitlines()
+    assert len(lines) == 3
+    assert json.loads(lines[-1])["name"] == "app"
+    loaded = HistoryStore(path)
+    assert loaded.weeks("app") == {"2024-W01": 1, "2024-W02": 1}
+    assert loaded.weeks("lib") == {"2024-W01": 2}
+
+
+def test_history_store_drops_torn_tail(tmp_path):
+    path = history_path(tmp_path, "demo")
+    store = HistoryStore(path)
+    store.record("app", "t1", "a", {"2024-W01": 1}, incremental=False)
+    store.save()
+    store.close()
+    with open(path, "a") as f:
+        f.write('{"name": "lib", "pus')
+
+    loaded = HistoryStore(path)
+    assert loaded.weeks("lib") == {}
+    loaded.record("lib", "t1", "b", {"2024-W01": 2}, incremental=False)
+    loaded.save()
+    loaded.close()
+
+    assert HistoryStore(path).weeks("lib") == {"2024-W01": 2}
+    assert len(path.read_text().splitlines()) == 2
+
+
+def test_history_store_compacts_journal(tmp_path):
+    path = history_path(tmp_path, "demo")
+    store = HistoryStore(path)
+    for week in range(1, 6):
+        store.record("app", f"t{week}", "a", {f"2024-W0{week}": 1}, incremental=True)
+        store.save()
+    store.close()
+    assert len(path.read_text().splitlines()) == 5
+
+    loaded = HistoryStore(path)
+    loaded.save()
+    loaded.close()
+
+    assert len(path.read_text().splitlines()) == 1
+    assert len(HistoryStore(path).weeks("app")) == 5
@@ -0,0 +1,68 @@
+from braggard.metrics import (
+    ENTRY,
+    MetricStore,
+    metrics_path,
+    metrics_paths,
+    stamp_time,
+)
+
+
+def test_stamp_time_accepts_basic_and_extended_stamps():
+    assert stamp_time("19700102T000001Z") == 86401
+    assert stamp_time("1970-01-02T00:00:01Z") == 86401
+
+
+def test_metric_store_appends_only_changes(tmp_path):
+    path = metrics_path(tmp_path, "demo")
+    store = MetricStore(path)
+    first = [
+        {"name": "a", "stargazerCount": 5, "forkCount": 1},
+        {"name": "b", "stargazerCount": 2},
+    ]
+    assert store.append("19700101T000000Z", first) == 3
+    assert store.append("19700102T000000Z", first) == 0
+    assert store.append("19700103T000000Z", [{"name": "a", "stargazerCount": 9}]) == 1
+
+    loaded = MetricStore(path)
+    assert path == tmp_path / ".braggard" / "metrics" / "demo.log"
+    assert metrics_paths(tmp_path) == {"demo": path}
+    assert path.stat().st_size == 4 * ENTRY.itemsize
+    assert loaded.history("a") == [
+        (0, "stargazerCount", 5),
+        (0, "forkCount", 1),
+        (2 * 86400, "stargazerCount", 9),
+    ]
+    assert loaded.history("b") == [(0, "stargazerCount", 2)]
+    assert loaded.history("missing") == []
+
+
+def test_metric_store_columns_decode_deltas(tmp_path):
+    store = MetricStore(tmp_path / "demo.log")
+    store.append("19700101T000000Z", [{"name": "a", "stargazerCount": 5}])
+    store.append(
+        "19700102T000000Z",
+        [{"name": "b", "stargazerCount": 1}, {"name": "a", "stargazerCount": 3}],
+    )
+    store.append("19700103T000000Z", [{"name": "a", "stargazerCount": 4}])
+
+    repos, times, values = store.columns("stargazerCount")
+
+    assert store.names == ["a", "b"]
+    assert repos.tolist() == [0, 1, 0, 0]
+    assert times.tolist() == [0, 86400, 86400, 2 * 86400]
+    assert values.tolist() == [5, 1, 3, 4]
+    assert [len(c) for c in store.columns("forkCount")] == [0, 0, 0]
+
+
+def test_metric_store_drops_uncommitted_tail(tmp_path):
+    path = tmp_path / "demo.log"
+    store = MetricStore(path)
+    store.append("19700101T000000Z", [{"name": "a", "stargazerCount": 5}])
+    with open(path, "ab") as f:
+        f.write(b"torn")
+
+    loaded = MetricStore(path)
+    loaded.append("19700102T000000Z", [{"name": "a", "stargazerCount": 6}])
+
+    assert path.stat().st_size == 2 * ENTRY.itemsize
+    assert MetricStore(path).history("a")[-1] == (86400, "stargazerCount", 6)
@@ -0,0 +1,68 @@
+import contextvars
+from http.client import RemoteDisconnected
+
+import pytest
+
+from braggard.retry import MIN_HEDGE_SAMPLES, RetryPolicy, retry_scope
+
+
+def test_retry_classification():
+    policy = RetryPolicy(max_retries=2)
+
+    assert policy.should_retry(0, status=503)
+    assert policy.should_retry(0, status=500)
+    assert not policy.should_retry(0, status=502)
+    assert not policy.should_retry(0, status=401)
+    assert policy.should_retry(1, exc=ConnectionResetError())
+    assert policy.should_retry(0, exc=RemoteDisconnected())
+    assert not policy.should_retry(0, exc=ConnectionRefusedError())
+    assert not policy.should_retry(2, status=503)
+
+
+def test_backoff_is_jittered_and_capped():
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+
+    delays = [policy.backoff(attempt) for attempt in range(10) for _ in range(20)]
+
+    assert all(0 <= d <= 5.0 for d in delays)
+    assert len(set(delays)) > 1
+    assert max(policy.backoff(0) for _ in range(50)) <= 1.0
+
+
+def test_hedge_after_needs_samples_and_flag():
+    policy = RetryPolicy(hedge=True)
+    for i in range(MIN_HEDGE_SAMPLES - 1):
+        policy.observe(0.01 * (i + 1))
+    assert policy.hedge_after() is None
+
+    for i in range(81):
+        policy.observe(1.0 + i)
+    assert policy.hedge_after() == pytest.approx(77.0)
+    assert RetryPolicy().hedge_after() is None
+
+
+def test_retry_stats_counts():
+    policy = RetryPolicy()
+    policy.count_retry()
+    policy.count_hedge()
+    policy.count_hedge(won=True)
+
+    assert policy.stats() == {"retries": 1, "hedges": 1, "hedge_wins": 1}
+
+
+def test_retry_stats_are_kept_per_scope():
+    policy = RetryPolicy()
+
+    def count(scope):
+        retry_scope.set(scope)
+        policy.count_retry()
+        policy.count_hedge(won=True)
+
+    contextvars.copy_context().run(count, "alpha")
+    contextvars.copy_context().run(count, "alpha")
+    contextvars.copy_context().run(count, "beta")
+
+    assert policy.stats("alpha") == {"retries": 2, "hedges": 0, "hedge_wins": 2}
+    assert policy.stats("beta")["retries"] == 1
+    assert policy.stats("gamma")["retries"] == 0
+    assert policy.stats()["retries"] == 3
@@ -0,0 +1,223 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from braggard import collector
+from braggard.scheduler import AsyncFairQueue, FairQueue, Scheduler
+
+
+def test_scheduler_additive_increase():
+    sched = Scheduler(max_concurrency=8)
+    start = sched.limit
+    for _ in range(10):
+        assert sched.record(200) is None
+
+    assert start < sched.limit <= 8
+
+
+def test_scheduler_halves_on_throttle():
+    sched = Scheduler(max_concurrency=8)
+    sched.limit = 8.0
+
+    delay = sched.record(429, {"retry-after": "3"})
+
+    assert delay == 3.0
+    assert sched.limit == 4.0
+    assert sched.throttled == 1
+
+
+def test_scheduler_ignores_plain_forbidden():
+    sched = Scheduler()
+
+    assert sched.record(403, {}) is None
+    assert sched.record(403, {}, secondary=True) is not None
+
+
+def test_scheduler_reads_rate_limit_budget():
+    sched = Scheduler(pacing_reserve=100)
+    reset = time.time() + 50
+    rate_limit = {"cost": 1, "remaining": 10, "resetAt": reset}
+
+    sched.record(200, {}, rate_limit)
+
+    assert sched.remaining == 10
+    assert sched.reset_at == pytest.approx(reset)
+    assert sched._pace_interval() == pytest.approx(5.0, abs=0.1)
+
+
+def test_scheduler_no_pacing_with_ample_budget():
+    sched = Scheduler(pacing_reserve=100)
+    sched.record(
+        200,
+        {"x-ratelimit-remaining": "4000", "x-ratelimit-reset": str(time.time() + 60)},
+    )
+
+    assert sched.remaining == 4000
+    assert sched._pace_interval() == 0.0
+
+
+def test_scheduler_limits_in_flight():
+    sched = Scheduler(max_concurrency=2)
+    sched.limit = 2.0
+    active = peak = 0
+    lock = threading.Lock()
+
+    def work():
+        nonlocal active, peak
+        with sched.slot():
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.01)
+            with lock:
+                active -= 1
+
+    threads = [threading.Thread(target=work) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert peak == 2
+
+
+class ThrottlingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    calls = 0
+
+    def do_POST(self):
+        type(self).calls += 1
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if type(self).calls == 1:
+            body = json.dumps({"message": "You have exceeded a secondary rate limit"})
+            self.send_response(403)
+            self.send_header("Retry-After", "0.05")
+        else:
+            body = json.dumps(
+                {
+                    "data": {
+                        "rateLimit": {
+                            "cost": 1,
+                            "remaining": 4999,
+                            "resetAt": "2099-01-01T00:00:00Z",
+                        }
+                    }
+                }
+            )
+            self.send_response(200)
+        payload = body.encode()
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_request_backs_off_against_local_endpoint(monkeypatch):
+    ThrottlingHandler.calls = 0
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), ThrottlingHandler)
+    thread = threading.Thread(
+        target=srv.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    )
+    thread.start()
+    sched = Scheduler()
+    monkeypatch.setattr(
+        collector, "GITHUB_GRAPHQL_URL", f"http://127.0.0.1:{srv.server_address[1]}/"
+    )
+    monkeypatch.setattr(collector, "_scheduler", sched)
+    try:
+        start = time.monotonic()
+        data = collector._request("query", {}, None)
+        elapsed = time.monotonic() - start
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+    assert ThrottlingHandler.calls == 2
+    assert elapsed >= 0.05
+    assert sched.throttled == 1
+    assert sched.remaining == 4999
+    assert data["data"]["rateLimit"]["remaining"] == 4999
+
+
+def test_arequest_backs_off_against_local_endpoint(monkeypatch):
+    ThrottlingHandler.calls = 0
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), ThrottlingHandler)
+    thread = threading.Thread(
+        target=srv.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    )
+    thread.start()
+    sched = Scheduler()
+    monkeypatch.setattr(
+        collector, "GITHUB_GRAPHQL_URL", f"http://127.0.0.1:{srv.server_address[1]}/"
+    )
+    monkeypatch.setattr(collector, "_scheduler", sched)
+    try:
+        data = asyncio.run(collector._arequest("query", {}, None))
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+    assert ThrottlingHandler.calls == 2
+    assert sched.throttled == 1
+    assert data["data"]["rateLimit"]["remaining"] == 4999
+
+
+def test_fair_queue_round_robins_across_keys():
+    queue = FairQueue(["a", "b"], maxsize=3)
+    for i in range(3):
+        queue.put("a", f"a{i}")
+    queue.put("b", "b0")
+    queue.close("a")
+    queue.close("b")
+
+    items = []
+    while (item := queue.get()) is not None:
+        items.append(item)
+
+    assert items == ["a0", "b0", "a1", "a2"]
+
+
+def test_fair_queue_put_waits_for_room():
+    queue = FairQueue(["a"], maxsize=1)
+    queue.put("a", 1)
+    done = threading.Event()
+
+    def producer():
+        queue.put("a", 2)
+        done.set()
+
+    thread = threading.Thread(target=producer)
+    thread.start()
+    assert not done.wait(timeout=0.05)
+    assert queue.get() == 1
+    assert done.wait(timeout=1)
+    thread.join()
+
+
+def test_async_fair_queue_round_robins_and_finishes():
+    async def run():
+        queue = AsyncFairQueue(["a", "b"], maxsize=1)
+        items = []
+
+        async def produce(key):
+            for i in range(2):
+                await queue.put(key, f"{key}{i}")
+            await queue.close(key)
+
+        async def consume():
+            while (item := await queue.get()) is not None:
+                items.append(item)
+
+        await asyncio.gather(produce("a"), produce("b"), consume())
+        return items
+
+    items = asyncio.run(run())
+
+    assert sorted(items) == ["a0", "a1", "b0", "b1"]
+    assert items[:2] in (["a0", "b0"], ["b0", "a0"])
@@ -0,0 +1,132 @@
+import asyncio
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from braggard.session import AsyncSession, Session
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    peers: set = set()
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        cls = type(self)
+        with cls.lock:
+            cls.peers.add(self.client_address)
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        time.sleep(0.02)
+        payload = json.dumps({"echo": json.loads(body or b"null")}).encode()
+        self.send_response(200)
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            payload = gzip.compress(payload)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+        with cls.lock:
+            cls.active -= 1
+        if body == b'"drop"':
+            # Close the socket without telling the client, like an idle timeout.
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.peers = set()
+    Handler.active = Handler.peak = 0
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(
+        target=srv.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    )
+    thread.start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}/graphql"
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_session_reuses_connection(server):
+    session = Session(server)
+    for i in range(5):
+        resp = session.post(json.dumps(i).encode())
+        assert resp.status == 200
+        assert resp.json() == {"echo": i}
+    session.close()
+
+    assert session.connections_opened == 1
+    assert len(Handler.peers) == 1
+
+
+def test_session_decodes_gzip(server):
+    session = Session(server)
+    resp = session.post(b'{"a": 1}')
+
+    assert resp.headers["content-encoding"] == "gzip"
+    assert resp.json() == {"echo": {"a": 1}}
+
+
+def test_session_bounds_connections(server):
+    session = Session(server, max_connections=2)
+    threads = [threading.Thread(target=session.post, args=(b"1",)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert Handler.peak <= 2
+    assert session.connections_opened <= 2
+
+
+def test_session_replaces_stale_connection(server):
+    session = Session(server)
+    session.post(b'"drop"')
+    time.sleep(0.05)
+
+    assert session.post(b"2").json() == {"echo": 2}
+    assert session.connections_opened == 2
+
+
+def test_session_rejects_bad_url():
+    with pytest.raises(ValueError):
+        Session("ftp://example.com")
+
+
+def test_async_session_reuses_connection(server):
+    async def run():
+        session = AsyncSession(server)
+        results = [await session.post(json.dumps(i).encode()) for i in range(3)]
+        await session.close()
+        return session, results
+
+    session, results = asyncio.run(run())
+
+    assert [r.json() for r in results] == [{"echo": 0}, {"echo": 1}, {"echo": 2}]
+    assert results[0].headers["content-encoding"] == "gzip"
+    assert session.connections_opened == 1
+
+
+def test_async_session_bounds_connections(server):
+    async def run():
+        session = AsyncSession(server, max_connections=2)
+        await asyncio.gather(*(session.post(b"1") for _ in range(6)))
+        await session.close()
+        return session
+
+    session = asyncio.run(run())
+
+    assert Handler.peak <= 2
+    assert session.connections_opened <= 2
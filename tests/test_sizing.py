@@ -0,0 +1,49 @@
+import pytest
+
+from braggard.sizing import AdaptiveSize
+
+
+def test_adaptive_size_halves_on_timeout_down_to_minimum():
+    size = AdaptiveSize(100, minimum=20)
+
+    assert size.timeout() is True
+    assert size.size == 50
+    assert size.timeout() is True
+    assert size.size == 25
+    assert size.timeout() is True
+    assert size.size == 20
+    assert size.timeout() is False
+    assert size.timeouts == 4
+
+
+def test_adaptive_size_grows_slowly_after_fast_responses():
+    size = AdaptiveSize(100, fast_latency=1.0)
+    size.timeout()
+    size.timeout()
+
+    size.success(0.1, cost=2)
+    assert size.size == 27
+    size.success(5.0)
+    assert size.size == 27
+    for _ in range(50):
+        size.success(0.1)
+    assert size.size == 100
+    assert size.cost == 2
+
+
+def test_adaptive_size_tracks_latency_average():
+    size = AdaptiveSize(10)
+
+    size.success(1.0)
+    size.success(2.0)
+
+    assert size.latency == pytest.approx(1.2)
+
+
+def test_adaptive_size_set_maximum_clamps():
+    size = AdaptiveSize(25)
+
+    size.set_maximum(10)
+
+    assert size.size == 10
+    assert size.maximum == 10
@@ -0,0 +1,104 @@
+import hashlib
+import json
+
+import pytest
+
+from braggard.snapshot import (
+    SnapshotWriter,
+    iter_records,
+    latest_snapshot,
+    read_meta,
+    scan_snapshot,
+    snapshot_paths,
+)
+
+
+def test_writer_flushes_in_batches_and_publishes(tmp_path):
+    path = tmp_path / "demo-20240101T000000Z.ndjson"
+    writer = SnapshotWriter(path, flush_every=2)
+
+    writer.write({"name": "a"})
+    assert writer.part_path.read_text() == ""
+    writer.write({"name": "b"})
+    assert len(writer.part_path.read_text().splitlines()) == 2
+    assert not path.exists()
+
+    writer.write({"name": "c"})
+    writer.close({"user": "demo"})
+
+    assert not writer.part_path.exists()
+    assert [r["name"] for r in iter_records(path)] == ["a", "b", "c"]
+    assert read_meta(path) == {"user": "demo"}
+
+
+def test_writer_keeps_part_file_on_error(tmp_path):
+    path = tmp_path / "demo-20240101T000000Z.ndjson"
+    with pytest.raises(RuntimeError):
+        with SnapshotWriter(path) as writer:
+            writer.write({"name": "a"})
+            raise RuntimeError("boom")
+
+    assert not path.exists()
+    assert json.loads(writer.part_path.read_text()) == {"name": "a"}
+    assert snapshot_paths(tmp_path) == []
+
+
+def test_writer_append_repairs_torn_tail(tmp_path):
+    path = tmp_path / "demo-20240101T000000Z.ndjson"
+    part = tmp_path / "demo-20240101T000000Z.ndjson.part"
+    part.write_text('{"name":"a"}\n{"name":"b"}\n{"na')
+
+    with SnapshotWriter(path, append=True) as writer:
+        assert writer.count == 2
+        writer.write({"name": "c"})
+        writer.close({"repo_count": writer.count})
+
+    assert [r["name"] for r in iter_records(path)] == ["a", "b", "c"]
+    assert read_meta(path) == {"repo_count": 3}
+
+
+def test_iter_records_reads_legacy_formats(tmp_path):
+    (tmp_path / "list.json").write_text(json.dumps([{"name": "a"}]))
+    (tmp_path / "obj.json").write_text(json.dumps({"repos": [{"name": "b"}]}))
+
+    assert list(iter_records(tmp_path / "list.json")) == [{"name": "a"}]
+    assert list(iter_records(tmp_path / "obj.json")) == [{"name": "b"}]
+    assert read_meta(tmp_path / "list.json") == {}
+
+
+def test_iter_records_skips_truncated_tail(tmp_path):
+    path = tmp_path / "snap.ndjson"
+    path.write_text('{"name": "a"}\n\n{"_meta": {}}\n{"name": "b"')
+
+    assert list(iter_records(path)) == [{"name": "a"}]
+
+
+def test_scan_snapshot_matches_iter_records(tmp_path):
+    path = tmp_path / "snap.ndjson"
+    path.write_text('{"name": "a"}\n\n{"_meta": {"user": "demo"}}\n{"name": "b"')
+    legacy = tmp_path / "obj.json"
+    legacy.write_text(json.dumps({"repos": [{"name": "c"}]}))
+    empty = tmp_path / "empty.ndjson"
+    empty.write_text("")
+
+    records, meta, digest = scan_snapshot(path)
+
+    assert records == list(iter_records(path))
+    assert meta == {"user": "demo"}
+    assert digest == hashlib.sha256(path.read_bytes()).hexdigest()
+    assert scan_snapshot(legacy)[0] == [{"name": "c"}]
+    assert scan_snapshot(empty)[:2] == ([], {})
+
+
+def test_latest_snapshot_spans_formats(tmp_path):
+    for name in (
+        "demo-20240101T000000Z.json",
+        "demo-20240301T000000Z.ndjson",
+        "demo-x-20250101T000000Z.ndjson",
+        "demo-20250101T000000Z.ndjson.part",
+    ):
+        (tmp_path / name).write_text("[]")
+
+    assert latest_snapshot(tmp_path, "demo").name == "demo-20240301T000000Z.ndjson"
+    assert latest_snapshot(tmp_path, "nobody") is None
+    assert latest_snapshot(tmp_path / "missing", "demo") is None
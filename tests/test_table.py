@@ -0,0 +1,60 @@
+from datetime import date, datetime, timezone
+import math
+
+from braggard.table import RepoTable, pack_statuses
+
+
+def test_pack_statuses_sets_a_bit_per_success():
+    assert pack_statuses([]) == (0, 0)
+    assert pack_statuses(["SUCCESS", "FAILURE", "SUCCESS"]) == (3, 0b101)
+
+
+def test_table_ci_pass_rates_from_packed_bitsets():
+    many = ["SUCCESS"] * 70 + ["FAILURE"] * 30
+    table = RepoTable(
+        [
+            {"name": "a", "ci": list(pack_statuses(["SUCCESS", "FAILURE"]))},
+            {"name": "b"},
+            {"name": "c", "ci": list(pack_statuses(many))},
+        ]
+    )
+
+    rates = table.ci_pass_rates()
+
+    assert table.ci_successes().tolist() == [1, 0, 70]
+    assert rates[0] == 0.5 and math.isnan(rates[1]) and rates[2] == 0.7
+
+
+def test_table_aggregates_by_dictionary_encoded_language():
+    table = RepoTable(
+        [
+            {"name": "a", "stars": 3, "language": "Go", "languages": {"Go": 10}},
+            {"name": "b", "stars": 4, "language": "Python"},
+            {"name": "c", "language": "Go", "languages": {"C": 1, "Go": 5}},
+        ]
+    )
+
+    assert len(table) == 3 and int(table.stars.sum()) == 7
+    assert table.language_counts() == {"Go": 2, "Python": 1}
+    assert table.language_bytes() == {"Go": 15, "C": 1}
+    assert table.name_of(2) == "c"
+    assert table.languages_of(2) == {"C": 1, "Go": 5}
+    assert table.languages_of(1) == {}
+
+
+def test_table_commit_velocities_cover_the_last_year():
+    now = datetime(2024, 6, 1, tzinfo=timezone.utc)
+    recent = date(2024, 5, 27).toordinal()
+    old = date(2023, 1, 2).toordinal()
+    table = RepoTable(
+        [
+            {"name": "a", "weeks": [[recent, 52], [old, 100]]},
+            {"name": "b"},
+            {"name": "c", "weeks": [[old, 4]]},
+        ]
+    )
+
+    velocities = table.commit_velocities(now)
+
+    assert velocities[0] == 1.0 and math.isnan(velocities[1])
+    assert velocities[2] == 0.0
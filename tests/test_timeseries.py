@@ -0,0 +1,82 @@
+from datetime import date
+import math
+
+import numpy as np
+
+from braggard.timeseries import (
+    SnapshotMatrix,
+    build_timeseries,
+    deltas,
+    growth,
+    rolling_velocity,
+    epoch_days,
+    velocity_series,
+)
+
+
+def test_epoch_days_are_day_ordinals():
+    seconds = np.array([0, 86399, 1709946123])
+    assert epoch_days(seconds).tolist() == [
+        date(1970, 1, 1).toordinal(),
+        date(1970, 1, 1).toordinal(),
+        date(2024, 3, 9).toordinal(),
+    ]
+
+
+def test_matrix_keeps_last_point_per_day_and_fills_gaps():
+    matrix = SnapshotMatrix(
+        np.array([0, 0, 1, 0, 1]),
+        np.array([10, 10, 11, 12, 13]),
+        np.array([1.0, 2.0, 5.0, 4.0, 6.0]),
+    )
+
+    assert matrix.days.tolist() == [10, 11, 12, 13]
+    assert matrix.values[0].tolist() == [2.0, 2.0, 4.0, 4.0]
+    assert math.isnan(matrix.values[1][0])
+    assert matrix.values[1][1:].tolist() == [5.0, 5.0, 6.0]
+    assert matrix.totals().tolist() == [2.0, 7.0, 9.0, 10.0]
+    assert matrix.group_totals(np.array([1, -1]), 2).tolist() == [
+        [0.0] * 4,
+        [2.0, 2.0, 4.0, 4.0],
+    ]
+
+
+def test_growth_against_trailing_window():
+    series = np.array([10.0, 12.0, 15.0, 30.0])
+    matrix = SnapshotMatrix(np.zeros(4, int), np.array([0, 100, 364, 400]), series)
+    baseline = matrix.baseline()
+
+    assert baseline.tolist() == [-1, -1, 0, 0]
+    rates = growth(series, baseline)
+    assert math.isnan(rates[0]) and math.isnan(rates[1])
+    assert rates[2:].tolist() == [0.5, 2.0]
+    assert deltas(series).tolist() == [0.0, 2.0, 3.0, 15.0]
+
+
+def test_rolling_velocity_fills_empty_weeks():
+    monday = date(2024, 1, 1).toordinal()
+    weeks, velocity = rolling_velocity(
+        np.array([monday, monday + 7 * 53, monday]), np.array([26.0, 52.0, 26.0])
+    )
+
+    assert len(weeks) == 54 and weeks[-1] == monday + 7 * 53
+    assert velocity[0] == 1.0 and velocity[51] == 1.0
+    assert velocity[52] == 0.0 and velocity[53] == 1.0
+    assert velocity_series({}) == {}
+
+
+def test_build_timeseries_sums_stars_per_date_and_language():
+    day = date(2024, 1, 1).toordinal()
+    repos = np.array([0, 0, 1])
+    days = np.array([day, day + 1, day + 1])
+    stars = np.array([3.0, 5.0, 7.0])
+
+    series = build_timeseries(repos, days, stars, {0: "Go", 1: "Rust"})
+
+    assert series["dates"] == ["2024-01-01", "2024-01-02"]
+    assert series["stars"] == [3, 12]
+    assert series["stars_delta"] == [0, 9]
+    assert series["stars_growth"] == [None, None]
+    assert series["language_stars"] == {"Rust": [0, 7], "Go": [3, 5]}
+    empty = np.zeros(0, int)
+    assert build_timeseries(empty, empty, empty, {}) == {}